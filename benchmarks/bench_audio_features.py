@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Audio feature extraction benchmark.
+Compares audio_features against a float32 port of the firmware
+AudioProcessor (sample-by-sample filters, naive DFT) on a few frames, then
+measures how much faster than real time the vectorized path runs.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Make the python_gui modules importable when run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python_gui'))
+
+from audio_features import (FRAME_SIZE, HIGH_PASS_ALPHA, LOW_PASS_ALPHA, SAMPLE_RATE,  # noqa: E402
+                            extract_features, filter_samples)
+
+F32 = np.float32
+
+
+def make_signal(seconds: float, seed: int = 1) -> np.ndarray:
+    """Tones plus noise and bursts, scaled like the firmware's (adc - dc) * 8 samples"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    signal = 3000 * np.sin(2 * np.pi * 440 * t) + 1500 * np.sin(2 * np.pi * 5200 * t)
+    signal += rng.normal(0, 800, len(t)) * (1 + (np.sin(2 * np.pi * 0.5 * t) > 0.9) * 4)
+    return np.clip(signal, -16000, 16000).astype(np.int16)
+
+
+def device_filter(samples: np.ndarray) -> np.ndarray:
+    """AudioProcessor::add_sample, one float32 sample at a time"""
+    hp_in = hp_out = lp_out = F32(0)
+    out = np.empty(len(samples), dtype=np.int16)
+    for i, sample in enumerate(samples.tolist()):
+        x = F32(sample)
+        hp = HIGH_PASS_ALPHA * (hp_out + x - hp_in)
+        hp_in, hp_out = x, hp
+        lp_out = LOW_PASS_ALPHA * hp + (F32(1.0) - LOW_PASS_ALPHA) * lp_out
+        out[i] = int(lp_out)
+    return out
+
+
+def device_features(frames: np.ndarray) -> np.ndarray:
+    """AudioProcessor::extract_features with the naive float32 DFT"""
+    n = np.arange(FRAME_SIZE)
+    angles = (-2.0 * np.pi * np.arange(FRAME_SIZE // 2)[:, None] * n[None, :] / FRAME_SIZE).astype(F32)
+    cos, sin = np.cos(angles), np.sin(angles)
+    window = (0.54 - 0.46 * np.cos(2.0 * np.pi * n / (FRAME_SIZE - 1))).astype(F32)
+    prev = np.zeros(FRAME_SIZE // 2, dtype=F32)
+    rows = []
+    for raw in frames:
+        frame = (raw / 32768.0).astype(F32) * window
+        rms = np.sqrt(np.cumsum(frame * frame)[-1] / F32(FRAME_SIZE))
+        zcr = np.count_nonzero((frame[1:] >= 0) != (frame[:-1] >= 0)) / F32(FRAME_SIZE - 1)
+        real = np.cumsum(frame * cos, axis=1)[:, -1]
+        imag = np.cumsum(frame * sin, axis=1)[:, -1]
+        spectrum = np.sqrt(real * real + imag * imag)
+        freq = np.arange(len(spectrum), dtype=F32) * F32(SAMPLE_RATE) / F32(2 * len(spectrum))
+        centroid = np.cumsum(freq * spectrum)[-1] / np.cumsum(spectrum)[-1]
+        energy = spectrum * spectrum
+        low, mid, high = energy[:68].sum(), energy[68:204].sum(), energy[204:].sum()
+        flux = np.maximum(spectrum - prev, 0).sum()
+        prev = spectrum
+        rows.append([rms, zcr, centroid, low, mid, high, flux])
+    return np.array(rows, dtype=F32)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=600, help="length of the timed recording")
+    parser.add_argument('--check-frames', type=int, default=40)
+    args = parser.parse_args()
+
+    check = make_signal(args.check_frames * FRAME_SIZE / SAMPLE_RATE)
+    device_samples = device_filter(check)
+    host_samples, _ = filter_samples(check)
+    print(f"filtered samples differing from the device: {np.count_nonzero(device_samples != host_samples)}"
+          f" of {len(check)}, max {np.abs(device_samples.astype(int) - host_samples).max()} LSB")
+
+    expected = device_features(device_samples.reshape(-1, FRAME_SIZE))
+    actual = extract_features(check)
+    relative = np.abs(actual - expected) / np.maximum(np.abs(expected), 1e-12)
+    names = ['rms', 'zcr', 'centroid', 'low', 'mid', 'high', 'flux']
+    print("max relative difference per feature: "
+          + ", ".join(f"{name} {value:.1e}" for name, value in zip(names, relative.max(axis=0))))
+
+    signal = make_signal(args.seconds, seed=2)
+    start = time.perf_counter()
+    features = extract_features(signal)
+    elapsed = time.perf_counter() - start
+    print(f"{args.seconds:.0f}s of audio, {len(features)} frames: {elapsed:.2f}s, "
+          f"{args.seconds / elapsed:,.0f}x real time")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Text vs binary FEATURES framing.
+Encodes the same frames both ways, then decodes the byte streams in
+serial-read-sized chunks: the text path with SerialLineReader.feed and
+parse_chunk, the binary path with FrameDecoder. Also shows the wire size
+and the frame rate each format allows at 115200 baud.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Make the python_gui modules and the other benchmarks importable
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python_gui'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_protocol import LABELS  # noqa: E402
+from binary_protocol import FrameDecoder, encode_frames  # noqa: E402
+from esp32_emulator import format_features  # noqa: E402
+from protocol import parse_chunk  # noqa: E402
+from serial_reader import SerialLineReader  # noqa: E402
+
+BAUD = 115200
+BITS_PER_BYTE = 10  # 8N1
+
+
+def decode_text(stream: bytes, chunk: int) -> int:
+    reader = SerialLineReader(None)  # type: ignore[arg-type]
+    frames = 0
+    for start in range(0, len(stream), chunk):
+        lines = reader.feed(stream[start:start + chunk])
+        if lines:
+            frames += len(parse_chunk(lines).features)
+    return frames
+
+
+def decode_binary(stream: bytes, chunk: int) -> int:
+    decoder = FrameDecoder()
+    frames = 0
+    for start in range(0, len(stream), chunk):
+        records, _ = decoder.feed(stream[start:start + chunk])
+        frames += len(records)
+    return frames
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=200_000)
+    parser.add_argument('--chunks', type=int, nargs='+', default=[64, 1024, 16384],
+                        help="bytes per simulated serial read")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    features = (rng.random((args.frames, 7)) * [0.1, 0.5, 8000, 1, 1, 1, 5]).astype(np.float32)
+    labels = rng.choice(LABELS, args.frames)
+    confidence = rng.random(args.frames).astype(np.float32)
+
+    text = ''.join(line + '\r\n' for line in format_features(features, labels, confidence)).encode()
+    binary = encode_frames(features, labels.tolist(), confidence)
+    for name, stream in (('text', text), ('binary', binary)):
+        per_frame = len(stream) / args.frames
+        print(f"{name:>6}: {per_frame:5.1f} bytes/frame, at most "
+              f"{BAUD / BITS_PER_BYTE / per_frame:,.0f} frames/s at {BAUD} baud")
+
+    print(f"{'chunk':>7} {'text us/frame':>14} {'binary us/frame':>16} {'speedup':>8}")
+    for chunk in args.chunks:
+        start = time.perf_counter()
+        assert decode_text(text, chunk) == args.frames
+        text_time = time.perf_counter() - start
+        start = time.perf_counter()
+        assert decode_binary(binary, chunk) == args.frames
+        binary_time = time.perf_counter() - start
+        print(f"{chunk:>7} {text_time / args.frames * 1e6:>14.2f} {binary_time / args.frames * 1e6:>16.2f} "
+              f"{text_time / binary_time:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Multi-device ingest benchmark (POSIX).
+Opens one pseudo terminal per simulated ESP32, feeds every one of them
+FEATURES lines at a fixed rate from a single writer thread and reads them
+all through DeviceManager, parsing each batch like the headless logger.
+One extra device never sends anything, to show a silent board does not
+hold the others up.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import tty
+from typing import Dict, List, Tuple
+
+# Make the python_gui modules importable when run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python_gui'))
+
+from device_manager import DeviceManager  # noqa: E402
+from protocol import parse_chunk  # noqa: E402
+
+SAMPLE_LINE = b"FEATURES:0.0123,0.0845,2345.67,0.1234,0.0567,0.0089,0.4321,traffic,0.800\r\n"
+
+
+def open_ptys(count: int) -> List[Tuple[int, int]]:
+    """Return (master, slave) fds of count raw pseudo terminals"""
+    masters = []
+    for _ in range(count):
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        masters.append((master, slave))
+    return masters
+
+
+def feed(masters: List[int], rate: float, seconds: float, tick: float) -> int:
+    """Write rate lines/s to every master, one burst per tick, and return the lines sent to each"""
+    per_tick = rate * tick
+    owed = 0.0
+    sent = 0
+    start = time.perf_counter()
+    ticks = 0
+    while time.perf_counter() - start < seconds:
+        owed += per_tick
+        burst = int(owed)
+        owed -= burst
+        if burst:
+            data = SAMPLE_LINE * burst
+            for master in masters:
+                os.write(master, data)
+            sent += burst
+        ticks += 1
+        delay = start + ticks * tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return sent
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=32)
+    parser.add_argument('--rate', type=float, default=100.0, help="lines per second per device")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--tick', type=float, default=0.01, help="seconds between writer bursts")
+    args = parser.parse_args()
+
+    pairs = open_ptys(args.devices + 1)
+    ports = [os.ttyname(slave) for _, slave in pairs]
+    masters = [master for master, _ in pairs[:args.devices]]  # The last device stays silent
+
+    received: Dict[str, int] = {}
+    with DeviceManager() as manager:
+        for port in ports:
+            manager.add_device(port)
+
+        result: List[int] = []
+        writer = threading.Thread(target=lambda: result.append(feed(masters, args.rate, args.seconds, args.tick)),
+                                  daemon=True)
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        writer.start()
+        expected = None
+        while True:
+            for batch in manager.get_batches(timeout=0.2):
+                chunk = parse_chunk(batch.lines)
+                received[batch.device] = received.get(batch.device, 0) + len(chunk.features)
+            if not writer.is_alive():
+                expected = expected or result[0] * args.devices
+                if sum(received.values()) >= expected or time.perf_counter() - start > args.seconds + 5:
+                    break
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        dropped = sum(device['dropped_lines'] for device in manager.stats().values())
+
+    sent = result[0]
+    counts = [received.get(port, 0) for port in ports[:args.devices]]
+    print(f"{args.devices} devices at {args.rate:g} lines/s each for {args.seconds:g}s")
+    print(f"  received {sum(counts):,} of {sent * args.devices:,} lines "
+          f"({sum(counts) / elapsed:,.0f} lines/s), {dropped} dropped")
+    print(f"  per device: min {min(counts):,}, max {max(counts):,} of {sent:,}; "
+          f"silent device: {received.get(ports[-1], 0)} lines")
+    print(f"  process CPU {cpu / elapsed:.0%} of one core (writer thread included)")
+
+    for master, slave in pairs:
+        os.close(master)
+        os.close(slave)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
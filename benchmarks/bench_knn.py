@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Host KNN classifier benchmark.
+Checks knn.KNNClassifier against a line-by-line port of the firmware's
+KNNClassifier::classify on a sample of queries, then measures batch
+classification throughput against a device-sized (500 sample) training set,
+or against a pooled one with --training 50000 --backend kdtree.
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+# Make the python_gui modules importable when run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python_gui'))
+
+from knn import BACKENDS, KNNClassifier, MAX_SAMPLES  # noqa: E402
+
+LABELS = ["traffic", "machinery", "human", "background", "other"]
+
+
+def make_samples(count: int, seed: int) -> Tuple[np.ndarray, List[str]]:
+    """Random feature vectors quantized like DUMP_DATASET output, so ties occur"""
+    rng = np.random.default_rng(seed)
+    features = rng.random((count, 7)).astype(np.float32)
+    features[:, 2] *= 8000
+    features = np.round(features, 1).astype(np.float32)
+    return features, [LABELS[i] for i in rng.integers(0, len(LABELS), count)]
+
+
+def device_classify(samples: np.ndarray, labels: List[str], query: np.ndarray, k: int = 5) -> Tuple[str, float]:
+    """Straight port of KNNClassifier::classify and compute_distance"""
+    distances = []
+    for i, sample in enumerate(samples):
+        dist = np.float32(0)
+        for j in range(7):
+            diff = float(np.float32(query[j]) - np.float32(sample[j]))
+            if j == 2:
+                diff /= 1000.0
+            dist = np.float32(float(dist) + diff ** 2)
+        distances.append((np.sqrt(dist), i))
+    distances.sort()
+
+    votes = {}
+    k = min(k, len(samples))
+    for dist, i in distances[:k]:
+        votes[labels[i]] = votes.get(labels[i], 0) + 1
+    best_label, max_votes = "unknown", 0
+    for label in sorted(votes):
+        if votes[label] > max_votes:
+            best_label, max_votes = label, votes[label]
+    return best_label, float(np.float32(max_votes / k))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', type=int, default=1_000_000)
+    parser.add_argument('--training', type=int, default=MAX_SAMPLES)
+    parser.add_argument('--backend', choices=BACKENDS, default='auto')
+    parser.add_argument('--check', type=int, default=300, help="queries compared with the firmware port")
+    args = parser.parse_args()
+
+    train_features, train_labels = make_samples(args.training, seed=1)
+    queries, _ = make_samples(args.queries, seed=2)
+    classifier = KNNClassifier(backend=args.backend).fit(train_features, train_labels)
+
+    labels, confidence = classifier.predict(queries[:args.check])
+    for i in range(args.check):
+        expected = device_classify(train_features, train_labels, queries[i])
+        assert (labels[i], float(confidence[i])) == expected, (i, labels[i], confidence[i], expected)
+    print(f"{args.check} queries match the firmware port")
+
+    start = time.perf_counter()
+    classifier.predict(queries)
+    elapsed = time.perf_counter() - start
+    print(f"{args.queries} queries x {args.training} samples ({args.backend}): {elapsed:.2f}s, "
+          f"{elapsed / args.queries * 1e6:.1f} us/query, {args.queries / elapsed * 60:,.0f} frames/min")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
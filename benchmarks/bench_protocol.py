@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Protocol parsing microbenchmark.
+Compares the old per-line FEATURES parsing path of the GUI with the bulk
+protocol.parse_chunk parser at 10k, 100k and 1M lines.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+# Make the python_gui modules importable when run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python_gui'))
+
+from protocol import parse_chunk  # noqa: E402
+
+LABELS = ["traffic", "machinery", "human", "background", "other"]
+
+
+def make_lines(count: int, seed: int = 1) -> List[str]:
+    """Generate a realistic mix of FEATURES lines with an occasional STATUS"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        if i % 1000 == 999:
+            lines.append(f"STATUS:{i % 500},{i * 1000},180000")
+            continue
+        lines.append(
+            f"FEATURES:{rng.random() * 0.1:.4f},{rng.random() * 0.5:.4f},{rng.random() * 8000:.2f},"
+            f"{rng.random():.4f},{rng.random():.4f},{rng.random():.4f},{rng.random() * 5:.4f},"
+            f"{rng.choice(LABELS)},{rng.random():.3f}"
+        )
+    return lines
+
+
+def legacy_parse(lines: List[str]) -> int:
+    """The per-line startswith dispatch and dict building the GUI used to do"""
+    frames = 0
+    for data in lines:
+        if data.startswith("FEATURES:"):
+            parts = data[9:].split(',')
+            if len(parts) >= 9:
+                features: Dict[str, float] = {
+                    'rms': float(parts[0]),
+                    'zcr': float(parts[1]),
+                    'spectral_centroid': float(parts[2]),
+                    'low_energy': float(parts[3]),
+                    'mid_energy': float(parts[4]),
+                    'high_energy': float(parts[5]),
+                    'spectral_flux': float(parts[6])
+                }
+                classification = parts[7]
+                confidence = float(parts[8])
+                frames += 1 if features and classification and confidence >= 0 else 0
+        elif data.startswith("STATUS:"):
+            parts = data[7:].split(',')
+            int(parts[1])
+    return frames
+
+
+def bulk_parse(lines: List[str]) -> int:
+    return len(parse_chunk(lines).features)
+
+
+def best_of(func, lines: List[str], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(lines)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'lines':>10} {'per-line (s)':>13} {'bulk (s)':>10} {'speedup':>8} {'bulk lines/s':>14}")
+    for size in args.sizes:
+        lines = make_lines(size)
+        assert legacy_parse(lines) == bulk_parse(lines)
+        legacy = best_of(legacy_parse, lines, args.repeat)
+        bulk = best_of(bulk_parse, lines, args.repeat)
+        print(f"{size:>10} {legacy:>13.3f} {bulk:>10.3f} {legacy / bulk:>7.2f}x {size / bulk:>14,.0f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+RollingStats update and query cost.
+Feeds synthetic FEATURES records one at a time (headless logger reading
+line by line) and in batches (GUI draining its queue), then times a
+summary() of all three windows as the GUI does once a second.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Make the python_gui modules importable when run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python_gui'))
+
+from protocol import DATASET_LABELS, FEATURE_DTYPE, NUM_FEATURES  # noqa: E402
+from rolling_stats import RollingStats  # noqa: E402
+
+
+def make_records(count: int) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    records = np.zeros(count, dtype=FEATURE_DTYPE)
+    records['features'] = rng.random((count, NUM_FEATURES)).astype(np.float32)
+    records['features'][:, 0] = 10.0 ** (rng.normal(-35.0, 6.0, count) / 20.0)
+    records['label'] = rng.choice(DATASET_LABELS, count)
+    records['confidence'] = rng.random(count)
+    return records
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=200_000)
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    timestamps = 1.7e9 + np.arange(args.records) * 0.01  # 100 frames/s
+    print(f"{'batch':>6} {'records/s':>12} {'us/record':>10}")
+    for batch in args.batches:
+        stats = RollingStats()
+        start = time.perf_counter()
+        for i in range(0, args.records, batch):
+            stats.update(timestamps[i:i + batch], records[i:i + batch])
+        elapsed = time.perf_counter() - start
+        print(f"{batch:>6} {args.records / elapsed:>12,.0f} {elapsed / args.records * 1e6:>10.2f}")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        stats.summary()
+    print(f"summary of {len(stats.windows)} windows: {(time.perf_counter() - start) * 10:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
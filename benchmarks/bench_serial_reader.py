@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Serial ingest throughput benchmark.
+Feeds FEATURES lines through pyserial's loop:// device (or a pty on POSIX)
+and compares the event-driven SerialLineReader with the old polling loop.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import serial
+
+# Make the python_gui modules importable when run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python_gui'))
+
+from serial_reader import SerialLineReader  # noqa: E402
+
+SAMPLE_LINE = b"FEATURES:0.0123,0.0845,2345.67,0.1234,0.0567,0.0089,0.4321,traffic,0.800\r\n"
+
+
+def open_loopback():
+    """Return (writer, reader) ends of a loop:// device"""
+    port = serial.serial_for_url('loop://', timeout=1)
+    return port.write, port
+
+
+def open_pty():
+    """Return (writer, reader) ends of a pseudo terminal pair"""
+    import tty
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    reader = serial.Serial(os.ttyname(slave), 115200, timeout=1)
+    return (lambda data: os.write(master, data)), reader
+
+
+def feed(write, count: int, burst: int) -> None:
+    """Write count lines in bursts, like a DUMP_DATASET transfer"""
+    sent = 0
+    while sent < count:
+        n = min(burst, count - sent)
+        write(SAMPLE_LINE * n)
+        sent += n
+
+
+def run_event_driven(write, port, count: int, burst: int) -> float:
+    reader = SerialLineReader(port)
+    writer = threading.Thread(target=feed, args=(write, count, burst), daemon=True)
+    start = time.perf_counter()
+    writer.start()
+    received = 0
+    while received < count:
+        lines = reader.read_lines()
+        if not lines and not writer.is_alive():
+            break
+        received += len(lines)
+    return received / (time.perf_counter() - start)
+
+
+def run_polling(write, port, count: int, burst: int) -> float:
+    writer = threading.Thread(target=feed, args=(write, count, burst), daemon=True)
+    start = time.perf_counter()
+    writer.start()
+    received = 0
+    while received < count:
+        if port.in_waiting > 0:
+            line = port.readline().decode().strip()
+            if line:
+                received += 1
+        time.sleep(0.01)
+    return received / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=100000, help="lines for the event-driven reader")
+    parser.add_argument('--legacy-lines', type=int, default=300, help="lines for the polling loop (slow)")
+    parser.add_argument('--burst', type=int, default=500, help="lines written per burst")
+    parser.add_argument('--pty', action='store_true', help="use a pty instead of loop://")
+    args = parser.parse_args()
+
+    opener = open_pty if args.pty else open_loopback
+    device = "pty" if args.pty else "loop://"
+
+    write, port = opener()
+    rate = run_event_driven(write, port, args.lines, args.burst)
+    port.close()
+    print(f"[{device}] event-driven reader: {rate:,.0f} lines/s ({args.lines} lines)")
+
+    if args.legacy_lines > 0:
+        write, port = opener()
+        rate = run_polling(write, port, args.legacy_lines, args.burst)
+        port.close()
+        print(f"[{device}] polling loop:        {rate:,.0f} lines/s ({args.legacy_lines} lines)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
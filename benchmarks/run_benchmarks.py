@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite.
+Measures the hot paths between the ESP32 and the screen and writes the
+results to a JSON file:
+
+  ingest     raw FEATURES lines through SerialLineReader (pty, or loop://)
+  parse      protocol.parse_chunk per line
+  gui        process_serial_data per line and update_display per frame (needs a display)
+  classify   host KNN batch classification against a 500 sample training set
+  retrieve   DUMP_DATASET download from the emulator at 500 and 50k rows
+
+Pass --baseline with an earlier results file to fail on regressions.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import serial
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GUI_DIR = os.path.join(HERE, '..', 'python_gui')
+# Make the python_gui modules and the other benchmarks importable
+sys.path.insert(0, GUI_DIR)
+sys.path.insert(0, HERE)
+
+from bench_knn import make_samples  # noqa: E402
+from bench_protocol import make_lines  # noqa: E402
+from bench_serial_reader import open_loopback, open_pty, run_event_driven  # noqa: E402
+from knn import KNNClassifier  # noqa: E402
+from protocol import parse_chunk  # noqa: E402
+from retrieve_esp32_dataset import stream_dataset, wait_for_ready  # noqa: E402
+
+Result = Dict[str, object]
+
+
+def result(name: str, value: float, unit: str, better: str, **params: object) -> Result:
+    return {'name': name, 'value': round(value, 6), 'unit': unit, 'better': better, 'params': params}
+
+
+def skipped(name: str, reason: str) -> Result:
+    return {'name': name, 'skipped': reason}
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_ingest(lines: int) -> List[Result]:
+    if os.name == 'posix':
+        device = 'pty'
+        write, port = open_pty()
+    else:
+        device = 'loop'
+        write, port = open_loopback()
+    try:
+        rate = run_event_driven(write, port, lines, burst=500)
+    finally:
+        port.close()
+    return [result('ingest_lines_per_s', rate, 'lines/s', 'higher', device=device, lines=lines)]
+
+
+def bench_parse(lines: int, repeat: int) -> List[Result]:
+    data = make_lines(lines)
+    elapsed = best_of(lambda: parse_chunk(data), repeat)
+    return [result('parse_chunk_us_per_line', elapsed / lines * 1e6, 'us/line', 'lower', lines=lines)]
+
+
+def bench_gui(lines: int, frames: int) -> List[Result]:
+    names = ('gui_process_serial_data_us_per_line', 'gui_update_display_ms_per_frame')
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:  # ImportError, or TclError without a display
+        return [skipped(name, f"Tk unavailable: {e}") for name in names]
+
+    try:
+        root.withdraw()
+        from noise_logger_gui import ESP32NoiseLoggerGUI
+
+        class OfflineGUI(ESP32NoiseLoggerGUI):
+            # Never touch a real board while benchmarking
+            def auto_connect_serial(self) -> None:
+                pass
+
+            def start_data_thread(self) -> None:
+                pass
+
+        app = OfflineGUI(root)
+
+        data = make_lines(lines)
+        start = time.perf_counter()
+        for line in data:
+            app.process_serial_data(line)
+        per_line = (time.perf_counter() - start) / lines
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            app.features_dirty = app.status_dirty = True
+            app.update_display()
+            root.update_idletasks()
+        per_frame = (time.perf_counter() - start) / frames
+    finally:
+        root.destroy()
+    return [result(names[0], per_line * 1e6, 'us/line', 'lower', lines=lines),
+            result(names[1], per_frame * 1e3, 'ms/frame', 'lower', frames=frames)]
+
+
+def bench_classify(queries: int) -> List[Result]:
+    features, labels = make_samples(500, seed=1)
+    batch, _ = make_samples(queries, seed=2)
+    classifier = KNNClassifier().fit(features, labels)
+    elapsed = best_of(lambda: classifier.predict(batch), 1)
+    return [result('knn_frames_per_s', queries / elapsed, 'frames/s', 'higher', queries=queries, training=500)]
+
+
+def _dump(port: serial.Serial) -> float:
+    quiet: Callable[[str], None] = lambda line: None
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not wait_for_ready(port, log=quiet):
+            raise RuntimeError("emulator did not send the ready message")
+        start = time.perf_counter()
+        dump = stream_dataset(port, lambda rows: None)
+        elapsed = time.perf_counter() - start
+    return elapsed if dump.complete else float('nan')
+
+
+def bench_retrieve(sizes: List[int]) -> List[Result]:
+    results = []
+    for size in sizes:
+        if os.name == 'posix':
+            # A separate process, so the emulator does not share our GIL
+            emulator = subprocess.Popen(
+                [sys.executable, os.path.join(GUI_DIR, 'esp32_emulator.py'), '--rate', '1',
+                 '--preload', str(size), '--max-samples', str(size)],
+                stdout=subprocess.PIPE, text=True)
+            try:
+                banner = emulator.stdout.readline() if emulator.stdout else ''
+                device = banner.split(' on ', 1)[1].split(' ', 1)[0]
+                with serial.Serial(device, 115200, timeout=10) as port:
+                    elapsed = _dump(port)
+            finally:
+                emulator.terminate()
+                emulator.wait()
+            transport = 'pty'
+        else:
+            from esp32_emulator import ESP32Emulator, EmulatedSerial
+            emulator_state = ESP32Emulator(rate=1, max_samples=size)
+            emulator_state.preload(size)
+            emulator_state.storage = emulator_state.training_rows()
+            with EmulatedSerial(emulator_state, timeout=10) as port:
+                elapsed = _dump(port)
+            transport = 'in-process'
+        results.append(result(f'retrieve_dump_{size}_rows_s', elapsed, 's', 'lower',
+                              rows=size, transport=transport))
+    return results
+
+
+def compare(results: List[Result], baseline_path: str, tolerance: float) -> List[str]:
+    """Return a message for every result worse than the baseline by more than tolerance"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {r['name']: r for r in json.load(f)['results'] if 'value' in r}
+    regressions = []
+    for current in results:
+        old = baseline.get(current['name'])
+        if not old or 'value' not in current:
+            continue
+        new_value, old_value = float(current['value']), float(old['value'])
+        if current['better'] == 'higher':
+            worse = new_value < old_value * (1 - tolerance)
+        else:
+            worse = new_value > old_value * (1 + tolerance)
+        if worse:
+            regressions.append(f"{current['name']}: {old_value:g} -> {new_value:g} {current['unit']}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--only', nargs='+', choices=['ingest', 'parse', 'gui', 'classify', 'retrieve'])
+    parser.add_argument('--quick', action='store_true', help="smaller workloads for a fast check")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    scale = 10 if args.quick else 1
+    stages: Dict[str, Callable[[], List[Result]]] = {
+        'ingest': lambda: bench_ingest(200_000 // scale),
+        'parse': lambda: bench_parse(100_000 // scale, repeat=3),
+        'gui': lambda: bench_gui(20_000 // scale, 2_000 // scale),
+        'classify': lambda: bench_classify(100_000 // scale),
+        'retrieve': lambda: bench_retrieve([500, 5_000 if args.quick else 50_000]),
+    }
+
+    results: List[Result] = []
+    for name, stage in stages.items():
+        if args.only and name not in args.only:
+            continue
+        for entry in stage():
+            results.append(entry)
+            if 'skipped' in entry:
+                print(f"{entry['name']:<40} skipped ({entry['skipped']})")
+            else:
+                print(f"{entry['name']:<40} {entry['value']:>14,.3f} {entry['unit']}")
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
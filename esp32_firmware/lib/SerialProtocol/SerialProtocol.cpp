@@ -7,8 +7,21 @@ extern String last_classification;
 extern float last_confidence;
 extern bool has_new_features;
 
+static uint16_t crc16_ccitt(const uint8_t* data, size_t length) {
+    uint16_t crc = 0xFFFF;
+    for (size_t i = 0; i < length; i++) {
+        crc ^= (uint16_t)data[i] << 8;
+        for (int bit = 0; bit < 8; bit++) {
+            crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+        }
+    }
+    return crc;
+}
+
 SerialProtocol::SerialProtocol() {
     input_buffer = "";
+    binary_mode = false;
+    frame_sequence = 0;
 }
 
 void SerialProtocol::initialize() {
@@ -84,7 +97,23 @@ void SerialProtocol::process_command(String& command) {
         send_dataset_info();
     }
     else if (command == "DUMP_DATASET") {
-        dump_dataset_csv();
+        dump_dataset_csv(0);
+    }
+    else if (command.startsWith("DUMP_DATASET:")) {
+        long start = command.substring(13).toInt();
+        dump_dataset_csv(start > 0 ? (size_t)start : 0);
+    }
+    else if (command.startsWith("FIND_SAMPLE:")) {
+        send_sample_index(strtoul(command.substring(12).c_str(), nullptr, 10));
+    }
+    else if (command == "SET_MODE:BINARY") {
+        binary_mode = true;
+        frame_sequence = 0;
+        Serial.println("OK:MODE_BINARY");
+    }
+    else if (command == "SET_MODE:TEXT") {
+        binary_mode = false;
+        Serial.println("OK:MODE_TEXT");
     }
     else {
         send_error("Unknown command: " + command);
@@ -93,12 +122,29 @@ void SerialProtocol::process_command(String& command) {
 
 
 // --- Now at file scope ---
-void SerialProtocol::dump_dataset_csv() {
-    // Send all stored samples as CSV lines, then END_DATASET
+void SerialProtocol::send_sample_index(unsigned long timestamp) {
+    // Position of the newest sample stamped timestamp (-1 if there is none), so a
+    // host can dump only the samples added after the last one it has
+    const auto& data = classifier.get_training_data();
+    long index = -1;
+    for (size_t i = data.size(); i-- > 0;) {
+        if (data[i].timestamp == timestamp) {
+            index = (long)i;
+            break;
+        }
+    }
+    Serial.print("SAMPLE_INDEX:");
+    Serial.println(index);
+}
+
+void SerialProtocol::dump_dataset_csv(size_t start) {
+    // Send the stored samples from start on as CSV lines, then END_DATASET.
+    // The count is always the total, so a resuming host can tell if the data changed.
     const auto& data = classifier.get_training_data();
     Serial.print("[DEBUG] DUMP_DATASET sample count: ");
     Serial.println(data.size());
-    for (const auto& sample : data) {
+    for (size_t i = start; i < data.size(); i++) {
+        const auto& sample = data[i];
         Serial.print(sample.features.rms, 4); Serial.print(",");
         Serial.print(sample.features.zcr, 4); Serial.print(",");
         Serial.print(sample.features.spectral_centroid, 2); Serial.print(",");
@@ -113,6 +159,10 @@ void SerialProtocol::dump_dataset_csv() {
 }
 
 void SerialProtocol::send_features(const AudioFeatures& features, const String& classification, float confidence) {
+    if (binary_mode) {
+        send_features_binary(features, classification, confidence);
+        return;
+    }
     Serial.print("FEATURES:");
     Serial.print(features.rms, 4);
     Serial.print(",");
@@ -133,6 +183,35 @@ void SerialProtocol::send_features(const AudioFeatures& features, const String&
     Serial.println(confidence, 3);
 }
 
+void SerialProtocol::send_features_binary(const AudioFeatures& features, const String& classification, float confidence) {
+    static const char* class_labels[] = {"traffic", "machinery", "human", "background", "other"};
+
+    FeatureFrame frame;
+    frame.sync[0] = FRAME_SYNC_0;
+    frame.sync[1] = FRAME_SYNC_1;
+    frame.type = FRAME_TYPE_FEATURES;
+    frame.sequence = frame_sequence++;
+    frame.features[0] = features.rms;
+    frame.features[1] = features.zcr;
+    frame.features[2] = features.spectral_centroid;
+    frame.features[3] = features.low_energy;
+    frame.features[4] = features.mid_energy;
+    frame.features[5] = features.high_energy;
+    frame.features[6] = features.spectral_flux;
+    frame.class_id = FRAME_OTHER_CLASS;
+    for (uint8_t i = 0; i < 5; i++) {
+        if (classification == class_labels[i]) {
+            frame.class_id = i;
+            break;
+        }
+    }
+    frame.confidence = confidence;
+    frame.crc = crc16_ccitt(&frame.type, offsetof(FeatureFrame, crc) - offsetof(FeatureFrame, type));
+
+    // One write call, so the frame goes out in a single UART transfer
+    Serial.write(reinterpret_cast<const uint8_t*>(&frame), sizeof(frame));
+}
+
 void SerialProtocol::send_status() {
     Serial.print("STATUS:");
     Serial.print(classifier.get_sample_count());
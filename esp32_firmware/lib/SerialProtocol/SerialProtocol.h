@@ -5,13 +5,34 @@
 #include "AudioProcessor.h"
 #include "KNNClassifier.h"
 
+// Binary FEATURES frame (see python_gui/binary_protocol.py), little-endian and packed
+const uint8_t FRAME_SYNC_0 = 0xAA;
+const uint8_t FRAME_SYNC_1 = 0x55;
+const uint8_t FRAME_TYPE_FEATURES = 1;
+const uint8_t FRAME_OTHER_CLASS = 255;
+
+struct __attribute__((packed)) FeatureFrame {
+    uint8_t sync[2];
+    uint8_t type;
+    uint8_t sequence;
+    float features[7];
+    uint8_t class_id;
+    float confidence;
+    uint16_t crc;  // CRC-16/CCITT-FALSE of type..confidence
+};
+static_assert(sizeof(FeatureFrame) == 39, "FeatureFrame must match FRAME_DTYPE on the host");
+
 class SerialProtocol {
 private:
     String input_buffer;
+    bool binary_mode;
+    uint8_t frame_sequence;
     void process_command(String& command);
     void send_features(const AudioFeatures& features, const String& classification, float confidence);
+    void send_features_binary(const AudioFeatures& features, const String& classification, float confidence);
     void send_dataset_info();
-    void dump_dataset_csv();
+    void dump_dataset_csv(size_t start);
+    void send_sample_index(unsigned long timestamp);
     
 public:
     SerialProtocol();
@@ -31,5 +52,10 @@ public:
 // SAVE_DATA - Save data to storage
 // LOAD_DATA - Load data from storage
 // GET_DATASET - Get dataset information
+// DUMP_DATASET - Send all samples as CSV lines followed by END_DATASET
+// DUMP_DATASET:<start> - The same from sample <start> on, to resume an interrupted dump
+// FIND_SAMPLE:<timestamp> - SAMPLE_INDEX:<index> of the newest sample with that timestamp, or -1
+// SET_MODE:BINARY - Send FEATURES as binary frames (other messages stay text)
+// SET_MODE:TEXT - Send FEATURES as text lines (the default after boot)
 
 #endif
@@ -0,0 +1,249 @@
+"""
+Host-side reference implementation of the firmware AudioProcessor.
+
+Reproduces the seven features the ESP32 reports (RMS, ZCR, spectral
+centroid, three band energies and spectral flux) from raw int16 samples:
+the 150 Hz high-pass and 15 kHz low-pass filters with the firmware's
+coefficients, truncation back to int16, Hamming window and a 512-bin
+magnitude spectrum. Frames are taken as a strided view of the signal and
+processed in blocks with np.fft.rfft instead of the device's O(N^2) DFT.
+
+The filters run in float64 rather than the device's float32, so a
+filtered sample can occasionally truncate to a neighboring int16 value;
+features agree with the device to float32 rounding otherwise.
+"""
+import os
+import wave
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from .protocol import NUM_FEATURES
+except ImportError:  # Running as a script from the python_gui directory
+    from protocol import NUM_FEATURES
+
+SAMPLE_RATE = 30000
+FRAME_SIZE = 1024
+NUM_BINS = FRAME_SIZE // 2
+
+# The firmware extracts a frame only once CLASSIFICATION_INTERVAL (1 s) has
+# passed and the buffer has just wrapped, i.e. every 30th frame at 30 kHz
+DEVICE_HOP = 30 * FRAME_SIZE
+
+HIGH_PASS_ALPHA = np.float32(0.9691)  # 150 Hz at 30 kHz
+LOW_PASS_ALPHA = np.float32(0.7596)   # 15 kHz at 30 kHz
+
+LOW_BAND_END = (2000 * NUM_BINS) // (SAMPLE_RATE // 2)  # bins below 2 kHz
+MID_BAND_END = (6000 * NUM_BINS) // (SAMPLE_RATE // 2)  # bins below 6 kHz
+
+WINDOW = (0.54 - 0.46 * np.cos(2.0 * np.pi * np.arange(FRAME_SIZE) / (FRAME_SIZE - 1))).astype(np.float32)
+BIN_FREQUENCIES = (np.arange(NUM_BINS, dtype=np.float32) * np.float32(SAMPLE_RATE)
+                   / np.float32(2 * NUM_BINS))
+
+_IIR_BLOCK = 64
+
+# Filter state: high-pass previous input and output, low-pass previous output
+FilterState = Tuple[float, float, float]
+
+
+def _first_order_iir(u: np.ndarray, c: float, y0: float) -> np.ndarray:
+    """Solve y[n] = c * y[n-1] + u[n] with y[-1] = y0, without a per-sample loop
+
+    The signal is cut into blocks whose zero-state responses come from one
+    matrix product; the state carried from block to block is the same
+    recurrence with coefficient c**block, solved recursively.
+    """
+    n = len(u)
+    if n == 0:
+        return np.empty(0)
+    blocks = -(-n // _IIR_BLOCK)
+    padded = np.zeros(blocks * _IIR_BLOCK)
+    padded[:n] = u
+
+    lags = np.arange(_IIR_BLOCK)[:, None] - np.arange(_IIR_BLOCK)[None, :]
+    impulse = np.where(lags >= 0, float(c) ** np.maximum(lags, 0), 0.0)
+    response = padded.reshape(blocks, _IIR_BLOCK) @ impulse.T
+
+    decay = float(c) ** np.arange(1, _IIR_BLOCK + 1)
+    if blocks == 1:
+        carried = np.array([y0])
+    else:
+        ends = _first_order_iir(response[:, -1], float(c) ** _IIR_BLOCK, y0)
+        carried = np.concatenate([[y0], ends[:-1]])
+    response += carried[:, None] * decay[None, :]
+    return response.reshape(-1)[:n]
+
+
+def filter_samples(samples: np.ndarray, state: FilterState = (0.0, 0.0, 0.0)) -> Tuple[np.ndarray, FilterState]:
+    """Apply the high-pass and low-pass filters and truncate to int16, like add_sample"""
+    x = np.asarray(samples, dtype=np.float64)
+    if len(x) == 0:
+        return np.empty(0, dtype=np.int16), state
+    hp_prev_input, hp_prev_output, lp_prev_output = state
+
+    # y[n] = a * (y[n-1] + x[n] - x[n-1])
+    alpha = float(HIGH_PASS_ALPHA)
+    dx = np.diff(x, prepend=hp_prev_input)
+    high = _first_order_iir(alpha * dx, alpha, hp_prev_output)
+
+    # y[n] = a * x[n] + (1 - a) * y[n-1]
+    alpha = float(LOW_PASS_ALPHA)
+    low = _first_order_iir(alpha * high, float(np.float32(1.0) - LOW_PASS_ALPHA), lp_prev_output)
+
+    # (int16_t) truncates toward zero; out-of-range values wrap
+    filtered = np.trunc(low).astype(np.int32).astype(np.int16)
+    return filtered, (float(x[-1]), float(high[-1]), float(low[-1]))
+
+
+def frame_signal(samples: np.ndarray, hop: int = FRAME_SIZE) -> np.ndarray:
+    """Strided (frames, FRAME_SIZE) view of the complete frames starting every hop samples"""
+    if len(samples) < FRAME_SIZE:
+        return np.empty((0, FRAME_SIZE), dtype=samples.dtype)
+    return sliding_window_view(samples, FRAME_SIZE)[::hop]
+
+
+def frame_features(frames: np.ndarray, prev_spectrum: Optional[np.ndarray] = None,
+                   block_frames: int = 2048) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute the features of consecutive int16 frames, like extract_features
+
+    Returns the (frames, 7) float32 features and the last frame's spectrum,
+    which the next call needs for spectral flux.
+    """
+    if prev_spectrum is None:
+        prev_spectrum = np.zeros(NUM_BINS, dtype=np.float32)
+    features = np.empty((len(frames), NUM_FEATURES), dtype=np.float32)
+
+    for start in range(0, len(frames), block_frames):
+        block = frames[start:start + block_frames]
+        windowed = (block / np.float32(32768.0)).astype(np.float32) * WINDOW
+        out = features[start:start + len(block)]
+
+        out[:, 0] = np.sqrt(np.einsum('ij,ij->i', windowed, windowed, dtype=np.float64) / FRAME_SIZE)
+        # The window is positive, so signs are those of the raw samples
+        signs = block >= 0
+        out[:, 1] = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / np.float32(FRAME_SIZE - 1)
+
+        spectrum = np.abs(np.fft.rfft(windowed, axis=1)[:, :NUM_BINS]).astype(np.float32)
+        magnitude = spectrum.sum(axis=1, dtype=np.float64)
+        weighted = spectrum @ BIN_FREQUENCIES.astype(np.float64)
+        out[:, 2] = np.divide(weighted, magnitude, out=np.zeros_like(weighted), where=magnitude > 0)
+
+        energy = np.square(spectrum, dtype=np.float64)
+        out[:, 3] = energy[:, :LOW_BAND_END].sum(axis=1)
+        out[:, 4] = energy[:, LOW_BAND_END:MID_BAND_END].sum(axis=1)
+        out[:, 5] = energy[:, MID_BAND_END:].sum(axis=1)
+
+        previous = np.concatenate([prev_spectrum[None, :], spectrum[:-1]])
+        out[:, 6] = np.maximum(spectrum - previous, 0).sum(axis=1, dtype=np.float64)
+        prev_spectrum = spectrum[-1]
+    return features, prev_spectrum
+
+
+class AudioFeatureExtractor:
+    """Streaming feature extraction over successive chunks of int16 samples"""
+
+    def __init__(self, hop: int = FRAME_SIZE) -> None:
+        self.hop = hop
+        self.reset()
+
+    def reset(self) -> None:
+        self.filter_state: FilterState = (0.0, 0.0, 0.0)
+        self.prev_spectrum = np.zeros(NUM_BINS, dtype=np.float32)
+        self.pending = np.empty(0, dtype=np.int16)  # Filtered samples from the next frame start on
+        self.skip = 0  # Samples still to drop before the next frame starts (hop > FRAME_SIZE)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Feed samples and return the features of every frame they complete"""
+        filtered, self.filter_state = filter_samples(samples, self.filter_state)
+        buffer = np.concatenate([self.pending, filtered])
+        dropped = min(self.skip, len(buffer))
+        buffer = buffer[dropped:]
+        self.skip -= dropped
+
+        frames = frame_signal(buffer, self.hop)
+        features, self.prev_spectrum = frame_features(frames, self.prev_spectrum)
+
+        next_start = len(frames) * self.hop
+        self.pending = buffer[next_start:].copy()
+        self.skip += max(0, next_start - len(buffer))
+        return features
+
+
+def extract_features(samples: np.ndarray, hop: int = FRAME_SIZE) -> np.ndarray:
+    """Features of every frame of a complete recording"""
+    return AudioFeatureExtractor(hop).process(samples)
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Linearly interpolate samples recorded at rate onto target_rate"""
+    if rate == target_rate or len(samples) == 0:
+        return np.asarray(samples)
+    positions = np.arange(int(len(samples) * target_rate / rate)) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples)
+
+
+def _pcm_to_int16(data: bytes, width: int, channels: int) -> np.ndarray:
+    if width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.int16) - 128) << 8
+    elif width == 2:
+        samples = np.frombuffer(data, dtype='<i2')
+    elif width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        samples = (raw[:, 1].astype(np.int16) | (raw[:, 2].astype(np.int16) << 8))  # top 16 bits
+    elif width == 4:
+        samples = (np.frombuffer(data, dtype='<i4') >> 16).astype(np.int16)
+    else:
+        raise ValueError(f"Unsupported sample width: {width} bytes")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples
+
+
+def read_wav_chunks(path: str, chunk_seconds: float = 60.0) -> Iterator[Tuple[np.ndarray, int]]:
+    """Yield (int16 mono samples, sample rate) from a PCM WAV file, a chunk at a time"""
+    with wave.open(path, 'rb') as wav:
+        rate = wav.getframerate()
+        width = wav.getsampwidth()
+        channels = wav.getnchannels()
+        chunk = max(1, int(chunk_seconds * rate))
+        while True:
+            data = wav.readframes(chunk)
+            if not data:
+                break
+            yield _pcm_to_int16(data, width, channels), rate
+
+
+def read_raw_chunks(path: str, rate: int = SAMPLE_RATE,
+                    chunk_seconds: float = 60.0) -> Iterator[Tuple[np.ndarray, int]]:
+    """Yield (samples, rate) from a headerless little-endian int16 mono file"""
+    samples = np.memmap(path, dtype='<i2', mode='r') if os.path.getsize(path) >= 2 else np.empty(0, '<i2')
+    chunk = max(1, int(chunk_seconds * rate))
+    for start in range(0, len(samples), chunk):
+        yield np.array(samples[start:start + chunk]), rate
+
+
+def extract_chunks(chunks: Iterable[Tuple[np.ndarray, int]], hop: int = FRAME_SIZE) -> np.ndarray:
+    """Features of a recording delivered as (samples, rate) chunks, resampled to SAMPLE_RATE if needed"""
+    extractor = AudioFeatureExtractor(hop)
+    parts = []
+    for samples, rate in chunks:
+        if rate != SAMPLE_RATE:
+            # Chunks are long, so interpolating each one separately is harmless
+            samples = resample(samples, rate)
+        parts.append(extractor.process(samples))
+    if not parts:
+        return np.empty((0, NUM_FEATURES), dtype=np.float32)
+    return np.concatenate(parts)
+
+
+def extract_wav(path: str, hop: int = FRAME_SIZE, chunk_seconds: float = 60.0) -> np.ndarray:
+    """Features of every frame of a PCM WAV file"""
+    return extract_chunks(read_wav_chunks(path, chunk_seconds), hop)
+
+
+def extract_raw(path: str, rate: int = SAMPLE_RATE, hop: int = FRAME_SIZE,
+                chunk_seconds: float = 60.0) -> np.ndarray:
+    """Features of every frame of a raw int16 recording"""
+    return extract_chunks(read_raw_chunks(path, rate, chunk_seconds), hop)
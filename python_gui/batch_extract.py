@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Offline batch feature extraction.
+Runs the AudioProcessor-equivalent pipeline (audio_features.py) over WAV or
+raw int16 recordings, one file per worker process, and writes the results
+in the CSV layout retrieve_esp32_dataset.py produces. Frames can be labeled
+with a fixed label, the name of their directory, or by classifying them
+against a retrieved training dataset.
+
+Usage:
+    python python_gui/batch_extract.py recordings/ --output features.csv
+    python python_gui/batch_extract.py site_a/*.wav --output-dir features/ --classify esp32_dataset.csv
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    from .audio_features import (DEVICE_HOP, SAMPLE_RATE, extract_chunks, read_raw_chunks,
+                                 read_wav_chunks)
+    from .feature_scaling import load_scaler
+    from .knn import UNKNOWN_LABEL, KNNClassifier
+    from .protocol import (DATASET_CSV_HEADER, DATASET_ROW_DTYPE, format_dataset_rows,
+                           read_dataset_csv)
+except ImportError:  # Running as a script from the python_gui directory
+    from audio_features import (DEVICE_HOP, SAMPLE_RATE, extract_chunks, read_raw_chunks,
+                                read_wav_chunks)
+    from feature_scaling import load_scaler
+    from knn import UNKNOWN_LABEL, KNNClassifier
+    from protocol import (DATASET_CSV_HEADER, DATASET_ROW_DTYPE, format_dataset_rows,
+                          read_dataset_csv)
+
+WAV_EXTENSIONS = ('.wav',)
+RAW_EXTENSIONS = ('.raw', '.pcm', '.s16')
+
+# Set per worker process by _init_worker
+_classifier: Optional[KNNClassifier] = None
+
+
+class ExtractOptions(NamedTuple):
+    """Settings shared by every file of a batch"""
+    hop: int
+    raw_rate: int
+    label: Optional[str]
+    label_from_dir: bool
+
+
+def find_recordings(paths: List[str]) -> List[str]:
+    """Expand directories into the audio files below them, in a stable order"""
+    extensions = WAV_EXTENSIONS + RAW_EXTENSIONS
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in sorted(os.walk(path)):
+                files.extend(os.path.join(directory, name) for name in sorted(names)
+                             if name.lower().endswith(extensions))
+        else:
+            files.append(path)
+    return files
+
+
+def _init_worker(training_path: Optional[str], scaler_path: Optional[str] = None) -> None:
+    global _classifier
+    if training_path:
+        rows, _ = read_dataset_csv(training_path)
+        scaler = load_scaler(scaler_path) if scaler_path else None
+        _classifier = KNNClassifier(scaler=scaler).fit(rows['features'], rows['label'].tolist())
+
+
+def extract_file(path: str, options: ExtractOptions) -> Tuple[str, Optional[np.ndarray], float, str]:
+    """Extract one recording, returning (path, DATASET_ROW_DTYPE rows, seconds of audio, error)"""
+    try:
+        if path.lower().endswith(RAW_EXTENSIONS):
+            chunks: Iterator[Tuple[np.ndarray, int]] = read_raw_chunks(path, options.raw_rate)
+            duration = os.path.getsize(path) / 2 / options.raw_rate
+        else:
+            with wave.open(path, 'rb') as wav:
+                duration = wav.getnframes() / wav.getframerate()
+            chunks = read_wav_chunks(path)
+        features = extract_chunks(chunks, options.hop)
+    except (OSError, EOFError, ValueError, wave.Error) as e:
+        return path, None, 0.0, str(e) or type(e).__name__
+
+    rows = np.empty(len(features), dtype=DATASET_ROW_DTYPE)
+    rows['features'] = features
+    # Like the device's millis(), but counted from the start of the recording
+    rows['timestamp'] = (np.arange(len(features)) * options.hop * 1000 // SAMPLE_RATE).astype(np.uint32)
+    if _classifier is not None:
+        rows['label'], _ = _classifier.predict(features)
+    elif options.label_from_dir:
+        rows['label'] = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    else:
+        rows['label'] = options.label or UNKNOWN_LABEL
+    return path, rows, duration, ""
+
+
+def _extract_csv(path: str, options: ExtractOptions) -> Tuple[str, Optional[str], int, float, str]:
+    """Pool task: extract_file with the CSV formatting done in the worker too"""
+    path, rows, duration, error = extract_file(path, options)
+    if rows is None:
+        return path, None, 0, 0.0, error
+    return path, format_dataset_rows(rows), len(rows), duration, error
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Extract ESP32 Noise Logger features from recordings")
+    parser.add_argument('inputs', nargs='+', help="WAV/raw files or directories to search")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--output', help="write every frame to one CSV file")
+    output.add_argument('--output-dir', help="write one CSV file per recording")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--hop', default='device',
+                        help="samples between frames, or 'device' for one frame per classification interval")
+    parser.add_argument('--raw-rate', type=int, default=SAMPLE_RATE, help="sample rate of raw int16 files")
+    labels = parser.add_mutually_exclusive_group()
+    labels.add_argument('--label', help="label every frame with this")
+    labels.add_argument('--label-from-dir', action='store_true', help="label frames with their directory name")
+    labels.add_argument('--classify', metavar='DATASET_CSV', help="label frames by KNN against a training dataset")
+    parser.add_argument('--scaler', metavar='SCALER_JSON',
+                        help="with --classify, measure distances with a scaler from feature_scaling.py")
+    args = parser.parse_args(argv)
+    if args.scaler and not args.classify:
+        parser.error("--scaler needs --classify")
+
+    hop = DEVICE_HOP if args.hop == 'device' else int(args.hop)
+    options = ExtractOptions(hop, args.raw_rate, args.label, args.label_from_dir)
+    files = find_recordings(args.inputs)
+    if not files:
+        print("No recordings found.")
+        return 1
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    # One BLAS thread per worker; the pool provides the parallelism. Spawned
+    # workers import NumPy fresh, so they pick this up.
+    for variable in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ.setdefault(variable, '1')
+
+    start = time.perf_counter()
+    total_audio = 0.0
+    total_frames = 0
+    failures = 0
+    used_names: Set[str] = set()
+    combined = open(args.output, 'w', encoding='utf-8') if args.output else None
+    try:
+        if combined:
+            combined.write(','.join(DATASET_CSV_HEADER) + '\n')
+        with ProcessPoolExecutor(max_workers=max(1, args.workers),
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(args.classify, args.scaler)) as pool:
+            results = pool.map(_extract_csv, files, [options] * len(files))
+            for i, (path, text, frames, duration, error) in enumerate(results, 1):
+                if text is None:
+                    failures += 1
+                    print(f"[{i}/{len(files)}] {path}: skipped ({error})", file=sys.stderr)
+                    continue
+                if combined:
+                    combined.write(text)
+                else:
+                    stem = os.path.splitext(os.path.basename(path))[0]
+                    name, n = f"{stem}.csv", 1
+                    while name in used_names:  # Same file name in different directories
+                        n += 1
+                        name = f"{stem}_{n}.csv"
+                    used_names.add(name)
+                    with open(os.path.join(args.output_dir, name), 'w', encoding='utf-8') as f:
+                        f.write(','.join(DATASET_CSV_HEADER) + '\n')
+                        f.write(text)
+                total_audio += duration
+                total_frames += frames
+                print(f"[{i}/{len(files)}] {path}: {frames} frames", file=sys.stderr)
+    finally:
+        if combined:
+            combined.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Extracted {total_frames} frames from {total_audio / 3600:.2f} h of audio in {elapsed:.1f}s "
+          f"({total_audio / max(elapsed, 1e-9):,.0f}x real time), {failures} files skipped")
+    return 1 if failures == len(files) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
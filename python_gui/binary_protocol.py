@@ -0,0 +1,230 @@
+"""
+Binary framing for FEATURES, the opt-in alternative to the text lines.
+
+After SET_MODE:BINARY (answered with OK:MODE_BINARY) the firmware sends each
+classification as a fixed 39-byte little-endian frame instead of a ~70 byte
+FEATURES line; every other message stays text. SET_MODE:TEXT switches
+back, and the board always boots in text mode.
+
+    offset  size  field
+         0     2  sync bytes 0xAA 0x55
+         2     1  frame type (1 = features)
+         3     1  sequence number, wrapping at 256
+         4    28  7 x float32 features in FEATURE_NAMES order
+        32     1  class id: index into DATASET_LABELS, 255 for any other label
+        33     4  float32 confidence
+        37     2  CRC-16/CCITT-FALSE of bytes 2..36
+
+The firmware writes frames only between text lines, so FrameDecoder can
+split a mixed stream without escaping: a sync byte where a line would
+start begins a frame, while one inside a line (0xAA is also a UTF-8
+continuation byte, e.g. in a label like 'ê' echoed by a [DEBUG] line) only
+does if a whole frame with a valid CRC follows. It checks the CRC of each
+frame in a run of back-to-back frames (binascii.crc_hqx is this CRC),
+converts the whole run with one np.frombuffer call, and returns the text
+lines in between for the existing line parser.
+"""
+import re
+import struct
+from binascii import crc_hqx
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import serial
+
+try:
+    from .protocol import DATASET_LABELS, FEATURE_DTYPE, MESSAGE_KINDS, NUM_FEATURES
+except ImportError:  # Running as a script from the python_gui directory
+    from protocol import DATASET_LABELS, FEATURE_DTYPE, MESSAGE_KINDS, NUM_FEATURES
+
+BINARY_MODE_COMMAND = 'SET_MODE:BINARY'
+TEXT_MODE_COMMAND = 'SET_MODE:TEXT'
+BINARY_MODE_RESPONSE = 'OK:MODE_BINARY'
+TEXT_MODE_RESPONSE = 'OK:MODE_TEXT'
+
+SYNC = b'\xaa\x55'
+FRAME_TYPE_FEATURES = 1
+OTHER_CLASS_ID = 255
+OTHER_CLASS_LABEL = 'unknown'
+
+FRAME_DTYPE = np.dtype([
+    ('sync', '<u2'),
+    ('type', 'u1'),
+    ('seq', 'u1'),
+    ('features', '<f4', (NUM_FEATURES,)),
+    ('class_id', 'u1'),
+    ('confidence', '<f4'),
+    ('crc', '<u2'),
+])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+_SYNC_WORD = int.from_bytes(SYNC, 'little')
+_HEADER = SYNC + bytes([FRAME_TYPE_FEATURES])
+_CRC_START = 2
+_CRC_END = FRAME_SIZE - 2
+_MESSAGE_TAG = re.compile('|'.join(f'{kind}:' for kind in sorted(MESSAGE_KINDS)))
+_FRAME_STRUCT = struct.Struct(f'<2sBB{NUM_FEATURES}fBf')  # Everything but the CRC
+
+# Label for every class id
+CLASS_LABELS = np.full(256, OTHER_CLASS_LABEL, dtype=FEATURE_DTYPE['label'])
+CLASS_LABELS[:len(DATASET_LABELS)] = DATASET_LABELS
+
+
+def crc16(data: bytes) -> int:
+    """CRC-16/CCITT-FALSE (polynomial 0x1021, initial value 0xFFFF), as crc16_ccitt in the firmware"""
+    return crc_hqx(data, 0xFFFF)
+
+
+def class_id(label: str) -> int:
+    return DATASET_LABELS.index(label) if label in DATASET_LABELS else OTHER_CLASS_ID
+
+
+def encode_frame(features: Sequence[float], label: str, confidence: float, seq: int = 0) -> bytes:
+    """One frame exactly as SerialProtocol::send_features_binary writes it"""
+    body = _FRAME_STRUCT.pack(SYNC, FRAME_TYPE_FEATURES, seq & 0xFF, *features, class_id(label), confidence)
+    return body + struct.pack('<H', crc16(body[_CRC_START:]))
+
+
+def encode_frames(features: np.ndarray, labels: Sequence[str], confidence: np.ndarray, seq: int = 0) -> bytes:
+    """Frames for a batch of classifications, numbered from seq"""
+    frames = np.zeros(len(features), dtype=FRAME_DTYPE)
+    frames['sync'] = _SYNC_WORD
+    frames['type'] = FRAME_TYPE_FEATURES
+    frames['seq'] = (seq + np.arange(len(features))) & 0xFF
+    frames['features'] = features
+    frames['class_id'] = [class_id(str(label)) for label in labels]
+    frames['confidence'] = confidence
+    raw = frames.tobytes()
+    frames['crc'] = [crc16(raw[offset + _CRC_START:offset + _CRC_END])
+                     for offset in range(0, len(raw), FRAME_SIZE)]
+    return frames.tobytes()
+
+
+def frames_to_records(frames: np.ndarray) -> np.ndarray:
+    """Convert FRAME_DTYPE frames to the FEATURE_DTYPE records parse_chunk returns"""
+    records = np.empty(len(frames), dtype=FEATURE_DTYPE)
+    records['features'] = frames['features']
+    records['label'] = CLASS_LABELS[frames['class_id']]
+    records['confidence'] = frames['confidence']
+    return records
+
+
+def _frame_at(buffer: bytearray, pos: int) -> Optional[bool]:
+    """Whether a valid frame starts at pos, None if the bytes so far fit but the frame is incomplete"""
+    available = min(len(buffer) - pos, FRAME_SIZE)
+    if buffer[pos:pos + min(available, len(_HEADER))] != _HEADER[:available]:
+        return False
+    if available < FRAME_SIZE:
+        return None
+    return (crc_hqx(bytes(buffer[pos + _CRC_START:pos + _CRC_END]), 0xFFFF)
+            == buffer[pos + _CRC_END] | (buffer[pos + _CRC_END + 1] << 8))
+
+
+class FrameDecoder:
+    """Split a byte stream of binary frames and text lines"""
+
+    def __init__(self, max_line_length: int = 4096) -> None:
+        self.max_line_length = max_line_length
+        self.crc_errors = 0       # Frames rejected by the sync, type or CRC check
+        self.lost_frames = 0      # Gaps in the sequence numbers, e.g. from UART overruns
+        self._last_seq: Optional[int] = None
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> Tuple[np.ndarray, List[str]]:
+        """Append raw bytes and return the complete frames (as FEATURE_DTYPE records) and text lines"""
+        buffer = self._buffer
+        buffer += data
+        runs: List[np.ndarray] = []
+        lines: List[str] = []
+        pos = 0
+        next_sync = buffer.find(SYNC[:1])
+        while pos < len(buffer):
+            if next_sync == pos:
+                if len(buffer) - pos < FRAME_SIZE:
+                    if len(buffer) - pos >= 2 and buffer[pos + 1] != SYNC[1]:
+                        pos += 1  # Not a frame after all
+                        next_sync = buffer.find(SYNC[:1], pos)
+                        continue
+                    break  # Wait for the rest of the frame
+                frames = self._decode_run(buffer, pos)
+                if len(frames):
+                    self._count_lost(frames['seq'])
+                    runs.append(frames)
+                    pos += len(frames) * FRAME_SIZE
+                else:
+                    self.crc_errors += 1
+                    pos += 1  # Resynchronize on the next sync byte
+                next_sync = buffer.find(SYNC[:1], pos)
+                continue
+
+            end = buffer.find(b'\n', pos)
+            # Skip sync bytes inside the line that do not start a valid frame
+            while 0 <= next_sync and (end < 0 or next_sync < end) and _frame_at(buffer, next_sync) is False:
+                next_sync = buffer.find(SYNC[:1], next_sync + 1)
+            if 0 <= next_sync and (end < 0 or next_sync < end):
+                if _frame_at(buffer, next_sync) is None:
+                    break  # Wait for the rest of the frame
+                pos = next_sync  # Text cut short by a frame: drop it
+                continue
+            if end < 0:
+                if len(buffer) - pos > self.max_line_length:
+                    pos = len(buffer)  # No terminator in sight - drop the garbage
+                break
+            line = buffer[pos:end].decode('utf-8', errors='ignore').strip()
+            if line and not line.isprintable():
+                # Prefixed by the tail of a corrupted frame: keep the message, if any
+                match = _MESSAGE_TAG.search(line)
+                line = line[match.start():] if match else ''
+            if line:
+                lines.append(line)
+                if line == BINARY_MODE_RESPONSE:
+                    self._last_seq = None  # The firmware numbers frames from 0 again
+            pos = end + 1
+            if next_sync < pos:
+                next_sync = buffer.find(SYNC[:1], pos)
+        del buffer[:pos]
+
+        if not runs:
+            return np.empty(0, dtype=FEATURE_DTYPE), lines
+        frames = np.concatenate(runs) if len(runs) > 1 else runs[0]
+        return frames_to_records(frames), lines
+
+    def _decode_run(self, buffer: bytearray, pos: int) -> np.ndarray:
+        """Decode the valid frames starting at pos, up to the first one that is not"""
+        count = (len(buffer) - pos) // FRAME_SIZE
+        data = bytes(buffer[pos:pos + count * FRAME_SIZE])  # A copy, so the buffer can still be resized
+        end = 0
+        while end < len(data):
+            if (data[end:end + 3] != _HEADER
+                    or crc_hqx(data[end + _CRC_START:end + _CRC_END], 0xFFFF)
+                    != data[end + _CRC_END] | (data[end + _CRC_END + 1] << 8)):
+                break
+            end += FRAME_SIZE
+        return np.frombuffer(data, dtype=FRAME_DTYPE, count=end // FRAME_SIZE)
+
+    def _count_lost(self, seq: np.ndarray) -> None:
+        previous = np.concatenate([[self._last_seq if self._last_seq is not None else int(seq[0]) - 1], seq[:-1]])
+        self.lost_frames += int(((seq.astype(np.int16) - previous - 1) & 0xFF).sum())
+        self._last_seq = int(seq[-1])
+
+    def reset(self) -> None:
+        """Discard partial input and forget the sequence number, e.g. after a reboot"""
+        self._buffer.clear()
+        self._last_seq = None
+
+
+class FrameReader:
+    """SerialLineReader counterpart for a port that may send binary frames"""
+
+    def __init__(self, port: serial.Serial, max_line_length: int = 4096) -> None:
+        self.port = port
+        self.decoder = FrameDecoder(max_line_length)
+
+    def read(self) -> Tuple[np.ndarray, List[str]]:
+        """Block until data is available and return every complete frame and line received"""
+        chunk = self.port.read(max(1, self.port.in_waiting))
+        if not chunk:
+            return np.empty(0, dtype=FEATURE_DTYPE), []
+        waiting = self.port.in_waiting
+        if waiting:
+            chunk += self.port.read(waiting)
+        return self.decoder.feed(chunk)
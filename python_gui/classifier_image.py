@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+The /classifier_data.bin file KNNClassifier::save_to_storage writes to SPIFFS.
+
+The file is a native int sample count followed by that many raw
+LabeledSample structs. On the ESP32 (little-endian, 4-byte int and
+unsigned long) a LabeledSample is 7 floats, a char[20] label and the
+timestamp, 52 bytes with no padding.
+
+Images are memory-mapped, so inspecting or converting a directory of
+images pulled from the field reads only the pages it touches, and every
+conversion works on whole arrays. check_image reports what
+load_from_storage would make of a damaged file: it clamps the count to
+MAX_SAMPLES and zero-fills records the file is too short to hold.
+
+    python python_gui/classifier_image.py info pulls/*.bin
+    python python_gui/classifier_image.py convert classifier_data.bin dataset.csv
+    python python_gui/classifier_image.py convert dataset.csv classifier_data.bin
+"""
+import argparse
+import os
+import sys
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .knn import MAX_SAMPLES
+    from .protocol import DATASET_ROW_DTYPE, MAX_LABEL_LENGTH, NUM_FEATURES, read_dataset_csv, write_dataset_csv
+except ImportError:  # Running as a script from the python_gui directory
+    from knn import MAX_SAMPLES
+    from protocol import DATASET_ROW_DTYPE, MAX_LABEL_LENGTH, NUM_FEATURES, read_dataset_csv, write_dataset_csv
+
+IMAGE_NAME = 'classifier_data.bin'
+IMAGE_EXTENSION = '.bin'
+COLUMNS_EXTENSION = '.npz'
+COUNT_DTYPE = np.dtype('<i4')
+
+# struct LabeledSample in KNNClassifier.h
+SAMPLE_DTYPE = np.dtype([
+    ('features', '<f4', (NUM_FEATURES,)),
+    ('label', f'S{MAX_LABEL_LENGTH}'),          # UTF-8, NUL terminated
+    ('timestamp', '<u4'),                      # millis() when the sample was labeled
+])
+assert SAMPLE_DTYPE.itemsize == 52
+
+
+class ImageHeader(NamedTuple):
+    count: int      # As stored in the file
+    loaded: int     # Samples load_from_storage keeps after clamping to MAX_SAMPLES
+    available: int  # Complete records actually present in the file
+
+
+def read_header(path: str) -> ImageHeader:
+    """Read the sample count and work out how much of it the file holds"""
+    size = os.path.getsize(path)
+    if size < COUNT_DTYPE.itemsize:
+        return ImageHeader(0, 0, 0)
+    count = int(np.fromfile(path, dtype=COUNT_DTYPE, count=1)[0])
+    available = (size - COUNT_DTYPE.itemsize) // SAMPLE_DTYPE.itemsize
+    return ImageHeader(count, min(count, MAX_SAMPLES), available)
+
+
+def check_image(path: str) -> List[str]:
+    """Problems load_from_storage would run into with this file, empty if none"""
+    size = os.path.getsize(path)
+    if size < COUNT_DTYPE.itemsize:
+        return [f"file is {size} bytes, too short for the sample count"]
+    header = read_header(path)
+    problems = []
+    if header.count < 0:
+        problems.append(f"sample count {header.count} is negative; the device cannot load this")
+    elif header.count > MAX_SAMPLES:
+        problems.append(f"sample count {header.count} is clamped to {MAX_SAMPLES}")
+    if 0 <= header.loaded and header.available < header.loaded:
+        problems.append(f"only {header.available} of {header.loaded} samples are in the file; "
+                        f"the rest load as empty samples")
+    extra = size - COUNT_DTYPE.itemsize - max(header.count, 0) * SAMPLE_DTYPE.itemsize
+    if extra > 0:
+        problems.append(f"{extra} bytes after the last sample are ignored")
+    return problems
+
+
+def map_image(path: str) -> np.ndarray:
+    """Memory-map the complete samples load_from_storage would read, as read-only SAMPLE_DTYPE records"""
+    header = read_header(path)
+    count = max(0, min(header.loaded, header.available))
+    if count == 0:
+        return np.empty(0, dtype=SAMPLE_DTYPE)
+    return np.memmap(path, dtype=SAMPLE_DTYPE, mode='r', offset=COUNT_DTYPE.itemsize, shape=(count,))
+
+
+def to_samples(rows: np.ndarray) -> np.ndarray:
+    """Convert DATASET_ROW_DTYPE records into LabeledSample structs"""
+    samples = np.zeros(len(rows), dtype=SAMPLE_DTYPE)
+    samples['features'] = rows['features']
+    # Cut to 19 bytes like the strncpy in add_sample, leaving room for the NUL
+    samples['label'] = np.char.encode(rows['label'], 'utf-8').astype(f'S{MAX_LABEL_LENGTH - 1}')
+    samples['timestamp'] = rows['timestamp']
+    return samples
+
+
+def from_samples(samples: np.ndarray) -> np.ndarray:
+    """Convert LabeledSample structs into DATASET_ROW_DTYPE records"""
+    # Whatever follows the first NUL is not part of the C string
+    raw = np.ascontiguousarray(samples['label']).view(np.uint8).reshape(len(samples), MAX_LABEL_LENGTH).copy()
+    raw[np.cumsum(raw == 0, axis=1) > 0] = 0
+    rows = np.empty(len(samples), dtype=DATASET_ROW_DTYPE)
+    rows['features'] = samples['features']
+    rows['label'] = np.char.decode(raw.view(f'S{MAX_LABEL_LENGTH}').ravel(), 'utf-8', 'replace')
+    rows['timestamp'] = samples['timestamp']
+    return rows
+
+
+def write_image(path: str, rows: np.ndarray) -> None:
+    """Write DATASET_ROW_DTYPE records as a classifier_data.bin image"""
+    if len(rows) > MAX_SAMPLES:
+        raise ValueError(f"{len(rows)} samples, but the device loads at most {MAX_SAMPLES}")
+    samples = to_samples(rows)
+    with open(path, 'wb') as f:
+        f.write(np.array(len(samples), dtype=COUNT_DTYPE).tobytes())
+        f.write(samples.tobytes())
+
+
+def read_image(path: str) -> np.ndarray:
+    """Read a classifier_data.bin image into DATASET_ROW_DTYPE records"""
+    return from_samples(map_image(path))
+
+
+def write_columns(path: str, rows: np.ndarray) -> None:
+    """Save DATASET_ROW_DTYPE records as one array per column in an .npz file"""
+    np.savez(path, features=rows['features'], label=rows['label'], timestamp=rows['timestamp'])
+
+
+def read_columns(path: str) -> np.ndarray:
+    """Load DATASET_ROW_DTYPE records saved by write_columns"""
+    with np.load(path) as columns:
+        rows = np.empty(len(columns['label']), dtype=DATASET_ROW_DTYPE)
+        for name in DATASET_ROW_DTYPE.names:
+            rows[name] = columns[name]
+    return rows
+
+
+def read_rows(path: str) -> Tuple[np.ndarray, List[str]]:
+    """Load a dataset from an image, an .npz or a CSV file by extension, with any malformed CSV rows"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == IMAGE_EXTENSION:
+        return read_image(path), []
+    if extension == COLUMNS_EXTENSION:
+        return read_columns(path), []
+    return read_dataset_csv(path)
+
+
+def write_rows(path: str, rows: np.ndarray) -> None:
+    """Save a dataset as an image, an .npz or a CSV file by extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == IMAGE_EXTENSION:
+        write_image(path, rows)
+    elif extension == COLUMNS_EXTENSION:
+        write_columns(path, rows)
+    else:
+        write_dataset_csv(path, rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect and convert classifier_data.bin images")
+    commands = parser.add_subparsers(dest='command', required=True)
+    info = commands.add_parser('info', help="sample and label counts, and any problems, of images")
+    info.add_argument('images', nargs='+')
+    convert = commands.add_parser('convert', help="convert between .bin images, .npz columns and CSV")
+    convert.add_argument('source')
+    convert.add_argument('destination')
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        rows, malformed = read_rows(args.source)
+        if malformed:
+            print(f"[WARN] Skipping {len(malformed)} malformed rows")
+        try:
+            write_rows(args.destination, rows)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            return 1
+        print(f"Wrote {len(rows)} samples to {args.destination}")
+        return 0
+
+    failed = False
+    for path in args.images:
+        problems = check_image(path)
+        samples = map_image(path)
+        labels, counts = np.unique(from_samples(samples)['label'], return_counts=True)
+        print(f"{path}: {len(samples)} samples" + "".join(f", {label} {count}" for label, count in zip(labels, counts)))
+        for problem in problems:
+            print(f"  [WARN] {problem}")
+        failed = failed or bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
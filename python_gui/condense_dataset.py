@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Compile a large labeled dataset into a classifier_data.bin for the device.
+
+The firmware keeps at most MAX_SAMPLES samples and classifies by brute
+force over all of them, so a pooled host dataset has to be reduced before
+it is pushed. Every method works in the space the firmware's
+compute_distance measures (spectral_centroid / 1000) and picks real
+samples, never synthetic averages:
+
+- kmeans: per class, k-means with k = the class's share of the budget,
+  keeping the sample nearest to each center
+- cnn: Hart's condensed nearest neighbor, keeping only the samples needed
+  to classify the rest correctly by 1-NN, then k-means if a class is
+  still over its share
+- random: a random subset per class, as a baseline
+
+--edit first drops samples their K_VALUE nearest neighbors outvote (Wilson's
+edited nearest neighbor), which removes mislabeled frames and class overlap.
+The accuracy lost is measured on a held-out part of the data, classifying
+it with the device's K against the full and the condensed training sets.
+
+    python python_gui/condense_dataset.py master_dataset.csv --output classifier_data.bin --edit
+"""
+import argparse
+import sys
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+try:
+    from .classifier_image import read_rows, write_image
+    from .knn import K_VALUE, MAX_SAMPLES, KNNClassifier, scale_features
+except ImportError:  # Running as a script from the python_gui directory
+    from classifier_image import read_rows, write_image
+    from knn import K_VALUE, MAX_SAMPLES, KNNClassifier, scale_features
+
+METHODS = ('kmeans', 'cnn', 'random')
+
+
+class CondenseReport(NamedTuple):
+    train_size: int
+    kept: int
+    full_accuracy: float
+    condensed_accuracy: float
+
+
+def _squared_distances(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    return ((points ** 2).sum(axis=1)[:, None] - 2 * points @ centers.T + (centers ** 2).sum(axis=1)[None, :])
+
+
+def kmeans_select(points: np.ndarray, count: int, rng: np.random.Generator, iterations: int = 50) -> np.ndarray:
+    """Indices of count distinct points nearest to the centers of a k-means clustering"""
+    if count >= len(points):
+        return np.arange(len(points))
+    if count <= 0:
+        return np.empty(0, dtype=np.intp)
+    # k-means++ seeding
+    centers = [points[rng.integers(len(points))]]
+    closest = ((points - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, count):
+        total = closest.sum()
+        choice = rng.choice(len(points), p=closest / total) if total > 0 else rng.integers(len(points))
+        centers.append(points[choice])
+        np.minimum(closest, ((points - points[choice]) ** 2).sum(axis=1), out=closest)
+    center_array = np.array(centers)
+
+    for _ in range(iterations):
+        assignment = _squared_distances(points, center_array).argmin(axis=1)
+        sums = np.zeros_like(center_array)
+        np.add.at(sums, assignment, points)
+        sizes = np.bincount(assignment, minlength=count)
+        moved = np.where(sizes[:, None] > 0, sums / np.maximum(sizes, 1)[:, None], center_array)
+        if np.allclose(moved, center_array):
+            break
+        center_array = moved
+
+    # Snap every center to its nearest sample, each sample used once
+    dist = _squared_distances(points, center_array)
+    chosen: List[int] = []
+    taken = np.zeros(len(points), dtype=bool)
+    for center in np.argsort(dist.min(axis=0)):
+        order = np.argsort(dist[:, center])
+        chosen.append(int(order[np.argmax(~taken[order])]))
+        taken[chosen[-1]] = True
+    return np.sort(np.array(chosen))
+
+
+def condensed_nn(points: np.ndarray, class_ids: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Indices kept by Hart's condensed nearest neighbor, in a random visiting order"""
+    order = rng.permutation(len(points))
+    store = [int(order[np.argmax(class_ids[order] == c)]) for c in np.unique(class_ids)]
+    in_store = np.zeros(len(points), dtype=bool)
+    in_store[store] = True
+    store_points = np.empty_like(points)
+    store_points[:len(store)] = points[store]
+    store_ids = np.empty_like(class_ids)
+    store_ids[:len(store)] = class_ids[store]
+    changed = True
+    while changed:
+        changed = False
+        for i in order[~in_store[order]]:
+            size = len(store)
+            nearest = int(((store_points[:size] - points[i]) ** 2).sum(axis=1).argmin())
+            if store_ids[nearest] != class_ids[i]:
+                store.append(int(i))
+                in_store[i] = True
+                store_points[size] = points[i]
+                store_ids[size] = class_ids[i]
+                changed = True
+    return np.sort(np.array(store))
+
+
+def edited_nn(points: np.ndarray, class_ids: np.ndarray, k: int = K_VALUE) -> np.ndarray:
+    """Indices of samples whose k nearest other samples vote for their own class"""
+    keep = np.zeros(len(points), dtype=bool)
+    classes = int(class_ids.max()) + 1
+    for start in range(0, len(points), 512):
+        block = slice(start, start + 512)
+        dist = _squared_distances(points[block], points)
+        dist[np.arange(len(dist)), np.arange(start, start + len(dist))] = np.inf  # Not its own neighbor
+        neighbors = np.argpartition(dist, min(k, len(points) - 1) - 1, axis=1)[:, :k]
+        votes = np.zeros((len(dist), classes), dtype=np.int32)
+        rows = np.arange(len(dist))
+        for j in range(neighbors.shape[1]):
+            votes[rows, class_ids[neighbors[:, j]]] += 1
+        keep[block] = votes.argmax(axis=1) == class_ids[block]
+    return np.flatnonzero(keep)
+
+
+def condense(rows: np.ndarray, budget: int = MAX_SAMPLES, method: str = 'kmeans', edit: bool = False,
+             seed: int = 0) -> np.ndarray:
+    """Reduce DATASET_ROW_DTYPE rows to at most budget rows, split evenly between the classes"""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, not {method!r}")
+    rng = np.random.default_rng(seed)
+    points = scale_features(rows['features'])
+    classes, class_ids = np.unique(rows['label'], return_inverse=True)
+    candidates = np.arange(len(rows))
+    if edit and len(rows) > K_VALUE:
+        edited = edited_nn(points, class_ids)
+        # Never let editing remove a class entirely
+        if len(np.unique(class_ids[edited])) == len(classes):
+            candidates = edited
+    if method == 'cnn':
+        candidates = candidates[condensed_nn(points[candidates], class_ids[candidates], rng)]
+
+    # Classes smaller than their share leave the rest of the budget to the others
+    sizes = np.bincount(class_ids[candidates], minlength=len(classes))
+    shares = np.zeros(len(classes), dtype=np.int64)
+    remaining = budget
+    open_classes = np.count_nonzero(sizes)
+    for c in np.argsort(sizes, kind='stable'):
+        if sizes[c]:
+            shares[c] = min(sizes[c], remaining // open_classes)
+            remaining -= shares[c]
+            open_classes -= 1
+
+    selected = []
+    for c in range(len(classes)):
+        members = candidates[class_ids[candidates] == c]
+        if method == 'random':
+            picked = rng.choice(members, shares[c], replace=False) if shares[c] < len(members) else members
+        else:
+            picked = members[kmeans_select(points[members], int(shares[c]), rng)]
+        selected.append(picked)
+    # Oldest first, as the device stores them
+    keep = np.concatenate(selected)
+    return rows[keep[np.argsort(rows['timestamp'][keep], kind='stable')]]
+
+
+def accuracy(train: np.ndarray, test: np.ndarray, k: int = K_VALUE) -> float:
+    predicted, _ = KNNClassifier(k=k).fit(train['features'], train['label'].tolist()).predict(test['features'])
+    return float((predicted == test['label']).mean()) if len(test) else 0.0
+
+
+def evaluate(rows: np.ndarray, budget: int = MAX_SAMPLES, method: str = 'kmeans', edit: bool = False,
+             test_fraction: float = 0.2, seed: int = 0) -> CondenseReport:
+    """Condense a random training part of rows and compare accuracy on the rest"""
+    order = np.random.default_rng(seed).permutation(len(rows))
+    split = int(len(rows) * (1 - test_fraction))
+    train, test = rows[np.sort(order[:split])], rows[order[split:]]
+    condensed = condense(train, budget, method, edit, seed)
+    return CondenseReport(len(train), len(condensed), accuracy(train, test), accuracy(condensed, test))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Reduce a labeled dataset to the device's sample budget")
+    parser.add_argument('datasets', nargs='+', help="dataset CSVs, .npz files or classifier_data.bin images to pool")
+    parser.add_argument('--output', default='classifier_data.bin', help="classifier_data.bin image to write")
+    parser.add_argument('--budget', type=int, default=MAX_SAMPLES, help="samples to keep in total")
+    parser.add_argument('--method', choices=METHODS, default='kmeans')
+    parser.add_argument('--edit', action='store_true', help="drop samples outvoted by their neighbors first")
+    parser.add_argument('--test-fraction', type=float, default=0.2, help="share of the data held out to measure accuracy")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    if not 0 < args.budget <= MAX_SAMPLES:
+        parser.error(f"--budget must be between 1 and {MAX_SAMPLES}, the device keeps no more")
+
+    pooled = []
+    for path in args.datasets:
+        rows, malformed = read_rows(path)
+        if malformed:
+            print(f"[WARN] {path}: skipping {len(malformed)} malformed rows")
+        pooled.append(rows)
+    rows = np.concatenate(pooled)
+    if not len(rows):
+        print("No samples to condense.")
+        return 1
+
+    if args.test_fraction > 0 and len(rows) * args.test_fraction >= 1:
+        report = evaluate(rows, args.budget, args.method, args.edit, args.test_fraction, args.seed)
+        print(f"Held-out accuracy: {report.full_accuracy:.1%} with all {report.train_size} samples, "
+              f"{report.condensed_accuracy:.1%} with {report.kept} "
+              f"({(report.full_accuracy - report.condensed_accuracy) * 100:.1f} points lost)")
+
+    condensed = condense(rows, args.budget, args.method, args.edit, args.seed)
+    write_image(args.output, condensed)
+    labels, counts = np.unique(condensed['label'], return_counts=True)
+    print(f"Wrote {len(condensed)} of {len(rows)} samples to {args.output}: "
+          + ", ".join(f"{label} {count}" for label, count in zip(labels, counts)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Incremental sync of the training sets stored on ESP32 Noise Loggers into one
+deduplicated master dataset on the host.
+
+DUMP_DATASET always sends every stored sample. Instead, the sync state
+remembers the newest sample seen from each device (its millis() timestamp
+and its row); the next sync asks the board where that sample is now
+(FIND_SAMPLE:<timestamp>, answered with SAMPLE_INDEX:<index>) and dumps
+only from there with DUMP_DATASET:<index>. This works while the board
+evicts old samples, since the index moves with the sample.
+
+Timestamps are only matched exactly, never compared, so millis() wrapping
+after 49.7 days or starting again at 0 after a reboot does not matter. The
+first dumped row must equal the remembered one; when it does not (the data
+was cleared, or the sample was lost in a reboot before SAVE_DATA) or the
+firmware predates FIND_SAMPLE, the whole set is dumped and rows already in
+the master are skipped.
+
+    python python_gui/dataset_sync.py --all-devices --master master_dataset.csv
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+import serial
+
+try:
+    from .ports import device_id, find_esp32_ports
+    from .protocol import (DATASET_CSV_HEADER, DATASET_ROW_DTYPE, format_dataset_rows, read_dataset_csv,
+                           split_message)
+    from .retrieve_esp32_dataset import TIMEOUT_SECONDS, open_port, stream_dataset
+    from .serial_reader import SerialLineReader
+except ImportError:  # Running as a script from the python_gui directory
+    from ports import device_id, find_esp32_ports
+    from protocol import (DATASET_CSV_HEADER, DATASET_ROW_DTYPE, format_dataset_rows, read_dataset_csv,
+                          split_message)
+    from retrieve_esp32_dataset import TIMEOUT_SECONDS, open_port, stream_dataset
+    from serial_reader import SerialLineReader
+
+FIND_TIMEOUT = 3.0
+
+
+class Anchor(NamedTuple):
+    timestamp: int  # millis() of the newest sample synced from the device
+    row: str        # That sample as format_dataset_rows prints it
+
+
+class SyncResult(NamedTuple):
+    transferred: int   # Rows sent by the device
+    added: int         # Rows that were not in the master yet
+    incremental: bool  # False if the whole training set had to be dumped
+
+
+def _print(message: str) -> None:
+    print(message, flush=True)
+
+
+def load_anchors(path: str) -> Dict[str, Anchor]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            devices = json.load(f).get('devices', {})
+        return {device: Anchor(int(entry['timestamp']), str(entry['row'])) for device, entry in devices.items()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return {}
+
+
+def save_anchors(path: str, anchors: Dict[str, Anchor]) -> None:
+    """Write the state to a temporary file first, so a crash cannot leave half a file"""
+    state = {'devices': {device: anchor._asdict() for device, anchor in sorted(anchors.items())}}
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def find_sample(ser: serial.Serial, timestamp: int, timeout: float = FIND_TIMEOUT) -> Optional[int]:
+    """Index of the newest sample stamped timestamp, None if there is none or the firmware cannot tell"""
+    ser.reset_input_buffer()
+    ser.write(f"FIND_SAMPLE:{timestamp}\n".encode())
+    reader = SerialLineReader(ser)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for line in reader.read_lines():
+            message = split_message(line)
+            if message.kind == 'SAMPLE_INDEX':
+                index = int(message.payload)
+                return index if index >= 0 else None
+            if message.kind == 'ERROR' and 'FIND_SAMPLE' in message.payload:
+                return None  # Firmware without FIND_SAMPLE
+    return None
+
+
+def dump_rows(ser: serial.Serial, start: int = 0, timeout: float = TIMEOUT_SECONDS) -> Optional[np.ndarray]:
+    """The samples from start on, or None if the dump was incomplete"""
+    batches: List[np.ndarray] = []
+    result = stream_dataset(ser, batches.append, start, timeout)
+    if not result.complete:
+        return None
+    return np.concatenate(batches) if batches else np.empty(0, dtype=DATASET_ROW_DTYPE)
+
+
+def fetch_new_rows(ser: serial.Serial, anchor: Optional[Anchor], timeout: float = TIMEOUT_SECONDS,
+                   log: Callable[[str], None] = _print) -> Tuple[Optional[np.ndarray], bool]:
+    """Rows added since anchor and whether only those were dumped; rows is None after a failed dump"""
+    if anchor is not None:
+        index = find_sample(ser, anchor.timestamp)
+        if index is not None:
+            rows = dump_rows(ser, index, timeout)
+            if rows is None:
+                return None, True
+            if len(rows) and format_dataset_rows(rows[:1]).strip() == anchor.row:
+                return rows[1:], True
+        log(f"{ser.port}: last synced sample not found, dumping everything")
+    return dump_rows(ser, 0, timeout), False
+
+
+class MasterDataset:
+    """Append-only dataset CSV that ignores rows it already holds"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._rows: Set[str] = set()
+        if os.path.exists(path):
+            rows, _ = read_dataset_csv(path)
+            self._rows.update(format_dataset_rows(rows).splitlines())
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(','.join(DATASET_CSV_HEADER) + '\n')
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, rows: np.ndarray) -> int:
+        """Append the rows not seen before and return how many there were"""
+        with self._lock:
+            new = []
+            for line in format_dataset_rows(rows).splitlines():
+                if line not in self._rows:
+                    self._rows.add(line)
+                    new.append(line + '\n')
+            if new:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.writelines(new)
+                    f.flush()
+                    os.fsync(f.fileno())
+            return len(new)
+
+
+class DatasetSync:
+    """Sync devices into a MasterDataset, keeping one Anchor per device in a JSON state file"""
+
+    def __init__(self, master: MasterDataset, state_path: str, retries: int = 2,
+                 timeout: float = TIMEOUT_SECONDS, log: Callable[[str], None] = _print) -> None:
+        self.master = master
+        self.state_path = state_path
+        self.retries = retries
+        self.timeout = timeout
+        self.log = log
+        self.anchors = load_anchors(state_path)
+        self._lock = threading.Lock()
+
+    def sync(self, port: str, full: bool = False) -> Optional[SyncResult]:
+        """Pull the samples the master is missing from the board on port; None on failure"""
+        device = device_id(port)
+        for attempt in range(self.retries + 1):
+            try:
+                # No DTR reset: it would drop the samples labeled since the last SAVE_DATA
+                with open_port(port, reset=False) as ser:
+                    rows, incremental = fetch_new_rows(ser, None if full else self.anchors.get(device),
+                                                       self.timeout, self.log)
+            except (serial.SerialException, OSError) as e:
+                self.log(f"{port}: serial error: {e}")
+                continue
+            if rows is None:
+                self.log(f"{port}: incomplete dump (attempt {attempt + 1} of {self.retries + 1})")
+                continue
+
+            added = self.master.add(rows)
+            with self._lock:
+                if len(rows):
+                    last = rows[-1:]
+                    self.anchors[device] = Anchor(int(last['timestamp'][0]), format_dataset_rows(last).strip())
+                elif not incremental:
+                    self.anchors.pop(device, None)  # The device is empty
+                save_anchors(self.state_path, self.anchors)
+            self.log(f"{port} ({device}): {len(rows)} rows transferred, {added} new"
+                     f"{'' if incremental else ' (full dump)'}")
+            return SyncResult(len(rows), added, incremental)
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Copy new training samples from ESP32 Noise Loggers "
+                                                 "into a master dataset")
+    parser.add_argument('--port', action='append', help="serial port; repeat for several devices")
+    parser.add_argument('--all-devices', action='store_true', help="every port that looks like an ESP32")
+    parser.add_argument('--master', default='master_dataset.csv', help="dataset CSV to add the samples to")
+    parser.add_argument('--state', help="sync state file (default: <master>.sync.json)")
+    parser.add_argument('--full', action='store_true', help="dump everything, ignoring the sync state")
+    parser.add_argument('--retries', type=int, default=2)
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_SECONDS, help="seconds without data before retrying")
+    parser.add_argument('--quiet', action='store_true', help="only report failures")
+    args = parser.parse_args(argv)
+
+    if not args.port and not args.all_devices:
+        parser.error("give --port or --all-devices")
+    ports = find_esp32_ports() if args.all_devices else args.port
+    if not ports:
+        print("No ESP32 found.")
+        return 1
+
+    log = (lambda message: None) if args.quiet else _print
+    master = MasterDataset(args.master)
+    syncer = DatasetSync(master, args.state or args.master + '.sync.json', args.retries, args.timeout, log)
+    with ThreadPoolExecutor(max_workers=len(ports)) as pool:
+        results = list(pool.map(lambda port: syncer.sync(port, args.full), ports))
+
+    for port, result in zip(ports, results):
+        if result is None:
+            print(f"[ERROR] {port}: sync failed")
+    log(f"{args.master}: {len(master)} samples")
+    return 0 if all(result is not None for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
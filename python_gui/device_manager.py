@@ -0,0 +1,165 @@
+"""
+Concurrent ingest from several ESP32 Noise Loggers on one host.
+
+Every open port gets its own SerialReaderThread. Each thread blocks in its
+own read, so a quiet or stalled board never delays the others, and hands
+the lines of every wakeup to one shared bounded queue as a DeviceBatch
+tagged with the device id. When the consumer falls behind, batches are
+dropped (and counted per device) after a short wait instead of stalling
+every reader behind the full queue.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import serial
+
+try:
+    from .ports import device_id, find_esp32_ports
+    from .serial_reader import SerialReaderThread
+except ImportError:  # Running as a script from the python_gui directory
+    from ports import device_id, find_esp32_ports
+    from serial_reader import SerialReaderThread
+
+logger = logging.getLogger("device_manager")
+
+
+class DeviceBatch(NamedTuple):
+    device: str       # Device id given to add_device, by default the port name
+    received: float   # time.time() when the lines were read
+    lines: List[str]
+
+
+def open_serial(port: str, baudrate: int) -> serial.Serial:
+    return serial.Serial(port, baudrate, timeout=1)
+
+
+class _Device:
+    def __init__(self, device_id: str, port: str, connection: serial.Serial) -> None:
+        self.id = device_id
+        self.port = port
+        self.connection = connection
+        self.reader: Optional[SerialReaderThread] = None
+        self.stats: Dict[str, int] = {'lines': 0, 'batches': 0, 'dropped_lines': 0}
+
+
+class DeviceManager:
+    """Read any number of ESP32 ports at once into a shared queue"""
+
+    def __init__(self, baudrate: int = 115200, queue_size: int = 4096, put_timeout: float = 0.05,
+                 open_port: Callable[[str, int], serial.Serial] = open_serial) -> None:
+        self.baudrate = baudrate
+        self.put_timeout = put_timeout
+        self.open_port = open_port
+        self.queue: queue.Queue[DeviceBatch] = queue.Queue(maxsize=queue_size)
+        self._devices: Dict[str, _Device] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def devices(self) -> List[str]:
+        with self._lock:
+            return list(self._devices)
+
+    @property
+    def ports(self) -> List[str]:
+        with self._lock:
+            return [device.port for device in self._devices.values()]
+
+    def add_device(self, port: str, device_id: Optional[str] = None) -> str:
+        """Open a port and start reading it; raises serial.SerialException if it cannot be opened"""
+        device_id = device_id or port
+        with self._lock:
+            if device_id in self._devices:
+                return device_id
+
+        device = _Device(device_id, port, self.open_port(port, self.baudrate))
+        device.reader = SerialReaderThread(device.connection,
+                                           on_lines=lambda lines: self._put(device, lines),
+                                           on_error=lambda error: self._failed(device, error))
+        with self._lock:
+            self._devices[device_id] = device
+        device.reader.start()
+        logger.info("Reading %s", device_id)
+        return device_id
+
+    def discover(self) -> List[str]:
+        """Open every port that looks like an ESP32 and is not open yet, returning the new device ids"""
+        open_ports = set(self.ports)
+        added = []
+        for port in find_esp32_ports(logger.debug):
+            if port in open_ports:
+                continue
+            try:
+                added.append(self.add_device(port, device_id(port)))
+            except (serial.SerialException, OSError) as e:
+                logger.warning("Cannot open %s: %s", port, e)
+        return added
+
+    def remove_device(self, device_id: str) -> None:
+        """Stop reading a device and close its port"""
+        with self._lock:
+            device = self._devices.pop(device_id, None)
+        if device is None:
+            return
+        if device.reader:
+            device.reader.stop()
+        device.connection.close()  # Wakes up the reader's blocking read
+        if device.reader and device.reader is not threading.current_thread():
+            device.reader.join(timeout=2.0)
+
+    def _put(self, device: _Device, lines: List[str]) -> None:
+        # Runs on the device's reader thread
+        device.stats['lines'] += len(lines)
+        device.stats['batches'] += 1
+        try:
+            self.queue.put(DeviceBatch(device.id, time.time(), lines), timeout=self.put_timeout)
+        except queue.Full:
+            device.stats['dropped_lines'] += len(lines)
+
+    def _failed(self, device: _Device, error: Exception) -> None:
+        logger.warning("%s disconnected: %s", device.id, error)
+        self.remove_device(device.id)
+
+    def get_batches(self, timeout: Optional[float] = None, max_batches: int = 1024) -> List[DeviceBatch]:
+        """Wait up to timeout for a batch, then return it with every other batch already queued"""
+        try:
+            batches = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batches) < max_batches:
+            try:
+                batches.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batches
+
+    def send(self, device_id: str, command: str) -> None:
+        """Send a command line to one device"""
+        with self._lock:
+            device = self._devices[device_id]
+        device.connection.write((command + "\n").encode())
+
+    def broadcast(self, command: str) -> None:
+        """Send a command line to every device, skipping ones that fail"""
+        for device_id in self.devices:
+            try:
+                self.send(device_id, command)
+            except (KeyError, serial.SerialException, OSError) as e:
+                logger.warning("Cannot send %s to %s: %s", command, device_id, e)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-device counters of lines read, batches queued and lines dropped"""
+        with self._lock:
+            return {device_id: dict(device.stats) for device_id, device in self._devices.items()}
+
+    def close(self) -> None:
+        for device_id in self.devices:
+            self.remove_device(device_id)
+
+    def __enter__(self) -> 'DeviceManager':
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Software stand-in for the ESP32 Noise Logger.
+
+Speaks the firmware's serial protocol (SerialProtocol::process_command):
+answers GET_STATUS, GET_FEATURES, LABEL:, CLEAR_DATA, SAVE_DATA, LOAD_DATA,
+GET_DATASET, DUMP_DATASET[:<start>], FIND_SAMPLE: and SET_MODE:, and sends
+unsolicited FEATURES (as text lines, or binary frames after SET_MODE:BINARY)
+at a configurable rate plus STATUS every few seconds. Labeled samples go into an
+in-memory training set that evicts the oldest sample beyond MAX_SAMPLES, and
+FEATURES are classified with the host KNN, so labels behave as on the device.
+
+On POSIX the emulator serves a pseudo terminal that the GUI, the headless
+logger and retrieve_esp32_dataset.py can open like a real port. Opening the
+port reboots the emulated board, as the DTR reset does on real hardware.
+In-process users can connect through EmulatedSerial instead.
+
+Usage:
+    python python_gui/esp32_emulator.py --rate 1000 --preload 500
+"""
+import argparse
+import errno
+import os
+import select
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional, Union
+
+import numpy as np
+
+try:
+    from .binary_protocol import (BINARY_MODE_COMMAND, BINARY_MODE_RESPONSE, TEXT_MODE_COMMAND,
+                                  TEXT_MODE_RESPONSE, encode_frames)
+    from .knn import MAX_SAMPLES, KNNClassifier
+    from .protocol import (DATASET_LABELS, DATASET_ROW_DTYPE, END_DATASET, NUM_FEATURES, READY_MESSAGE,
+                           format_dataset_rows, read_dataset_csv)
+except ImportError:  # Running as a script from the python_gui directory
+    from binary_protocol import (BINARY_MODE_COMMAND, BINARY_MODE_RESPONSE, TEXT_MODE_COMMAND,
+                                 TEXT_MODE_RESPONSE, encode_frames)
+    from knn import MAX_SAMPLES, KNNClassifier
+    from protocol import (DATASET_LABELS, DATASET_ROW_DTYPE, END_DATASET, NUM_FEATURES, READY_MESSAGE,
+                          format_dataset_rows, read_dataset_csv)
+
+FREE_HEAP = 250000  # Reported free heap with an empty training set
+SAMPLE_BYTES = 52   # sizeof(LabeledSample) on the ESP32
+
+# What the board sends: a text line (CRLF is added on the wire) or raw binary frames
+Output = Union[str, bytes]
+
+# Typical feature values per sound class: rms, zcr, centroid, low, mid, high, flux
+CLASS_PROFILES = np.array([
+    [0.080, 0.08, 1200.0, 40.0, 12.0, 3.0, 8.0],    # traffic
+    [0.060, 0.20, 3500.0, 15.0, 30.0, 10.0, 4.0],   # machinery
+    [0.040, 0.12, 2200.0, 10.0, 14.0, 2.0, 12.0],   # human
+    [0.010, 0.30, 5000.0, 1.0, 1.5, 1.2, 1.0],      # background
+    [0.050, 0.25, 6500.0, 6.0, 10.0, 18.0, 6.0],    # other
+], dtype=np.float32)
+
+
+def format_features(features: np.ndarray, labels: np.ndarray, confidence: np.ndarray) -> List[str]:
+    """Format FEATURES lines as SerialProtocol::send_features prints them"""
+    lines = []
+    for (rms, zcr, centroid, low, mid, high, flux), label, conf in zip(
+            features.tolist(), labels.tolist(), confidence.tolist()):
+        lines.append(f"FEATURES:{rms:.4f},{zcr:.4f},{centroid:.2f},{low:.4f},{mid:.4f},"
+                     f"{high:.4f},{flux:.4f},{label},{conf:.3f}")
+    return lines
+
+
+class FeatureSource:
+    """Synthetic feature frames that dwell on one sound class for a while"""
+
+    def __init__(self, seed: Optional[int] = None, mean_dwell: float = 200.0,
+                 replay: Optional[np.ndarray] = None) -> None:
+        self.rng = np.random.default_rng(seed)
+        self.switch_probability = 1.0 / mean_dwell
+        self.scene = 0
+        self.replay = replay  # Cycle through recorded features instead
+        self.position = 0
+
+    def next(self, count: int) -> np.ndarray:
+        """Return the next count frames as a (count, 7) float32 array"""
+        if self.replay is not None and len(self.replay):
+            indices = (self.position + np.arange(count)) % len(self.replay)
+            self.position = int(indices[-1] + 1) if count else self.position
+            return self.replay[indices]
+
+        # Each frame may switch scene; carry the latest switch forward
+        switches = self.rng.random(count) < self.switch_probability
+        scenes = np.where(switches, self.rng.integers(0, len(CLASS_PROFILES), count), -1)
+        positions = np.maximum.accumulate(np.where(switches, np.arange(count), -1))
+        labels = np.where(positions >= 0, scenes[np.maximum(positions, 0)], self.scene)
+        if count:
+            self.scene = int(labels[-1])
+        noise = self.rng.lognormal(0.0, 0.25, (count, NUM_FEATURES)).astype(np.float32)
+        return CLASS_PROFILES[labels] * noise
+
+
+class ESP32Emulator:
+    """Protocol state machine of one emulated board, independent of the transport"""
+
+    def __init__(self, rate: float = 1.0, status_interval: float = 5.0,
+                 max_samples: int = MAX_SAMPLES, source: Optional[FeatureSource] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.status_interval = status_interval
+        self.max_samples = max_samples
+        self.source = source or FeatureSource()
+        self.clock = clock
+        self.storage: Optional[np.ndarray] = None  # SPIFFS copy of the training set
+        self.frames_sent = 0
+        self._input = bytearray()
+        self.boot()
+
+    def boot(self) -> List[Output]:
+        """Restart the board: reset millis(), reload storage and return the boot messages"""
+        self.started = self.clock()
+        self.frame_clock = self.started
+        self.frames_due = 0.0
+        self.last_status = self.started
+        self.has_new_features = False
+        self.last_features = np.zeros(NUM_FEATURES, dtype=np.float32)
+        self.last_classification = 'unknown'
+        self.last_confidence = 0.0
+        self.binary_mode = False
+        self.frame_sequence = 0
+        self._input.clear()
+
+        lines = ["ESP32 Noise Logger Starting...", "Audio processor initialized"]
+        if self.storage is not None:
+            self._restore(self.storage)
+            lines.append(f"Loaded {len(self.classifier)} samples from storage")
+        else:
+            self._restore(np.empty(0, dtype=DATASET_ROW_DTYPE))
+            lines.append("No existing data found, starting fresh")
+        lines += [READY_MESSAGE, "Setup complete - ready for operation"]
+        return lines
+
+    def millis(self) -> int:
+        return int((self.clock() - self.started) * 1000) & 0xFFFFFFFF
+
+    def _restore(self, rows: np.ndarray) -> None:
+        self.classifier = KNNClassifier(max_samples=self.max_samples)
+        self.classifier.fit(rows['features'], rows['label'].tolist())
+        self.timestamps: Deque[int] = deque(rows['timestamp'].tolist()[-self.max_samples:],
+                                            maxlen=self.max_samples)
+
+    def training_rows(self) -> np.ndarray:
+        """The training set as DATASET_ROW_DTYPE records, oldest first"""
+        rows = np.empty(len(self.classifier), dtype=DATASET_ROW_DTYPE)
+        rows['features'] = self.classifier.features
+        rows['label'] = self.classifier.labels
+        rows['timestamp'] = list(self.timestamps)
+        return rows
+
+    def preload(self, count: int) -> None:
+        """Fill the training set with labeled synthetic samples"""
+        source = FeatureSource(seed=12345, mean_dwell=1.0)
+        ids = np.arange(count) % len(DATASET_LABELS)
+        noise = source.rng.lognormal(0.0, 0.25, (count, NUM_FEATURES)).astype(np.float32)
+        self.classifier.partial_fit(CLASS_PROFILES[ids] * noise, [DATASET_LABELS[i] for i in ids])
+        self.timestamps.extend([self.millis()] * count)
+
+    # --- Host to device -------------------------------------------------
+
+    def feed(self, data: bytes) -> List[Output]:
+        """Take bytes sent by the host and return the responses, like handle_input"""
+        responses: List[Output] = []
+        self._input += data
+        while True:
+            ends = [i for i in (self._input.find(b'\n'), self._input.find(b'\r')) if i >= 0]
+            if not ends:
+                break
+            end = min(ends)
+            command = self._input[:end].decode('utf-8', errors='ignore')
+            del self._input[:end + 1]
+            if command.strip():
+                responses += self.process_command(command)
+        return responses
+
+    def process_command(self, command: str) -> List[Output]:
+        """Answer one command exactly as SerialProtocol::process_command does"""
+        command = command.strip()
+        if command == 'GET_STATUS':
+            return [self.status_line()]
+        if command == 'GET_FEATURES':
+            if self.has_new_features:
+                return self.format_features(self.last_features[None, :], np.array([self.last_classification]),
+                                            np.array([self.last_confidence]))
+            return ["ERROR:No features available"]
+        if command.startswith('LABEL:'):
+            label = command[6:]
+            if label and self.has_new_features:
+                self.classifier.add_sample(self.last_features, label)
+                self.timestamps.append(self.millis())
+                return [f"LABELED:{label},{len(self.classifier)}", self.dataset_line()]
+            return ["ERROR:Invalid label or no features available"]
+        if command == 'CLEAR_DATA':
+            self._restore(np.empty(0, dtype=DATASET_ROW_DTYPE))
+            return ["OK:DATA_CLEARED"]
+        if command == 'SAVE_DATA':
+            self.storage = self.training_rows()
+            return ["OK:DATA_SAVED"]
+        if command == 'LOAD_DATA':
+            if self.storage is None:
+                return ["ERROR:Failed to load data"]
+            self._restore(self.storage)
+            return ["OK:DATA_LOADED"]
+        if command == 'GET_DATASET':
+            return [self.dataset_line()]
+        if command == 'DUMP_DATASET' or command.startswith('DUMP_DATASET:'):
+            rows = self.training_rows()
+            start = int(command[13:]) if command[13:].isdigit() else 0
+            return ([f"[DEBUG] DUMP_DATASET sample count: {len(rows)}"]
+                    + format_dataset_rows(rows[start:]).splitlines() + [END_DATASET])
+        if command.startswith('FIND_SAMPLE:'):
+            timestamp = int(command[12:]) if command[12:].isdigit() else 0
+            matches = [i for i, value in enumerate(self.timestamps) if value == timestamp]
+            return [f"SAMPLE_INDEX:{matches[-1] if matches else -1}"]
+        if command == BINARY_MODE_COMMAND:
+            self.binary_mode = True
+            self.frame_sequence = 0
+            return [BINARY_MODE_RESPONSE]
+        if command == TEXT_MODE_COMMAND:
+            self.binary_mode = False
+            return [TEXT_MODE_RESPONSE]
+        return [f"ERROR:Unknown command: {command}"]
+
+    def format_features(self, features: np.ndarray, labels: np.ndarray, confidence: np.ndarray) -> List[Output]:
+        """FEATURES lines, or one block of binary frames in binary mode"""
+        if not self.binary_mode:
+            return format_features(features, labels, confidence)
+        frames = encode_frames(features, labels.tolist(), confidence, self.frame_sequence)
+        self.frame_sequence = (self.frame_sequence + len(features)) & 0xFF
+        return [frames]
+
+    def status_line(self) -> str:
+        free_heap = FREE_HEAP - SAMPLE_BYTES * len(self.classifier)
+        return f"STATUS:{len(self.classifier)},{self.millis()},{free_heap}"
+
+    def dataset_line(self) -> str:
+        labels = self.classifier.labels
+        counts = ','.join(str(int(np.count_nonzero(labels == label))) for label in DATASET_LABELS)
+        return f"DATASET:{len(self.classifier)},{counts}"
+
+    # --- Device to host -------------------------------------------------
+
+    def poll(self, max_frames: Optional[int] = None) -> List[Output]:
+        """Return the FEATURES and STATUS messages that have come due since the last poll"""
+        now = self.clock()
+        lines: List[Output] = []
+
+        # Catch up at most one second after a stall, like frames a busy loop() would skip
+        self.frames_due = min(self.frames_due + (now - self.frame_clock) * self.rate, max(self.rate, 1.0))
+        self.frame_clock = now
+        count = int(self.frames_due)
+        if max_frames is not None:
+            count = min(count, max_frames)
+        if count:
+            self.frames_due -= count
+            features = self.source.next(count)
+            labels, confidence = self.classifier.predict(features)
+            lines += self.format_features(features, labels, confidence)
+            self.last_features = features[-1]
+            self.last_classification = str(labels[-1])
+            self.last_confidence = float(confidence[-1])
+            self.has_new_features = True
+            self.frames_sent += count
+
+        if now - self.last_status > self.status_interval:
+            lines.append(self.status_line())
+            self.last_status = now
+        return lines
+
+    def next_poll_delay(self, tick: float = 0.01) -> float:
+        """Seconds until the next frame is due, but at least one tick"""
+        if self.rate <= 0:
+            return max(tick, 0.1)
+        return max(tick, min(1.0, (1.0 - self.frames_due) / self.rate))
+
+
+def _encode(lines: List[Output]) -> bytes:
+    # Serial.println ends lines with CRLF; binary frames go out as they are
+    return b''.join(line if isinstance(line, bytes) else (line + '\r\n').encode('utf-8') for line in lines)
+
+
+class EmulatedSerial:
+    """In-process serial port connected to an ESP32Emulator
+
+    Implements the part of the pyserial Serial API the tools use (read,
+    readline, write, in_waiting, reset_input_buffer, close), with a
+    background thread producing the unsolicited lines. Unlike loop://, what
+    the host writes goes to the emulator instead of coming back.
+    """
+
+    def __init__(self, emulator: ESP32Emulator, timeout: Optional[float] = 1.0,
+                 reset_on_open: bool = True, max_buffer: int = 4 * 1024 * 1024) -> None:
+        self.emulator = emulator
+        self.timeout = timeout
+        self.max_buffer = max_buffer
+        self.dropped_bytes = 0
+        self.is_open = True
+        self.port = 'emulator'
+        self._buffer = bytearray()
+        self._condition = threading.Condition()
+        if reset_on_open:
+            self._push(emulator.boot())
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _push(self, lines: List[Output]) -> None:
+        if not lines:
+            return
+        data = _encode(lines)
+        with self._condition:
+            if len(self._buffer) + len(data) > self.max_buffer:
+                # Nobody is reading; a real UART would lose this too
+                self.dropped_bytes += len(data)
+            else:
+                self._buffer += data
+                self._condition.notify_all()
+
+    def _run(self) -> None:
+        while self.is_open:
+            with self._condition:
+                lines = self.emulator.poll()
+            self._push(lines)
+            time.sleep(self.emulator.next_poll_delay())
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._buffer)
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._condition:
+            while not self._buffer and self.is_open:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+    def readline(self) -> bytes:
+        line = bytearray()
+        while not line.endswith(b'\n'):
+            chunk = self.read(1)
+            if not chunk:
+                break
+            line += chunk
+        return bytes(line)
+
+    def write(self, data: bytes) -> int:
+        with self._condition:
+            responses = self.emulator.feed(bytes(data))
+        self._push(responses)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def reset_input_buffer(self) -> None:
+        with self._condition:
+            self._buffer.clear()
+
+    def close(self) -> None:
+        self.is_open = False
+        with self._condition:
+            self._condition.notify_all()
+
+    def __enter__(self) -> 'EmulatedSerial':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class PtyEmulator:
+    """Serve an ESP32Emulator on a pseudo terminal (POSIX only)"""
+
+    def __init__(self, emulator: ESP32Emulator, reset_on_open: bool = True,
+                 max_pending: int = 4 * 1024 * 1024) -> None:
+        import tty
+        self.emulator = emulator
+        self.reset_on_open = reset_on_open
+        self.max_pending = max_pending
+        self.master, slave = os.openpty()
+        tty.setraw(slave)
+        self.device = os.ttyname(slave)
+        # Only clients hold the slave open, so the master reports when they hang up
+        os.close(slave)
+        os.set_blocking(self.master, False)
+        self.connected = False
+        self.running = True
+        self.dropped_bytes = 0
+        self._pending = bytearray()
+
+    def _queue(self, lines: List[Output]) -> None:
+        if not lines or not self.connected:
+            return  # Nothing is listening on the USB side
+        data = _encode(lines)
+        if len(self._pending) + len(data) > self.max_pending:
+            self.dropped_bytes += len(data)
+        else:
+            self._pending += data
+
+    def _on_connect(self) -> None:
+        self.connected = True
+        self._pending.clear()
+        if self.reset_on_open:
+            self._queue(self.emulator.boot())
+
+    def serve(self) -> None:
+        """Run until stop() is called"""
+        while self.running:
+            writers = [self.master] if self._pending and self.connected else []
+            readable, writable, _ = select.select([self.master], writers, [], self.emulator.next_poll_delay())
+            if readable:
+                try:
+                    data = os.read(self.master, 4096)
+                except OSError as e:
+                    if e.errno != errno.EIO:
+                        raise
+                    # No client has the port open
+                    self.connected = False
+                    self._pending.clear()
+                    time.sleep(0.05)
+                    continue
+                if not self.connected:
+                    self._on_connect()
+                self._queue(self.emulator.feed(data))
+            elif not self.connected:
+                self._on_connect()  # The hang-up condition cleared: someone opened the port
+
+            if writable:
+                try:
+                    written = os.write(self.master, self._pending)
+                    del self._pending[:written]
+                except BlockingIOError:
+                    pass
+            self._queue(self.emulator.poll())
+
+    def stop(self) -> None:
+        self.running = False
+
+    def close(self) -> None:
+        os.close(self.master)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Emulate an ESP32 Noise Logger on a pseudo terminal")
+    parser.add_argument('--rate', type=float, default=1.0, help="FEATURES lines per second")
+    parser.add_argument('--status-interval', type=float, default=5.0, help="seconds between STATUS lines")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="training set capacity")
+    parser.add_argument('--preload', type=int, default=0, help="start with this many labeled samples")
+    parser.add_argument('--replay', metavar='DATASET_CSV', help="send features from a dataset CSV in a loop")
+    parser.add_argument('--seed', type=int, help="seed for the synthetic features")
+    parser.add_argument('--no-reset', action='store_true', help="do not reboot when a client opens the port")
+    args = parser.parse_args(argv)
+
+    if os.name != 'posix':
+        print("The pseudo terminal emulator needs Linux or macOS; use a virtual COM port pair on Windows.")
+        return 1
+
+    replay = read_dataset_csv(args.replay)[0]['features'] if args.replay else None
+    emulator = ESP32Emulator(args.rate, args.status_interval, args.max_samples,
+                             FeatureSource(args.seed, replay=replay))
+    if args.preload:
+        emulator.preload(args.preload)
+        emulator.storage = emulator.training_rows()  # Survives the reboot on connect
+
+    server = PtyEmulator(emulator, reset_on_open=not args.no_reset)
+    print(f"Emulated ESP32 on {server.device} ({args.rate:g} FEATURES/s). Press Ctrl+C to stop.", flush=True)
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(f"Sent {emulator.frames_sent} frames, dropped {server.dropped_bytes} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Turn the per-frame classification stream into noise events.
+
+An event is a run of frames of one class. Frames below min_confidence are
+ignored, and a different class only takes over after enter_frames
+consecutive confident frames of it, so single misclassified frames do not
+split an event. An event ends when another class takes over or no frame
+arrives for max_gap seconds, and is only reported if it lasted at least
+min_duration seconds. EventSegmenter.update takes one frame at a time and
+keeps a fixed handful of fields per device, so it can sit in the logging
+path; headless_logger.py writes the events to events.csv next to the
+feature logs.
+
+    python python_gui/event_segmenter.py logs/features.bin --output events.csv --min-duration 5
+"""
+import argparse
+import os
+import sys
+from typing import Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+try:
+    from .protocol import FEATURE_NAMES
+    from .record_log import RotatingRecordFile, read_log
+except ImportError:  # Running as a script from the python_gui directory
+    from protocol import FEATURE_NAMES
+    from record_log import RotatingRecordFile, read_log
+
+RMS_INDEX = FEATURE_NAMES.index('rms')
+EVENTS_CSV_HEADER = 'Start,End,Label,Frames,PeakRMS,MeanConfidence\n'
+
+
+class NoiseEvent(NamedTuple):
+    start: float   # Host time of the first frame, seconds since the epoch
+    end: float     # Host time of the last frame
+    label: str
+    frames: int
+    peak_rms: float
+    mean_confidence: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class _Run:
+    """Frames of one class seen in a row"""
+    __slots__ = ('label', 'start', 'end', 'frames', 'peak_rms', 'confidence_sum')
+
+    def __init__(self, label: str, timestamp: float, rms: float, confidence: float) -> None:
+        self.label = label
+        self.start = self.end = timestamp
+        self.frames = 1
+        self.peak_rms = rms
+        self.confidence_sum = confidence
+
+    def add(self, timestamp: float, rms: float, confidence: float) -> None:
+        self.end = timestamp
+        self.frames += 1
+        if rms > self.peak_rms:
+            self.peak_rms = rms
+        self.confidence_sum += confidence
+
+    def event(self) -> NoiseEvent:
+        return NoiseEvent(self.start, self.end, self.label, self.frames, self.peak_rms,
+                          self.confidence_sum / self.frames)
+
+
+class EventSegmenter:
+    """Streaming segmentation of one device's classifications into events"""
+
+    def __init__(self, min_confidence: float = 0.6, min_duration: float = 3.0, enter_frames: int = 2,
+                 max_gap: float = 5.0, ignore: Iterable[str] = ('unknown',)) -> None:
+        self.min_confidence = min_confidence
+        self.min_duration = min_duration
+        self.enter_frames = enter_frames
+        self.max_gap = max_gap
+        self.ignore = frozenset(ignore)
+        self.current: Optional[_Run] = None
+        self.candidate: Optional[_Run] = None  # Another class that may take over
+
+    def _close(self) -> Optional[NoiseEvent]:
+        run, self.current = self.current, None
+        if run is None or run.label in self.ignore or run.end - run.start < self.min_duration:
+            return None
+        return run.event()
+
+    def update(self, timestamp: float, label: str, confidence: float, rms: float) -> Optional[NoiseEvent]:
+        """Feed one frame; returns the event it completed, if any"""
+        event = None
+        if self.current is not None and timestamp - self.current.end > self.max_gap:
+            event = self._close()
+        if self.candidate is not None and timestamp - self.candidate.end > self.max_gap:
+            self.candidate = None
+        if confidence < self.min_confidence:
+            return event
+
+        if self.current is not None and label == self.current.label:
+            self.current.add(timestamp, rms, confidence)
+            self.candidate = None
+            return event
+        if self.candidate is not None and label == self.candidate.label:
+            self.candidate.add(timestamp, rms, confidence)
+        else:
+            self.candidate = _Run(label, timestamp, rms, confidence)
+        if self.candidate.frames >= self.enter_frames:
+            event = self._close() or event
+            self.current, self.candidate = self.candidate, None
+        return event
+
+    def flush(self) -> Optional[NoiseEvent]:
+        """End the open event, e.g. when logging stops"""
+        self.candidate = None
+        return self._close()
+
+    def process(self, records: np.ndarray) -> List[NoiseEvent]:
+        """Feed LOG_RECORD_DTYPE records in order; returns the events they completed"""
+        labels = np.char.decode(records['label'], 'utf-8', 'replace').tolist()
+        events = []
+        for timestamp, label, confidence, rms in zip(records['timestamp'].tolist(), labels,
+                                                     records['confidence'].tolist(),
+                                                     records['features'][:, RMS_INDEX].tolist()):
+            event = self.update(timestamp, label, confidence, rms)
+            if event is not None:
+                events.append(event)
+        return events
+
+
+class EventCsvWriter(RotatingRecordFile):
+    """Write noise events as CSV text"""
+
+    def header(self) -> bytes:
+        return EVENTS_CSV_HEADER.encode()
+
+    def write(self, events: List[NoiseEvent]) -> None:
+        self.write_bytes(''.join(f"{e.start:.3f},{e.end:.3f},{e.label},{e.frames},{e.peak_rms:.4f},"
+                                 f"{e.mean_confidence:.3f}\n" for e in events).encode())
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Segmentation options shared with headless_logger.py"""
+    parser.add_argument('--min-confidence', type=float, default=0.6, help="ignore frames below this confidence")
+    parser.add_argument('--min-duration', type=float, default=3.0, help="shortest event reported, in seconds")
+    parser.add_argument('--enter-frames', type=int, default=2,
+                        help="confident frames of a new class needed to end the current event")
+    parser.add_argument('--max-gap', type=float, default=5.0, help="seconds without frames that end an event")
+    parser.add_argument('--ignore', nargs='*', default=['unknown'], help="classes not reported as events")
+
+
+def segmenter_from_args(args: argparse.Namespace) -> EventSegmenter:
+    return EventSegmenter(args.min_confidence, args.min_duration, args.enter_frames, args.max_gap, args.ignore)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Segment logged classifications into noise events")
+    parser.add_argument('logs', nargs='+', help="features.bin or features.csv logs, oldest first")
+    parser.add_argument('--output', default='events.csv')
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    segmenter = segmenter_from_args(args)
+    events: List[NoiseEvent] = []
+    frames = 0
+    for path in args.logs:
+        records, malformed = read_log(path)
+        if malformed:
+            print(f"[WARN] {path}: skipping {len(malformed)} malformed rows")
+        frames += len(records)
+        events.extend(segmenter.process(records))
+    last = segmenter.flush()
+    if last is not None:
+        events.append(last)
+
+    if os.path.exists(args.output):
+        os.remove(args.output)  # The writer appends
+    writer = EventCsvWriter(args.output, max_bytes=0)
+    writer.write(events)
+    writer.close()
+    print(f"{len(events)} events from {frames} frames written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Fixed-capacity feature history backed by NumPy arrays.
+
+Each FEATURES frame is stored as one row of float32 feature columns plus
+parallel timestamp, class id and confidence arrays. Appends are O(1) and
+never allocate; windows over the most recent frames are returned as views.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+try:
+    from .protocol import FEATURE_NAMES, NUM_FEATURES
+except ImportError:  # Running as a script from the python_gui directory
+    from protocol import FEATURE_NAMES, NUM_FEATURES
+
+
+class HistoryWindow(NamedTuple):
+    """Views over a contiguous run of history, oldest frame first"""
+    timestamps: np.ndarray   # float64 seconds since the epoch
+    features: np.ndarray     # float32, shape (n, NUM_FEATURES)
+    class_ids: np.ndarray    # int16, index into FeatureHistory.class_names
+    confidence: np.ndarray   # float32
+
+
+class FeatureHistory:
+    """Ring buffer of feature frames with zero-copy windowed access"""
+
+    def __init__(self, capacity: int = 86400) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+
+        # Every row is written twice, at i and i + capacity, so the newest n
+        # rows always form one contiguous slice and windows never need a copy
+        size = 2 * capacity
+        self._timestamps = np.zeros(size, dtype=np.float64)
+        self._features = np.zeros((size, NUM_FEATURES), dtype=np.float32)
+        self._class_ids = np.zeros(size, dtype=np.int16)
+        self._confidence = np.zeros(size, dtype=np.float32)
+
+        self._head = 0   # next write position in [0, capacity)
+        self._count = 0
+
+        self.class_names: List[str] = []
+        self._class_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def class_id(self, label: str) -> int:
+        """Return the id for a classification label, registering it if new"""
+        class_id = self._class_index.get(label)
+        if class_id is None:
+            class_id = len(self.class_names)
+            self._class_index[label] = class_id
+            self.class_names.append(label)
+        return class_id
+
+    def class_ids_for(self, labels: np.ndarray) -> np.ndarray:
+        """Map an array of labels to class ids without a per-frame Python loop"""
+        unique, inverse = np.unique(labels, return_inverse=True)
+        ids = np.array([self.class_id(str(label)) for label in unique], dtype=np.int16)
+        return ids[inverse]
+
+    def append(self, timestamp: float, features: Sequence[float], label: str, confidence: float) -> None:
+        """Store one frame, overwriting the oldest once the buffer is full"""
+        class_id = self.class_id(label)
+        for i in (self._head, self._head + self.capacity):
+            self._timestamps[i] = timestamp
+            self._features[i] = features
+            self._class_ids[i] = class_id
+            self._confidence[i] = confidence
+
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def extend(self, timestamps: np.ndarray, features: np.ndarray,
+               class_ids: np.ndarray, confidence: np.ndarray) -> None:
+        """Store a batch of frames; class ids must come from class_id()"""
+        n = len(timestamps)
+        if n == 0:
+            return
+        if n > self.capacity:
+            # Only the newest frames would survive anyway
+            timestamps, features = timestamps[-self.capacity:], features[-self.capacity:]
+            class_ids, confidence = class_ids[-self.capacity:], confidence[-self.capacity:]
+            self._head = (self._head + n - self.capacity) % self.capacity
+            n = self.capacity
+
+        index = (self._head + np.arange(n)) % self.capacity
+        for rows in (index, index + self.capacity):
+            self._timestamps[rows] = timestamps
+            self._features[rows] = features
+            self._class_ids[rows] = class_ids
+            self._confidence[rows] = confidence
+
+        self._head = (self._head + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+
+    def window(self, n: Optional[int] = None) -> HistoryWindow:
+        """Return views over the newest n frames (all retained frames by default)"""
+        n = self._count if n is None else max(0, min(n, self._count))
+        end = self._head + self.capacity
+        start = end - n
+        return HistoryWindow(
+            self._timestamps[start:end],
+            self._features[start:end],
+            self._class_ids[start:end],
+            self._confidence[start:end],
+        )
+
+    def since(self, timestamp: float) -> HistoryWindow:
+        """Return views over the frames received at or after timestamp"""
+        full = self.window()
+        start = int(np.searchsorted(full.timestamps, timestamp, side='left'))
+        return self.window(self._count - start)
+
+    def column(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        """Return a view of one feature column over the newest n frames"""
+        return self.window(n).features[:, FEATURE_NAMES.index(name)]
+
+    def labels(self, class_ids: np.ndarray) -> List[str]:
+        """Translate class ids back to classification labels"""
+        return [self.class_names[i] for i in class_ids]
+
+    def clear(self) -> None:
+        """Forget all frames but keep the allocated storage"""
+        self._head = 0
+        self._count = 0
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Learned feature normalization for the host KNN classifier.
+
+The firmware's compute_distance only divides spectral_centroid by 1000; the
+other features enter raw, so rms and the band energies outweigh or vanish
+next to each other depending on the microphone gain. A FeatureScaler fitted
+on a dataset pulled with retrieve_esp32_dataset.py maps every feature to
+(x - center) / scale * weight, with center/scale from the mean and standard
+deviation or, more robust to outliers, the median and interquartile range.
+KNNClassifier(scaler=...) measures distances in that space.
+
+Weights default to 1. learn_weights tunes them by coordinate ascent on the
+k-fold cross-validated accuracy, which can also set a useless feature to 0.
+
+    python python_gui/feature_scaling.py fit esp32_dataset.csv --output scaler.json --robust --learn-weights
+    python python_gui/feature_scaling.py evaluate esp32_dataset.csv --scaler scaler.json --sizes 50 100 200
+"""
+import argparse
+import json
+import sys
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+try:
+    from .knn import K_VALUE, KNNClassifier
+    from .protocol import FEATURE_NAMES, NUM_FEATURES, read_dataset_csv
+except ImportError:  # Running as a script from the python_gui directory
+    from knn import K_VALUE, KNNClassifier
+    from protocol import FEATURE_NAMES, NUM_FEATURES, read_dataset_csv
+
+METHODS = ('standard', 'robust')
+WEIGHT_CANDIDATES = (0.0, 0.5, 1.0, 2.0, 4.0)
+
+
+class FeatureScaler(NamedTuple):
+    center: np.ndarray   # float64, NUM_FEATURES
+    scale: np.ndarray    # float64, NUM_FEATURES, never 0
+    weights: np.ndarray  # float64, NUM_FEATURES
+    method: str
+
+    def transform(self, features: np.ndarray) -> np.ndarray:
+        """Features in the scaled, weighted space as float32 (n, NUM_FEATURES)"""
+        features = np.asarray(features, dtype=np.float64).reshape(-1, NUM_FEATURES)
+        return ((features - self.center) * (self.weights / self.scale)).astype(np.float32)
+
+    def with_weights(self, weights: Sequence[float]) -> 'FeatureScaler':
+        return self._replace(weights=np.asarray(weights, dtype=np.float64))
+
+
+def fit_scaler(features: np.ndarray, method: str = 'standard') -> FeatureScaler:
+    """Fit per-feature center and scale on a training set"""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, not {method!r}")
+    features = np.asarray(features, dtype=np.float64).reshape(-1, NUM_FEATURES)
+    if not len(features):
+        raise ValueError("cannot fit a scaler on an empty dataset")
+    if method == 'standard':
+        center = features.mean(axis=0)
+        scale = features.std(axis=0)
+    else:
+        q25, center, q75 = np.percentile(features, [25, 50, 75], axis=0)
+        scale = q75 - q25
+    scale = np.where(scale > 0, scale, 1.0)  # A constant feature is left unscaled
+    return FeatureScaler(center, scale, np.ones(NUM_FEATURES), method)
+
+
+def save_scaler(path: str, scaler: FeatureScaler) -> None:
+    state = {
+        'method': scaler.method,
+        'features': list(FEATURE_NAMES),
+        'center': scaler.center.tolist(),
+        'scale': scaler.scale.tolist(),
+        'weights': scaler.weights.tolist(),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+
+def load_scaler(path: str) -> FeatureScaler:
+    """Read a scaler saved by save_scaler, raising ValueError if it does not fit these features"""
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('features') != list(FEATURE_NAMES):
+        raise ValueError(f"{path} was fitted on features {state.get('features')}")
+    return FeatureScaler(np.array(state['center'], dtype=np.float64), np.array(state['scale'], dtype=np.float64),
+                         np.array(state['weights'], dtype=np.float64), state['method'])
+
+
+def fold_ids(count: int, folds: int, seed: int = 0) -> np.ndarray:
+    """Fold number of every sample, shuffled but reproducible"""
+    return np.random.default_rng(seed).permutation(count) % folds
+
+
+def cross_val_accuracy(features: np.ndarray, labels: np.ndarray, scaler: Optional[FeatureScaler],
+                       folds: int = 5, k: int = K_VALUE, train_size: Optional[int] = None) -> float:
+    """Mean accuracy over folds; train_size keeps only that many random training samples per fold"""
+    ids = fold_ids(len(labels), folds)
+    rng = np.random.default_rng(1)
+    correct = 0
+    for fold in range(folds):
+        train = np.flatnonzero(ids != fold)
+        test = np.flatnonzero(ids == fold)
+        if train_size is not None and train_size < len(train):
+            train = rng.choice(train, train_size, replace=False)
+        classifier = KNNClassifier(k=k, scaler=scaler).fit(features[train], labels[train].tolist())
+        predicted, _ = classifier.predict(features[test])
+        correct += int((predicted == labels[test]).sum())
+    return correct / len(labels)
+
+
+def learn_weights(features: np.ndarray, labels: np.ndarray, scaler: FeatureScaler, folds: int = 5,
+                  k: int = K_VALUE, candidates: Sequence[float] = WEIGHT_CANDIDATES,
+                  rounds: int = 2) -> FeatureScaler:
+    """Coordinate ascent on the cross-validated accuracy, one feature weight at a time"""
+    weights = scaler.weights.copy()
+    best = cross_val_accuracy(features, labels, scaler.with_weights(weights), folds, k)
+    for _ in range(rounds):
+        improved = False
+        for j in range(NUM_FEATURES):
+            for candidate in candidates:
+                if candidate == weights[j] or (candidate == 0 and np.count_nonzero(weights) == 1):
+                    continue
+                trial = weights.copy()
+                trial[j] = candidate
+                accuracy = cross_val_accuracy(features, labels, scaler.with_weights(trial), folds, k)
+                if accuracy > best:
+                    best, weights, improved = accuracy, trial, True
+        if not improved:
+            break
+    return scaler.with_weights(weights)
+
+
+def _load(path: str) -> tuple:
+    rows, malformed = read_dataset_csv(path)
+    if malformed:
+        print(f"[WARN] Skipping {len(malformed)} malformed rows")
+    return rows['features'], rows['label']
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fit and evaluate feature normalization for the KNN classifier")
+    commands = parser.add_subparsers(dest='command', required=True)
+    fit = commands.add_parser('fit', help="fit a scaler on a dataset CSV")
+    fit.add_argument('dataset')
+    fit.add_argument('--output', default='scaler.json')
+    fit.add_argument('--robust', action='store_true', help="median/IQR instead of mean/std")
+    fit.add_argument('--learn-weights', action='store_true', help="tune feature weights by cross-validation")
+    evaluate = commands.add_parser('evaluate', help="compare cross-validated accuracy with and without a scaler")
+    evaluate.add_argument('dataset')
+    evaluate.add_argument('--scaler', required=True)
+    evaluate.add_argument('--sizes', type=int, nargs='+', help="also evaluate with this many training samples")
+    for command in (fit, evaluate):
+        command.add_argument('--folds', type=int, default=5)
+        command.add_argument('-k', type=int, default=K_VALUE)
+    args = parser.parse_args(argv)
+
+    features, labels = _load(args.dataset)
+    if len(labels) < args.folds:
+        print(f"Need at least {args.folds} samples, got {len(labels)}")
+        return 1
+
+    if args.command == 'fit':
+        scaler = fit_scaler(features, 'robust' if args.robust else 'standard')
+        if args.learn_weights:
+            scaler = learn_weights(features, labels, scaler, args.folds, args.k)
+        save_scaler(args.output, scaler)
+        print(f"Saved {scaler.method} scaler to {args.output}")
+        for name, weight in zip(FEATURE_NAMES, scaler.weights):
+            print(f"  {name:<18} weight {weight:g}")
+        scalers = [None, scaler]
+        sizes: List[Optional[int]] = [None]
+    else:
+        scalers = [None, load_scaler(args.scaler)]
+        sizes = [None] + sorted(args.sizes or [])
+
+    print(f"{'training samples':>16} {'firmware distance':>18} {'scaled':>8}")
+    for size in sizes:
+        accuracies = [cross_val_accuracy(features, labels, scaler, args.folds, args.k, size) for scaler in scalers]
+        print(f"{size if size is not None else 'all':>16} {accuracies[0]:>18.1%} {accuracies[1]:>8.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Columnar store for logged FEATURES records.
+
+A store is a directory of fixed-capacity ``.npy`` chunks holding
+LOG_RECORD_DTYPE records plus an ``index.json`` that lists, per chunk, how
+many rows are filled and the time range they cover. Chunks are written and
+read through memory maps, so loading a day of data maps a file instead of
+parsing text, and time-range queries only touch the chunks they overlap.
+
+Usage:
+    python python_gui/feature_store.py import logs/features.bin store/
+    python python_gui/feature_store.py info store/
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    from .record_log import LOG_RECORD_DTYPE, read_binary_log
+except ImportError:  # Running as a script from the python_gui directory
+    from record_log import LOG_RECORD_DTYPE, read_binary_log
+
+INDEX_FILE = 'index.json'
+STORE_VERSION = 1
+
+
+class FeatureStore:
+    """Append-only, memory-mapped chunk store of LOG_RECORD_DTYPE records"""
+
+    def __init__(self, path: str, chunk_rows: int = 86400, flush_interval: float = 10.0) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._writable: Optional[np.memmap] = None  # Open memmap of the last chunk
+
+        index_path = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') != STORE_VERSION:
+                raise ValueError(f"{path}: unsupported store version {index.get('version')}")
+            self.chunk_rows: int = index['chunk_rows']
+            self.chunks: List[Dict[str, Any]] = index['chunks']
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.chunk_rows = chunk_rows
+            self.chunks = []
+
+    def __len__(self) -> int:
+        return sum(chunk['count'] for chunk in self.chunks)
+
+    def time_range(self) -> Optional[tuple]:
+        """Return (first, last) timestamp in the store, or None if it is empty"""
+        filled = [c for c in self.chunks if c['count']]
+        if not filled:
+            return None
+        return min(c['t_min'] for c in filled), max(c['t_max'] for c in filled)
+
+    def _chunk_path(self, chunk: Dict[str, Any]) -> str:
+        return os.path.join(self.path, chunk['file'])
+
+    def _new_chunk(self) -> np.memmap:
+        self._close_writable()
+        chunk = {'file': f"chunk_{len(self.chunks):06d}.npy", 'count': 0,
+                 't_min': None, 't_max': None, 'sorted': True}
+        self.chunks.append(chunk)
+        self._writable = np.lib.format.open_memmap(self._chunk_path(chunk), mode='w+',
+                                                   dtype=LOG_RECORD_DTYPE, shape=(self.chunk_rows,))
+        return self._writable
+
+    def _open_last_chunk(self) -> np.memmap:
+        if self._writable is None:
+            if not self.chunks or self.chunks[-1]['count'] >= self.chunk_rows:
+                return self._new_chunk()
+            self._writable = np.load(self._chunk_path(self.chunks[-1]), mmap_mode='r+')
+        return self._writable
+
+    def append(self, records: np.ndarray) -> None:
+        """Append LOG_RECORD_DTYPE records, starting new chunks as needed"""
+        start = 0
+        while start < len(records):
+            target = self._open_last_chunk()
+            chunk = self.chunks[-1]
+            if chunk['count'] >= self.chunk_rows:
+                target = self._new_chunk()
+                chunk = self.chunks[-1]
+
+            n = min(len(records) - start, self.chunk_rows - chunk['count'])
+            block = records[start:start + n]
+            target[chunk['count']:chunk['count'] + n] = block
+
+            timestamps = block['timestamp']
+            if chunk['t_max'] is not None and timestamps[0] < chunk['t_max']:
+                chunk['sorted'] = False
+            if n > 1 and np.any(np.diff(timestamps) < 0):
+                chunk['sorted'] = False
+            t_min, t_max = float(timestamps.min()), float(timestamps.max())
+            chunk['t_min'] = t_min if chunk['t_min'] is None else min(chunk['t_min'], t_min)
+            chunk['t_max'] = t_max if chunk['t_max'] is None else max(chunk['t_max'], t_max)
+            chunk['count'] += n
+            start += n
+
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    # Same interface as the record_log writers
+    write = append
+
+    def flush(self) -> None:
+        """Write dirty pages and publish the new row counts in the index"""
+        if self._writable is not None:
+            self._writable.flush()
+        index = {'version': STORE_VERSION, 'chunk_rows': self.chunk_rows, 'chunks': self.chunks}
+        index_path = os.path.join(self.path, INDEX_FILE)
+        with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=1)
+        os.replace(index_path + '.tmp', index_path)
+        self._last_flush = time.monotonic()
+
+    def _close_writable(self) -> None:
+        if self._writable is not None:
+            self._writable.flush()
+            self._writable = None
+
+    def close(self) -> None:
+        self.flush()
+        self._close_writable()
+
+    def chunk(self, i: int) -> np.ndarray:
+        """Return the filled rows of chunk i as a read-only memory map"""
+        info = self.chunks[i]
+        return np.load(self._chunk_path(info), mmap_mode='r')[:info['count']]
+
+    def iter_range(self, t_start: float = -np.inf, t_end: float = np.inf) -> Iterator[np.ndarray]:
+        """Yield the records with t_start <= timestamp < t_end, chunk by chunk
+
+        Chunks logged in time order yield memory-mapped slices (no copy);
+        chunks whose timestamps went backwards yield a filtered copy.
+        """
+        for i, info in enumerate(self.chunks):
+            if not info['count'] or info['t_max'] < t_start or info['t_min'] >= t_end:
+                continue
+            rows = self.chunk(i)
+            timestamps = rows['timestamp']
+            if info.get('sorted', True):
+                lo = int(np.searchsorted(timestamps, t_start, side='left'))
+                hi = int(np.searchsorted(timestamps, t_end, side='left'))
+                if hi > lo:
+                    yield rows[lo:hi]
+            else:
+                selected = rows[(timestamps >= t_start) & (timestamps < t_end)]
+                if len(selected):
+                    yield selected
+
+    def read_range(self, t_start: float = -np.inf, t_end: float = np.inf) -> np.ndarray:
+        """Return the records with t_start <= timestamp < t_end as one array
+
+        A range inside a single chunk is returned as a memory-mapped view;
+        ranges spanning chunks are concatenated into memory.
+        """
+        parts = list(self.iter_range(t_start, t_end))
+        if not parts:
+            return np.empty(0, dtype=LOG_RECORD_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage a columnar feature store")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help="append binary feature logs to a store")
+    import_parser.add_argument('logs', nargs='+', help="features.bin files written by headless_logger.py")
+    import_parser.add_argument('store')
+    import_parser.add_argument('--chunk-rows', type=int, default=86400)
+
+    info_parser = commands.add_parser('info', help="summarize a store")
+    info_parser.add_argument('store')
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        store = FeatureStore(args.store, args.chunk_rows)
+        # Rotated logs are numbered newest first, so import oldest first
+        for path in sorted(args.logs, key=lambda p: os.path.getmtime(p)):
+            records = read_binary_log(path)
+            store.append(records)
+            print(f"Imported {len(records)} records from {path}")
+        store.close()
+        return 0
+
+    store = FeatureStore(args.store)
+    span = store.time_range()
+    print(f"{args.store}: {len(store)} records in {len(store.chunks)} chunks of {store.chunk_rows} rows")
+    if span:
+        first, last = span
+        print(f"  from {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(first))}"
+              f" to {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
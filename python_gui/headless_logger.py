@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Headless ESP32 Noise Logger.
+Streams FEATURES records from the ESP32 to rotating CSV and/or binary files
+without tkinter, for unattended logging on machines with no display.
+
+Usage:
+    python python_gui/headless_logger.py --port /dev/ttyUSB0 --output-dir logs
+    python python_gui/headless_logger.py --all-devices --output-dir logs
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+import serial
+
+try:
+    from .binary_protocol import BINARY_MODE_COMMAND, FrameReader
+    from .device_manager import DeviceManager
+    from .event_segmenter import EventCsvWriter, EventSegmenter, NoiseEvent, add_arguments, segmenter_from_args
+    from .feature_store import FeatureStore
+    from .ports import device_dirname, device_id, find_esp32_port
+    from .protocol import READY_MESSAGE, parse_chunk
+    from .record_log import BinaryRecordWriter, CsvRecordWriter, to_log_records
+    from .serial_reader import SerialLineReader
+except ImportError:  # Running as a script from the python_gui directory
+    from binary_protocol import BINARY_MODE_COMMAND, FrameReader
+    from device_manager import DeviceManager
+    from event_segmenter import EventCsvWriter, EventSegmenter, NoiseEvent, add_arguments, segmenter_from_args
+    from feature_store import FeatureStore
+    from ports import device_dirname, device_id, find_esp32_port
+    from protocol import READY_MESSAGE, parse_chunk
+    from record_log import BinaryRecordWriter, CsvRecordWriter, to_log_records
+    from serial_reader import SerialLineReader
+
+logger = logging.getLogger("headless_logger")
+
+
+class HeadlessLogger:
+    """Read an ESP32 over serial and append every FEATURES frame to disk"""
+
+    def __init__(self, port: Optional[str], output_dir: str, formats: List[str],
+                 baudrate: int = 115200, max_bytes: int = 64 * 1024 * 1024,
+                 backup_count: int = 10, fsync_interval: float = 10.0,
+                 stats_interval: float = 60.0, store_dir: Optional[str] = None,
+                 binary: bool = False, segmenter: Optional[EventSegmenter] = None) -> None:
+        self.port = port
+        self.baudrate = baudrate
+        self.binary = binary  # Ask the board for binary FEATURES frames
+        self.stats_interval = stats_interval
+        self.running = True
+
+        self.writers: List[Union[CsvRecordWriter, BinaryRecordWriter, FeatureStore]] = []
+        if 'csv' in formats:
+            self.writers.append(CsvRecordWriter(os.path.join(output_dir, 'features.csv'),
+                                                max_bytes, backup_count, fsync_interval))
+        if 'binary' in formats:
+            self.writers.append(BinaryRecordWriter(os.path.join(output_dir, 'features.bin'),
+                                                   max_bytes, backup_count, fsync_interval))
+        if store_dir:
+            self.writers.append(FeatureStore(store_dir, flush_interval=fsync_interval))
+
+        # Events are rare, so each one is fsynced as soon as it is written
+        self.segmenter = segmenter
+        self.event_writer = (EventCsvWriter(os.path.join(output_dir, 'events.csv'), max_bytes, backup_count, 0.0)
+                             if segmenter else None)
+        self.events_logged = 0
+
+        self.frames_logged = 0
+        self.malformed_lines = 0
+        self.last_status: Optional[str] = None
+
+    def open_port(self) -> serial.Serial:
+        """Open the configured port, or the first port that looks like an ESP32"""
+        port = self.port or find_esp32_port(logger.debug)
+        if not port:
+            raise serial.SerialException("No ESP32 port found")
+        connection = serial.Serial(port, self.baudrate, timeout=1)
+        logger.info("Connected to %s", port)
+        return connection
+
+    def handle_lines(self, lines: List[str], received: Optional[float] = None,
+                     frames: Optional[np.ndarray] = None) -> None:
+        """Parse a batch of lines, plus any decoded binary frames, and write the FEATURES records"""
+        chunk = parse_chunk(lines)
+        features = chunk.features
+        if frames is not None and len(frames):
+            features = np.concatenate([features, frames]) if len(features) else frames
+        if len(features):
+            records = to_log_records(received or time.time(), features)
+            for writer in self.writers:
+                writer.write(records)
+            self.frames_logged += len(records)
+            if self.segmenter:
+                self.write_events(self.segmenter.process(records))
+
+        if chunk.status:
+            status = chunk.status[-1]
+            self.last_status = f"{status.sample_count} samples, uptime {status.uptime_ms // 1000}s"
+        for message in chunk.messages:
+            if message.kind == 'ERROR':
+                logger.warning("ESP32 error: %s", message.payload)
+        self.malformed_lines += len(chunk.malformed)
+
+    def write_events(self, events: List[NoiseEvent]) -> None:
+        if events and self.event_writer:
+            self.event_writer.write(events)
+            self.events_logged += len(events)
+            for event in events:
+                logger.info("Event: %s for %.0fs, peak rms %.4f", event.label, event.duration, event.peak_rms)
+
+    def run(self) -> None:
+        """Log until stop() is called, reconnecting after serial errors"""
+        retry_delay = 1.0
+        last_stats = time.monotonic()
+
+        while self.running:
+            try:
+                connection = self.open_port()
+            except (serial.SerialException, OSError) as e:
+                logger.warning("Cannot open port: %s (retrying in %.0fs)", e, retry_delay)
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30.0)
+                continue
+
+            retry_delay = 1.0
+            reader = SerialLineReader(connection)
+            frame_reader = FrameReader(connection)
+            try:
+                if self.binary:
+                    connection.write((BINARY_MODE_COMMAND + "\n").encode())
+                while self.running:
+                    if self.binary:
+                        frames, lines = frame_reader.read()
+                        if any(READY_MESSAGE in line for line in lines):
+                            # The board rebooted into text mode
+                            connection.write((BINARY_MODE_COMMAND + "\n").encode())
+                        if lines or len(frames):
+                            self.handle_lines(lines, frames=frames)
+                    else:
+                        lines = reader.read_lines()
+                        if lines:
+                            self.handle_lines(lines)
+
+                    now = time.monotonic()
+                    if now - last_stats >= self.stats_interval:
+                        last_stats = now
+                        logger.info("%d frames logged, %d malformed lines, device: %s",
+                                    self.frames_logged, self.malformed_lines, self.last_status or "--")
+                        if self.binary:
+                            logger.info("%d frames failed the CRC check, %d lost",
+                                        frame_reader.decoder.crc_errors, frame_reader.decoder.lost_frames)
+            except (serial.SerialException, OSError) as e:
+                logger.warning("Serial error: %s", e)
+            finally:
+                connection.close()
+
+    def stop(self) -> None:
+        self.running = False
+
+    def close(self) -> None:
+        if self.segmenter:
+            last = self.segmenter.flush()
+            self.write_events([last] if last else [])
+        if self.event_writer:
+            self.event_writer.close()
+        for writer in self.writers:
+            writer.close()
+
+
+class FleetLogger:
+    """Log several ESP32s at once, each to its own subdirectory of the output directory"""
+
+    def __init__(self, manager: DeviceManager, make_logger: Callable[[str], HeadlessLogger],
+                 ports: Optional[List[str]] = None, rescan_interval: float = 10.0,
+                 stats_interval: float = 60.0) -> None:
+        self.manager = manager
+        self.make_logger = make_logger
+        self.ports = ports  # None means every port that looks like an ESP32
+        self.rescan_interval = rescan_interval
+        self.stats_interval = stats_interval
+        self.loggers: Dict[str, HeadlessLogger] = {}
+        self.running = True
+
+    def connect(self) -> None:
+        """Open the configured ports, or every detected ESP32, that are not open yet"""
+        if self.ports is None:
+            self.manager.discover()
+            return
+        open_ports = set(self.manager.ports)
+        for port in self.ports:
+            if port not in open_ports:
+                try:
+                    self.manager.add_device(port, device_id(port))
+                except (serial.SerialException, OSError) as e:
+                    logger.warning("Cannot open %s: %s", port, e)
+
+    def logger_for(self, device_id: str) -> HeadlessLogger:
+        device_logger = self.loggers.get(device_id)
+        if device_logger is None:
+            device_logger = self.loggers[device_id] = self.make_logger(device_dirname(device_id))
+        return device_logger
+
+    def run(self) -> None:
+        """Log until stop() is called, reopening devices that went away"""
+        last_scan = float('-inf')
+        last_stats = time.monotonic()
+        while self.running:
+            now = time.monotonic()
+            if now - last_scan >= self.rescan_interval:
+                last_scan = now
+                self.connect()
+
+            for batch in self.manager.get_batches(timeout=0.5):
+                self.logger_for(batch.device).handle_lines(batch.lines, batch.received)
+
+            if now - last_stats >= self.stats_interval:
+                last_stats = now
+                stats = self.manager.stats()
+                for device_id, device_logger in sorted(self.loggers.items()):
+                    dropped = stats.get(device_id, {}).get('dropped_lines', 0)
+                    logger.info("%s: %d frames logged, %d malformed lines, %d lines dropped, device: %s",
+                                device_id, device_logger.frames_logged, device_logger.malformed_lines,
+                                dropped, device_logger.last_status or "--")
+
+    @property
+    def frames_logged(self) -> int:
+        return sum(device_logger.frames_logged for device_logger in self.loggers.values())
+
+    def stop(self) -> None:
+        self.running = False
+
+    def close(self) -> None:
+        self.manager.close()
+        for device_logger in self.loggers.values():
+            device_logger.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Log ESP32 Noise Logger features to disk without a GUI")
+    parser.add_argument('--port', action='append',
+                        help="serial port (default: auto-detect); repeat to log several devices")
+    parser.add_argument('--all-devices', action='store_true', help="log every port that looks like an ESP32")
+    parser.add_argument('--rescan-interval', type=float, default=10.0,
+                        help="seconds between attempts to open missing devices")
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--output-dir', default='logs')
+    parser.add_argument('--format', choices=['csv', 'binary', 'both'], default='both')
+    parser.add_argument('--binary', action='store_true',
+                        help="ask the board for binary FEATURES frames (firmware with SET_MODE support)")
+    parser.add_argument('--store', metavar='DIR', help="also append to a memory-mapped feature store")
+    parser.add_argument('--max-mb', type=float, default=64, help="rotate files at this size")
+    parser.add_argument('--backup-count', type=int, default=10, help="rotated files to keep")
+    parser.add_argument('--fsync-interval', type=float, default=10.0, help="seconds between fsyncs")
+    parser.add_argument('--stats-interval', type=float, default=60.0, help="seconds between progress messages")
+    parser.add_argument('--no-events', action='store_true', help="do not segment frames into events.csv")
+    add_arguments(parser)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+
+    formats = ['csv', 'binary'] if args.format == 'both' else [args.format]
+    ports = args.port or []
+    if args.binary and (args.all_devices or len(ports) > 1):
+        parser.error("--binary is only supported with a single device")
+
+    def make_logger(port: Optional[str], subdir: str = '') -> HeadlessLogger:
+        output_dir = os.path.join(args.output_dir, subdir)
+        store_dir = os.path.join(args.store, subdir) if args.store else None
+        return HeadlessLogger(port, output_dir, formats, args.baud,
+                              int(args.max_mb * 1024 * 1024), args.backup_count,
+                              args.fsync_interval, args.stats_interval, store_dir, args.binary,
+                              None if args.no_events else segmenter_from_args(args))
+
+    app: Union[HeadlessLogger, FleetLogger]
+    if args.all_devices or len(ports) > 1:
+        app = FleetLogger(DeviceManager(args.baud), lambda subdir: make_logger(None, subdir),
+                          None if args.all_devices else ports, args.rescan_interval, args.stats_interval)
+    else:
+        app = make_logger(ports[0] if ports else None)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: app.stop())
+    try:
+        app.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app.close()
+        logger.info("Stopped after %d frames", app.frames_logged)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+KD-tree nearest-neighbor index for large host-side training sets.
+
+KDTree is a static tree over a block of points; KDTreeIndex keeps a
+forest of them sized by powers of two (the Bentley-Saxe logarithmic
+method), so points can be added incrementally at amortized O(log n)
+rebuild cost while queries stay logarithmic. Distances are squared
+Euclidean in float64; callers scale the features beforehand.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+
+def _merge_best(best_d: np.ndarray, best_i: np.ndarray, d: np.ndarray, i: np.ndarray,
+                k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the k smallest (distance, id) pairs, ties going to the lowest id"""
+    all_d = np.concatenate([best_d, d])
+    all_i = np.concatenate([best_i, i])
+    order = np.lexsort((all_i, all_d))[:k]
+    return all_d[order], all_i[order]
+
+
+class KDTree:
+    """Static KD-tree split at the median of the widest dimension"""
+
+    def __init__(self, points: np.ndarray, ids: np.ndarray, leaf_size: int = 128) -> None:
+        points = np.asarray(points, dtype=np.float64)
+        self.size = len(points)
+        self.leaf_size = leaf_size
+
+        order = np.arange(self.size)
+        # Per node; kept as lists because queries read them one scalar at a time
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.lefts: List[int] = []
+        self.rights: List[int] = []
+        self.split_dims: List[int] = []
+        self.split_values: List[float] = []
+
+        # Nodes are numbered in creation order; children are filled in later
+        pending = [(0, self.size, -1, False)]
+        while pending:
+            start, end, parent, is_right = pending.pop()
+            node = len(self.starts)
+            self.starts.append(start)
+            self.ends.append(end)
+            self.lefts.append(-1)
+            self.rights.append(-1)
+            self.split_dims.append(-1)
+            self.split_values.append(0.0)
+            if parent >= 0:
+                (self.rights if is_right else self.lefts)[parent] = node
+
+            if end - start <= leaf_size:
+                continue
+            block = points[order[start:end]]
+            dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            mid = (end - start) // 2
+            partition = np.argpartition(block[:, dim], mid)
+            order[start:end] = order[start:end][partition]
+            # Everything left of mid is <= the split value, everything right >=
+            self.split_dims[node] = dim
+            self.split_values[node] = float(block[partition[mid], dim])
+            pending.append((start + mid, end, node, True))
+            pending.append((start, start + mid, node, False))
+
+        self.points = points[order]
+        self.ids = np.asarray(ids)[order]
+
+    def query(self, point: np.ndarray, k: int, best_d: np.ndarray,
+              best_i: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Merge this tree's k nearest points into the (best_d, best_i) candidates"""
+        coords = point.tolist()
+        # Lower bounds are built incrementally from the per-dimension offsets
+        # to the splitting planes crossed so far (Arya & Mount)
+        stack = [(0.0, 0, [0.0] * len(coords))]
+        while stack:
+            bound, node, offsets = stack.pop()
+            # Strict comparison so points tied with the k-th distance are still seen
+            if len(best_d) == k and bound > best_d[-1]:
+                continue
+
+            dim = self.split_dims[node]
+            if dim < 0:
+                start, end = self.starts[node], self.ends[node]
+                diff = self.points[start:end] - point
+                d = np.einsum('ij,ij->i', diff, diff)
+                if len(best_d) < k or d.min() <= best_d[-1]:
+                    best_d, best_i = _merge_best(best_d, best_i, d, self.ids[start:end], k)
+                continue
+
+            gap = coords[dim] - self.split_values[node]
+            near, far = (self.lefts[node], self.rights[node]) if gap < 0 else (self.rights[node], self.lefts[node])
+            far_offsets = offsets.copy()
+            far_offsets[dim] = gap
+            # Push the far child first so the near one is visited next
+            stack.append((bound - offsets[dim] ** 2 + gap * gap, far, far_offsets))
+            stack.append((bound, near, offsets))
+        return best_d, best_i
+
+    def query_radius(self, point: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(squared distances, ids) of every point within squared distance radius, unordered"""
+        coords = point.tolist()
+        found_d: List[np.ndarray] = []
+        found_i: List[np.ndarray] = []
+        stack = [(0.0, 0, [0.0] * len(coords))]
+        while stack:
+            bound, node, offsets = stack.pop()
+            if bound > radius:
+                continue
+            dim = self.split_dims[node]
+            if dim < 0:
+                start, end = self.starts[node], self.ends[node]
+                diff = self.points[start:end] - point
+                d = np.einsum('ij,ij->i', diff, diff)
+                inside = d <= radius
+                found_d.append(d[inside])
+                found_i.append(self.ids[start:end][inside])
+                continue
+            gap = coords[dim] - self.split_values[node]
+            near, far = (self.lefts[node], self.rights[node]) if gap < 0 else (self.rights[node], self.lefts[node])
+            far_offsets = offsets.copy()
+            far_offsets[dim] = gap
+            stack.append((bound - offsets[dim] ** 2 + gap * gap, far, far_offsets))
+            stack.append((bound, near, offsets))
+        if not found_d:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.intp)
+        return np.concatenate(found_d), np.concatenate(found_i)
+
+
+class KDTreeIndex:
+    """Incrementally built forest of KD-trees plus a small unindexed buffer"""
+
+    def __init__(self, num_features: int, leaf_size: int = 128) -> None:
+        self.leaf_size = leaf_size
+        self.trees: List[KDTree] = []
+        self.buffer = np.empty((0, num_features), dtype=np.float64)
+        self.buffer_ids = np.empty(0, dtype=np.intp)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, points: np.ndarray) -> None:
+        """Index more points; their ids continue from the current size"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, self.buffer.shape[1])
+        ids = np.arange(self.size, self.size + len(points))
+        self.size += len(points)
+        self.buffer = np.concatenate([self.buffer, points])
+        self.buffer_ids = np.concatenate([self.buffer_ids, ids])
+        if len(self.buffer) < self.leaf_size:
+            return
+
+        # Like carrying in a binary counter: fold in every tree no bigger
+        # than what is being inserted, so tree sizes stay roughly doubling
+        merged_points, merged_ids = [self.buffer], [self.buffer_ids]
+        count = len(self.buffer)
+        while self.trees and self.trees[-1].size <= count:
+            tree = self.trees.pop()
+            merged_points.append(tree.points)
+            merged_ids.append(tree.ids)
+            count += tree.size
+        self.trees.append(KDTree(np.concatenate(merged_points), np.concatenate(merged_ids), self.leaf_size))
+        self.buffer = self.buffer[:0]
+        self.buffer_ids = self.buffer_ids[:0]
+
+    def query(self, point: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (squared distances, ids) of the k nearest points, nearest first"""
+        point = np.asarray(point, dtype=np.float64)
+        best_d = np.empty(0, dtype=np.float64)
+        best_i = np.empty(0, dtype=np.intp)
+        if len(self.buffer):
+            diff = self.buffer - point
+            best_d, best_i = _merge_best(best_d, best_i, np.einsum('ij,ij->i', diff, diff),
+                                         self.buffer_ids, k)
+        # Largest tree first, so the bound is tight before the small ones
+        for tree in self.trees:
+            best_d, best_i = tree.query(point, k, best_d, best_i)
+        return best_d, best_i
+
+    def query_radius(self, point: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (squared distances, ids) of every point within squared distance radius, unordered"""
+        point = np.asarray(point, dtype=np.float64)
+        diff = self.buffer - point
+        d = np.einsum('ij,ij->i', diff, diff)
+        inside = d <= radius
+        found_d, found_i = [d[inside]], [self.buffer_ids[inside]]
+        for tree in self.trees:
+            tree_d, tree_i = tree.query_radius(point, radius)
+            found_d.append(tree_d)
+            found_i.append(tree_i)
+        return np.concatenate(found_d), np.concatenate(found_i)
@@ -0,0 +1,252 @@
+"""
+Host-side reference implementation of the firmware KNNClassifier.
+
+Distances, neighbor order and voting follow KNNClassifier::classify:
+Euclidean distance with spectral_centroid scaled by 1/1000 and the same
+float rounding as compute_distance, neighbors ordered like std::sort on
+(distance, index), and ties in the vote going to the label that sorts
+first, as std::map<String, int> iterates. Whole batches are classified
+with one distance matrix per block and argpartition instead of a sort.
+
+Training sets far beyond the device's MAX_SAMPLES can use a KD-tree
+index instead of brute force (backend='kdtree', or 'auto' above
+KDTREE_MIN_SAMPLES). The tree searches in float64, so its k nearest can
+differ from the firmware's when float32 rounding reorders near-ties. It
+therefore returns every sample within a small margin of its k-th distance,
+and those are ranked with the firmware distance and (distance, index)
+order, giving the same neighbors as brute force even on data full of ties.
+
+With a FeatureScaler (feature_scaling.py) the classifier measures plain
+Euclidean distance between scaler.transform(features) instead. This is a
+host-only mode: it no longer matches the device, so the emulator and the
+parity checks leave it off.
+"""
+from typing import TYPE_CHECKING, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .kdtree import KDTreeIndex
+    from .protocol import FEATURE_NAMES, MAX_LABEL_LENGTH, NUM_FEATURES
+except ImportError:  # Running as a script from the python_gui directory
+    from kdtree import KDTreeIndex
+    from protocol import FEATURE_NAMES, MAX_LABEL_LENGTH, NUM_FEATURES
+
+if TYPE_CHECKING:
+    from feature_scaling import FeatureScaler
+
+K_VALUE = 5
+MAX_SAMPLES = 500
+UNKNOWN_LABEL = 'unknown'
+BACKENDS = ('auto', 'brute', 'kdtree')
+KDTREE_MIN_SAMPLES = 10000  # 'auto' switches from brute force to the KD-tree here
+KDTREE_RADIUS_MARGIN = 1e-4  # Relative slack on the k-th squared distance, far above float32 rounding
+
+# compute_distance divides the spectral_centroid difference by this
+CENTROID_INDEX = FEATURE_NAMES.index('spectral_centroid')
+CENTROID_DIVISOR = 1000.0
+
+
+def compute_distance(queries: np.ndarray, samples: np.ndarray) -> np.ndarray:
+    """Distance matrix between queries (m, 7) and samples (n, 7) as the firmware computes it
+
+    Differences are taken in float32, squared in double and accumulated
+    into a float32, then square-rooted, so results match the device bit
+    for bit and near-ties break the same way.
+    """
+    queries = np.asarray(queries, dtype=np.float32).reshape(-1, NUM_FEATURES)
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1, NUM_FEATURES)
+    dist = np.zeros((len(queries), len(samples)), dtype=np.float32)
+    diff = np.empty(dist.shape, dtype=np.float32)
+    term = np.empty(dist.shape, dtype=np.float64)
+    for j in range(NUM_FEATURES):
+        np.subtract.outer(queries[:, j], samples[:, j], out=diff)  # float32, like a.rms - b.rms
+        if j == CENTROID_INDEX:
+            np.divide(diff, CENTROID_DIVISOR, out=term, dtype=np.float64)  # in double, like / 1000.0
+            np.square(term, out=term)
+        else:
+            np.multiply(diff, diff, out=term, dtype=np.float64)  # exact, like pow(float, 2)
+        np.add(dist, term, out=dist, casting='unsafe')  # double sum stored back into float dist
+    return np.sqrt(dist)
+
+
+def scale_features(features: np.ndarray) -> np.ndarray:
+    """Features in the space compute_distance measures, as float64"""
+    scaled = np.array(features, dtype=np.float64).reshape(-1, NUM_FEATURES)
+    scaled[:, CENTROID_INDEX] /= CENTROID_DIVISOR
+    return scaled
+
+
+def euclidean_distance(queries: np.ndarray, samples: np.ndarray) -> np.ndarray:
+    """Plain float32 Euclidean distance matrix between already scaled queries and samples"""
+    dist = np.zeros((len(queries), len(samples)), dtype=np.float32)
+    diff = np.empty(dist.shape, dtype=np.float32)
+    for j in range(queries.shape[1]):
+        np.subtract.outer(queries[:, j], samples[:, j], out=diff)
+        np.multiply(diff, diff, out=diff)
+        dist += diff
+    return np.sqrt(dist)
+
+
+def nearest(dist: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k nearest samples per row, in std::sort order of (distance, index)"""
+    m, n = dist.shape
+    k = min(k, n)
+    if k == 0:
+        return np.empty((m, 0), dtype=np.intp)
+    if k == n:
+        candidates = np.broadcast_to(np.arange(n), (m, n))
+    else:
+        candidates = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        # argpartition picks arbitrarily among samples tied with the k-th
+        # distance; std::sort keeps the lowest indices, so redo those rows
+        kth = np.take_along_axis(dist, candidates, axis=1).max(axis=1)
+        tied = np.flatnonzero(np.count_nonzero(dist <= kth[:, None], axis=1) > k)
+        if len(tied):
+            candidates = candidates.copy()
+            for row in tied:
+                candidates[row] = np.lexsort((np.arange(n), dist[row]))[:k]
+
+    order = np.lexsort((candidates, np.take_along_axis(dist, candidates, axis=1)), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class KNNClassifier:
+    """Batch k-NN classifier with the firmware's distance and voting rules"""
+
+    def __init__(self, k: int = K_VALUE, max_samples: Optional[int] = None,
+                 block_size: int = 512, backend: str = 'auto',
+                 scaler: Optional['FeatureScaler'] = None) -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}, not {backend!r}")
+        self.k = k
+        self.backend = backend
+        self.max_samples = max_samples  # None keeps every sample; MAX_SAMPLES mimics the device
+        self.block_size = block_size
+        self.scaler = scaler  # None measures distance like the firmware
+        self.features = np.empty((0, NUM_FEATURES), dtype=np.float32)
+        self.labels = np.empty(0, dtype=f'U{MAX_LABEL_LENGTH}')
+        self.classes = np.empty(0, dtype=f'U{MAX_LABEL_LENGTH}')  # sorted, i.e. std::map order
+        self.class_ids = np.empty(0, dtype=np.int16)
+        self._scaled = np.empty((0, NUM_FEATURES), dtype=np.float32)  # scaler.transform(features)
+        self._index: Optional[KDTreeIndex] = None  # Covers the first len(self._index) samples
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def fit(self, features: np.ndarray, labels: Iterable[str]) -> 'KNNClassifier':
+        """Replace the training set"""
+        self.features = np.empty((0, NUM_FEATURES), dtype=np.float32)
+        self.labels = np.empty(0, dtype=f'U{MAX_LABEL_LENGTH}')
+        self._scaled = np.empty((0, NUM_FEATURES), dtype=np.float32)
+        self._index = None
+        return self.partial_fit(features, labels)
+
+    def partial_fit(self, features: np.ndarray, labels: Iterable[str]) -> 'KNNClassifier':
+        """Append samples, evicting the oldest beyond max_samples like the device"""
+        features = np.asarray(features, dtype=np.float32).reshape(-1, NUM_FEATURES)
+        # The device stores labels in a char[20], keeping 19 characters
+        labels = np.array([label[:MAX_LABEL_LENGTH - 1] for label in labels], dtype=f'U{MAX_LABEL_LENGTH}')
+        if len(labels) != len(features):
+            raise ValueError(f"{len(features)} feature rows but {len(labels)} labels")
+
+        self.features = np.concatenate([self.features, features])
+        self.labels = np.concatenate([self.labels, labels])
+        if self.scaler is not None:
+            self._scaled = np.concatenate([self._scaled, self.scaler.transform(features)])
+        if self.max_samples is not None and len(self.labels) > self.max_samples:
+            self.features = self.features[-self.max_samples:]
+            self.labels = self.labels[-self.max_samples:]
+            self._scaled = self._scaled[-self.max_samples:]
+            self._index = None  # Sample numbers shifted; rebuild on the next query
+        self._update_classes()
+        return self
+
+    def add_sample(self, features: Sequence[float], label: str) -> None:
+        """Append one sample, evicting the oldest when max_samples is reached"""
+        self.partial_fit(features, [label])
+
+    def _update_classes(self) -> None:
+        # Sorting by code point matches strcmp order on the UTF-8 labels
+        self.classes, ids = np.unique(self.labels, return_inverse=True)
+        self.class_ids = ids.astype(np.int16)
+
+    def use_kdtree(self) -> bool:
+        return self.backend == 'kdtree' or (self.backend == 'auto' and len(self) >= KDTREE_MIN_SAMPLES)
+
+    def _kdtree(self) -> KDTreeIndex:
+        """The KD-tree index, extended with any samples added since the last query"""
+        if self._index is None:
+            self._index = KDTreeIndex(NUM_FEATURES)
+        if len(self._index) < len(self):
+            self._index.add(self._space(self.features[len(self._index):]))
+        return self._index
+
+    def _space(self, features: np.ndarray) -> np.ndarray:
+        """Features in the space distances are measured in"""
+        if self.scaler is None:
+            return scale_features(features)
+        return self.scaler.transform(features)
+
+    def _distance(self, queries: np.ndarray, samples: Optional[np.ndarray] = None) -> np.ndarray:
+        """Distances from raw queries to the given training sample numbers (default all)"""
+        if self.scaler is None:
+            return compute_distance(queries, self.features if samples is None else self.features[samples])
+        scaled = self._scaled if samples is None else self._scaled[samples]
+        return euclidean_distance(self.scaler.transform(queries), scaled)
+
+    def kneighbors(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (distances, indices) of the k nearest samples for each query"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, NUM_FEATURES)
+        k = min(self.k, len(self))
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        indices = np.empty((len(queries), k), dtype=np.intp)
+        if k and self.use_kdtree():
+            index = self._kdtree()
+            for row, query in enumerate(self._space(queries)):
+                found_d, found = index.query(query, k + 1)
+                # The tree ranks in float64. If the next sample is within the
+                # margin, float32 rounding could swap it into the top k, so fetch
+                # every such sample and rank them all like the device
+                radius = found_d[k - 1] * (1 + KDTREE_RADIUS_MARGIN) + 1e-30
+                if len(found) > k and found_d[k] <= radius:
+                    _, found = index.query_radius(query, radius)
+                else:
+                    found = found[:k]
+                dist = self._distance(queries[row], found)[0]
+                order = np.lexsort((found, dist))[:k]
+                indices[row] = found[order]
+                distances[row] = dist[order]
+            return distances, indices
+
+        for start in range(0, len(queries), self.block_size):
+            block = slice(start, start + self.block_size)
+            dist = self._distance(queries[block])
+            indices[block] = nearest(dist, k)
+            distances[block] = np.take_along_axis(dist, indices[block], axis=1)
+        return distances, indices
+
+    def predict(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Classify a batch of feature vectors, returning (labels, confidences)"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, NUM_FEATURES)
+        if len(self) == 0:
+            return (np.full(len(queries), UNKNOWN_LABEL, dtype=f'U{MAX_LABEL_LENGTH}'),
+                    np.zeros(len(queries), dtype=np.float32))
+
+        _, indices = self.kneighbors(queries)
+        k = indices.shape[1]
+        votes = np.zeros((len(queries), len(self.classes)), dtype=np.int32)
+        rows = np.arange(len(queries))
+        neighbor_ids = self.class_ids[indices]
+        for j in range(k):
+            votes[rows, neighbor_ids[:, j]] += 1
+
+        # argmax returns the first maximum, like the strict > scan over the map
+        best = votes.argmax(axis=1)
+        confidence = (votes[rows, best] / np.float32(k)).astype(np.float32)
+        return self.classes[best], confidence
+
+    def classify(self, features: Sequence[float]) -> Tuple[str, float]:
+        """Classify one feature vector, like KNNClassifier::classify"""
+        labels, confidence = self.predict(np.asarray(features, dtype=np.float32))
+        return str(labels[0]), float(confidence[0])
@@ -0,0 +1,230 @@
+"""
+Live time-series plot of the feature stream on a Tk canvas.
+
+Each series is reduced to one min/max pair per pixel column as it arrives:
+MinMaxColumns is a ring with one slot per column of the plot, each covering
+span / width seconds, and a record only updates the slot for its timestamp.
+A redraw turns the slots into one envelope polyline per series (a vertical
+stroke per column from min to max) and moves the existing canvas items to
+the new coordinates instead of recreating them, so the cost of a frame
+depends on the plot width, not on how much history is held. The columns
+are rebuilt from the FeatureHistory only when the span or the size changes.
+"""
+import math
+import time
+import tkinter as tk
+from tkinter import ttk
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .feature_history import FeatureHistory
+    from .protocol import FEATURE_NAMES
+except ImportError:  # Running as a script from the python_gui directory
+    from feature_history import FeatureHistory
+    from protocol import FEATURE_NAMES
+
+
+class Panel(NamedTuple):
+    title: str
+    series: Tuple[str, ...]  # Feature names, or 'confidence'
+    colors: Tuple[str, ...]
+
+
+PANELS = (
+    Panel("RMS", ('rms',), ('#1f77b4',)),
+    Panel("Spectral centroid (Hz)", ('spectral_centroid',), ('#ff7f0e',)),
+    Panel("Band energy (low / mid / high)", ('low_energy', 'mid_energy', 'high_energy'),
+          ('#2ca02c', '#d62728', '#9467bd')),
+    Panel("Confidence", ('confidence',), ('#7f7f7f',)),
+)
+SPANS = {'1 min': 60.0, '10 min': 600.0, '1 h': 3600.0, '6 h': 21600.0}
+
+
+def series_values(features: np.ndarray, confidence: np.ndarray, names: Sequence[str]) -> np.ndarray:
+    """Columns of features (and confidence) in the order of names, as float64 (n, len(names))"""
+    columns = [confidence if name == 'confidence' else features[:, FEATURE_NAMES.index(name)] for name in names]
+    return np.column_stack(columns).astype(np.float64) if len(features) else np.empty((0, len(names)))
+
+
+class MinMaxColumns:
+    """Per-column min and max of several series over the newest span seconds"""
+
+    def __init__(self, span: float, columns: int, series: int) -> None:
+        self.span = span
+        self.columns = max(1, columns)
+        self.width = span / self.columns
+        self.ids = np.full(self.columns, -1, dtype=np.int64)  # Absolute column number held by each slot
+        self.low = np.full((self.columns, series), np.inf)
+        self.high = np.full((self.columns, series), -np.inf)
+
+    def add(self, timestamps: np.ndarray, values: np.ndarray) -> None:
+        if not len(timestamps):
+            return
+        numbers = np.floor(timestamps / self.width).astype(np.int64)
+        if numbers[0] == numbers[-1]:
+            # The usual case: a whole UI batch falls into one column
+            self._add_column(int(numbers[0]), values.min(axis=0), values.max(axis=0))
+            return
+        edges = np.flatnonzero(np.diff(numbers)) + 1
+        starts = np.concatenate([[0], edges])
+        low = np.minimum.reduceat(values, starts)
+        high = np.maximum.reduceat(values, starts)
+        for number, lo, hi in zip(numbers[starts].tolist(), low, high):
+            self._add_column(number, lo, hi)
+
+    def _add_column(self, number: int, low: np.ndarray, high: np.ndarray) -> None:
+        slot = number % self.columns
+        if number < self.ids[slot]:
+            return  # Older than the span
+        if number > self.ids[slot]:
+            self.ids[slot] = number
+            self.low[slot] = low
+            self.high[slot] = high
+        else:
+            np.minimum(self.low[slot], low, out=self.low[slot])
+            np.maximum(self.high[slot], high, out=self.high[slot])
+
+    def view(self, now: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(column positions 0..columns-1 from the left, low, high) of the columns with data"""
+        current = math.floor(now / self.width)
+        positions = self.ids - (current - self.columns + 1)
+        live = (positions >= 0) & (positions < self.columns)
+        order = np.argsort(positions[live], kind='stable')
+        return positions[live][order], self.low[live][order], self.high[live][order]
+
+
+def envelope_coords(positions: np.ndarray, low: np.ndarray, high: np.ndarray,
+                    left: float, top: float, height: float, y_min: float, y_max: float) -> List[float]:
+    """Flat canvas coordinates of a min/max envelope: x, y_high, x, y_low for every column"""
+    scale = height / (y_max - y_min) if y_max > y_min else 0.0
+    x = left + positions.astype(np.float64)
+    coords = np.empty((len(positions), 4))
+    coords[:, 0] = x
+    coords[:, 1] = top + height - (high - y_min) * scale
+    coords[:, 2] = x
+    coords[:, 3] = top + height - (low - y_min) * scale
+    return coords.ravel().tolist()
+
+
+class LivePlot(ttk.Frame):
+    """Stacked plots of rms, spectral centroid, band energies and confidence"""
+
+    MARGIN_LEFT = 60
+    MARGIN_RIGHT = 8
+    PANEL_GAP = 18
+
+    def __init__(self, parent: tk.Misc, history: FeatureHistory, span: float = 600.0) -> None:
+        super().__init__(parent)
+        self.history = history
+        self.span = span
+        self.names = [name for panel in PANELS for name in panel.series]
+        self.columns: Optional[MinMaxColumns] = None
+        self.dirty = True
+        self.drawn_column = -1  # Newest column on screen; the plot scrolls when it changes
+        self.frame_times: List[float] = []
+
+        controls = ttk.Frame(self)
+        controls.pack(side=tk.TOP, fill=tk.X)
+        ttk.Label(controls, text="History:").pack(side=tk.LEFT)
+        self.span_var = tk.StringVar(value=next((k for k, v in SPANS.items() if v == span), '10 min'))
+        span_box = ttk.Combobox(controls, textvariable=self.span_var, values=list(SPANS), width=8, state='readonly')
+        span_box.pack(side=tk.LEFT, padx=5)
+        span_box.bind('<<ComboboxSelected>>', lambda event: self.set_span(SPANS[self.span_var.get()]))
+        self.fps_label = ttk.Label(controls, text="")
+        self.fps_label.pack(side=tk.RIGHT)
+
+        self.canvas = tk.Canvas(self, background='white', highlightthickness=0, width=500, height=400)
+        self.canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.canvas.bind('<Configure>', lambda event: self.rebuild())
+        self.lines: List[int] = []
+        self.titles: List[int] = []
+        self.range_labels: List[Tuple[int, int]] = []
+        self.boxes: List[int] = []
+        self._create_items()
+
+    def _create_items(self) -> None:
+        """Create every canvas item once; redraws only move them"""
+        for panel in PANELS:
+            self.boxes.append(self.canvas.create_rectangle(0, 0, 0, 0, outline='#cccccc'))
+            self.titles.append(self.canvas.create_text(0, 0, anchor='sw', text=panel.title, font=("Arial", 8)))
+            self.range_labels.append((self.canvas.create_text(0, 0, anchor='ne', font=("Arial", 7)),
+                                      self.canvas.create_text(0, 0, anchor='se', font=("Arial", 7))))
+            for color in panel.colors:
+                self.lines.append(self.canvas.create_line(0, 0, 0, 0, fill=color, width=1))
+
+    def plot_width(self) -> int:
+        return max(1, self.canvas.winfo_width() - self.MARGIN_LEFT - self.MARGIN_RIGHT)
+
+    def set_span(self, span: float) -> None:
+        self.span = span
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """Recompute the columns from the history, e.g. after a resize"""
+        self.columns = MinMaxColumns(self.span, self.plot_width(), len(self.names))
+        window = self.history.since(time.time() - self.span)
+        self.columns.add(window.timestamps, series_values(window.features, window.confidence, self.names))
+        self.dirty = True
+
+    def add(self, timestamps: np.ndarray, features: np.ndarray, confidence: np.ndarray) -> None:
+        """Fold newly received frames into the columns"""
+        if self.columns is None:
+            return
+        self.columns.add(timestamps, series_values(features, confidence, self.names))
+        self.dirty = True
+
+    def needs_redraw(self, now: Optional[float] = None) -> bool:
+        """Whether new data arrived or the plot has to scroll by a column"""
+        if self.columns is None or self.dirty:
+            return True
+        return math.floor((time.time() if now is None else now) / self.columns.width) != self.drawn_column
+
+    def redraw(self, now: Optional[float] = None) -> None:
+        """Move the envelopes to the current data; call once per UI frame"""
+        if self.columns is None:
+            self.rebuild()
+        assert self.columns is not None
+        now = time.time() if now is None else now
+        started = time.perf_counter()
+        positions, low, high = self.columns.view(now)
+
+        height = self.canvas.winfo_height()
+        panel_height = max(10.0, (height - self.PANEL_GAP * len(PANELS)) / len(PANELS))
+        left = self.MARGIN_LEFT
+        right = left + self.plot_width()
+        line = 0
+        column = 0
+        for index, panel in enumerate(PANELS):
+            top = self.PANEL_GAP + index * (panel_height + self.PANEL_GAP)
+            self.canvas.coords(self.boxes[index], left, top, right, top + panel_height)
+            self.canvas.coords(self.titles[index], left, top - 2)
+            series = slice(column, column + len(panel.series))
+            if len(positions):
+                y_min = float(low[:, series].min())
+                y_max = float(high[:, series].max())
+                if y_max <= y_min:
+                    y_max = y_min + 1.0
+            else:
+                y_min, y_max = 0.0, 1.0
+            top_label, bottom_label = self.range_labels[index]
+            self.canvas.coords(top_label, left - 4, top)
+            self.canvas.itemconfigure(top_label, text=f"{y_max:.4g}")
+            self.canvas.coords(bottom_label, left - 4, top + panel_height)
+            self.canvas.itemconfigure(bottom_label, text=f"{y_min:.4g}")
+            for offset in range(len(panel.series)):
+                coords = envelope_coords(positions, low[:, column + offset], high[:, column + offset],
+                                         left, top, panel_height, y_min, y_max)
+                # A line needs two points even without data
+                self.canvas.coords(self.lines[line], *(coords if len(coords) >= 4 else [0, 0, 0, 0]))
+                line += 1
+            column += len(panel.series)
+
+        self.dirty = False
+        self.drawn_column = math.floor(now / self.columns.width)
+        self.frame_times.append(time.perf_counter() - started)
+        if len(self.frame_times) >= 30:
+            average = sum(self.frame_times) / len(self.frame_times)
+            self.fps_label.config(text=f"{average * 1e3:.1f} ms/redraw")
+            self.frame_times.clear()
@@ -0,0 +1,89 @@
+"""
+Log pane for the GUI that stays fast after days of uptime.
+
+write() may be called from any thread: it only timestamps the message,
+hands it to the rotating log file and puts it on a bounded queue. flush()
+runs once per UI tick on the Tk thread and inserts everything queued with
+a single Text.insert, then trims the oldest lines with a single delete so
+the widget never holds more than max_lines. During an error storm the
+queue fills up and further messages are only counted; the pane shows how
+many were skipped while the log file still has all of them.
+"""
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import tkinter as tk
+from datetime import datetime
+from typing import List, Optional
+
+LOG_PATH = os.path.join(os.path.expanduser('~'), '.esp32_noise_logger.log')
+
+
+class LogConsole:
+    """Thread-safe front end for a Tk Text log with a line cap and a rotating file"""
+
+    def __init__(self, text: tk.Text, max_lines: int = 5000, max_pending: int = 10000,
+                 log_path: Optional[str] = LOG_PATH, max_bytes: int = 5 * 1024 * 1024,
+                 backup_count: int = 3) -> None:
+        self.text = text
+        self.max_lines = max_lines
+        self.pending: queue.Queue[str] = queue.Queue(max_pending)
+        self.skipped = 0  # Messages not shown because the queue was full
+        self._skipped_lock = threading.Lock()
+
+        self.logger = logging.getLogger("noise_logger_gui")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.handler: Optional[logging.Handler] = None
+        if log_path:
+            try:
+                self.handler = logging.handlers.RotatingFileHandler(
+                    log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            except OSError:
+                pass  # The pane still works without the file
+            else:
+                self.handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                self.logger.addHandler(self.handler)
+
+    def write(self, message: str) -> None:
+        """Queue a message for the pane and log it to the file; safe from any thread"""
+        self.logger.info(message)
+        try:
+            self.pending.put_nowait(f"[{datetime.now().strftime('%H:%M:%S')}] {message}\n")
+        except queue.Full:
+            with self._skipped_lock:
+                self.skipped += 1
+
+    def flush(self, max_batch: int = 1000) -> int:
+        """Insert up to max_batch queued messages and trim the pane; Tk thread only"""
+        lines: List[str] = []
+        try:
+            while len(lines) < max_batch:
+                lines.append(self.pending.get_nowait())
+        except queue.Empty:
+            pass
+        with self._skipped_lock:
+            skipped, self.skipped = self.skipped, 0
+        if skipped:
+            lines.append(f"[{datetime.now().strftime('%H:%M:%S')}] ... {skipped} messages skipped "
+                         f"(see the log file)\n")
+        if not lines:
+            return 0
+
+        # Only follow the end if the user has not scrolled up to read something
+        at_end = self.text.yview()[1] >= 0.999
+        self.text.insert(tk.END, ''.join(lines))
+        line_count = int(self.text.index('end-1c').split('.')[0])
+        if line_count > self.max_lines:
+            self.text.delete('1.0', f'{line_count - self.max_lines + 1}.0')
+        if at_end:
+            self.text.see(tk.END)
+        return len(lines)
+
+    def close(self) -> None:
+        if self.handler is not None:
+            self.logger.removeHandler(self.handler)
+            self.handler.close()
+            self.handler = None
@@ -5,33 +5,69 @@ import serial.tools.list_ports
 import threading
 import time
 import queue
-from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .feature_history import FeatureHistory
+    from .live_plot import LivePlot
+    from .log_console import LogConsole
+    from .ports import discover_esp32, find_esp32_port, probe_port
+    from .protocol import DATASET_LABELS, FEATURE_NAMES, DatasetInfo, Message, StatusRecord, parse_chunk
+    from .rolling_stats import RollingStats, format_window
+    from .serial_reader import SerialLineReader
+except ImportError:  # Running as a script from the python_gui directory
+    from feature_history import FeatureHistory
+    from live_plot import LivePlot
+    from log_console import LogConsole
+    from ports import discover_esp32, find_esp32_port, probe_port
+    from protocol import DATASET_LABELS, FEATURE_NAMES, DatasetInfo, Message, StatusRecord, parse_chunk
+    from rolling_stats import RollingStats, format_window
+    from serial_reader import SerialLineReader
 
 class ESP32NoiseLoggerGUI:
     def __init__(self, root: tk.Tk) -> None:
         self.root = root
         self.root.title("ESP32 Noise Logger - Real-time Audio Classification")
-        self.root.geometry("1200x800")
-        self.root.minsize(1000, 600)
+        self.root.geometry("1500x800")
+        self.root.minsize(1200, 600)
         
         # Serial connection
         self.serial_connection: Optional[serial.Serial] = None
         self.connected: bool = False
         
-        # Data storage
-        self.feature_history: List[Dict[str, float]] = []
-        self.classification_history: List[str] = []
-        self.max_history: int = 100
+        # Data storage (one day of frames at the firmware's 1 Hz rate)
+        self.history_capacity: int = 86400
+        self.feature_history: FeatureHistory = FeatureHistory(self.history_capacity)
+        self.rolling_stats: RollingStats = RollingStats()  # Leq, percentiles and duty cycles
         
         # Threading
-        self.data_queue: queue.Queue[str] = queue.Queue()
+        self.data_queue: queue.Queue[Tuple[float, str]] = queue.Queue()  # (time received, line)
+        self.ui_calls: queue.Queue[Callable[[], None]] = queue.Queue()  # Run on the Tk thread
+        self.discovery_cancel: Optional[threading.Event] = None  # Set while a port search runs
         self.running: bool = True
         
         # Current features
         self.current_features: Optional[Dict[str, float]] = None
         self.current_classification: str = "unknown"
         self.current_confidence: float = 0.0
+        self.current_status: Optional[StatusRecord] = None
+        
+        # Render pipeline: the queue is drained within a time budget and the
+        # widgets are redrawn at most once per UI frame with the newest state
+        self.ui_frame_interval_ms: int = 33
+        self.queue_time_budget: float = 0.015  # seconds of draining per UI frame
+        self.max_batch_lines: int = 2000       # keeps the bulk parse inside the budget
+        self.features_dirty: bool = False
+        self.status_dirty: bool = False
+        self.ui_stats: Dict[str, int] = {
+            'frames_received': 0,   # FEATURES lines parsed
+            'frames_rendered': 0,   # FEATURES frames actually drawn
+            'frames_coalesced': 0,  # FEATURES frames superseded before being drawn
+            'backlog': 0,           # lines left in the queue when the budget ran out
+        }
+        self.last_stats_update: float = 0.0
         
         # GUI elements
         self.port_var: tk.StringVar = tk.StringVar()
@@ -43,10 +79,14 @@ class ESP32NoiseLoggerGUI:
         self.uptime_label: ttk.Label
         self.samples_label: ttk.Label
         self.memory_label: ttk.Label
+        self.ui_stats_label: ttk.Label
         self.classification_label: ttk.Label
         self.confidence_label: ttk.Label
+        self.noise_stats_label: ttk.Label
         self.dataset_info_label: ttk.Label
+        self.live_plot: LivePlot
         self.log_text: scrolledtext.ScrolledText
+        self.log_console: LogConsole
         
         self.setup_ui()
         self.auto_connect_serial()
@@ -64,6 +104,7 @@ class ESP32NoiseLoggerGUI:
         main_frame.grid_rowconfigure(6, weight=1)
         main_frame.grid_columnconfigure(0, weight=1)
         main_frame.grid_columnconfigure(1, weight=1)
+        main_frame.grid_columnconfigure(2, weight=2)
         
         # Connection status and controls
         connection_frame = ttk.Frame(main_frame)
@@ -97,7 +138,10 @@ class ESP32NoiseLoggerGUI:
         self.samples_label.grid(row=0, column=1, padx=(0, 20))
         
         self.memory_label = ttk.Label(status_frame, text="Free Memory: --")
-        self.memory_label.grid(row=0, column=2)
+        self.memory_label.grid(row=0, column=2, padx=(0, 20))
+        
+        self.ui_stats_label = ttk.Label(status_frame, text="UI: --")
+        self.ui_stats_label.grid(row=0, column=3)
         
         # Real-time results frame
         results_frame = ttk.LabelFrame(main_frame, text="Real-time Classification", padding="10")
@@ -123,6 +167,9 @@ class ESP32NoiseLoggerGUI:
             label.grid(row=row, column=col, sticky="w", padx=(0, 20), pady=2)
             self.feature_labels[name.lower().replace(" ", "_")] = label
         
+        self.noise_stats_label = ttk.Label(results_frame, text="Statistics: --", justify=tk.LEFT, font=("Courier", 9))
+        self.noise_stats_label.grid(row=3, column=0, columnspan=2, sticky="w", pady=(10, 0))
+        
         # Labeling frame
         label_frame = ttk.LabelFrame(main_frame, text="Label Current Sound", padding="10")
         label_frame.grid(row=3, column=0, columnspan=2, sticky="ew", pady=(0, 10))
@@ -173,120 +220,68 @@ class ESP32NoiseLoggerGUI:
         
         self.log_text = scrolledtext.ScrolledText(log_frame, height=10, wrap=tk.WORD)
         self.log_text.grid(row=0, column=0, sticky="nsew")
+        self.log_console = LogConsole(self.log_text)
+        
+        # Live plot beside everything below the connection controls
+        plot_frame = ttk.LabelFrame(main_frame, text="Live Plot", padding="5")
+        plot_frame.grid(row=1, column=2, rowspan=6, sticky="nsew", padx=(10, 0))
+        self.live_plot = LivePlot(plot_frame, self.feature_history)
+        self.live_plot.pack(fill=tk.BOTH, expand=True)
 
     def find_esp32_port(self) -> Optional[str]:
         """Find ESP32 board port by checking device descriptions and VID/PID"""
-        esp32_keywords = [
-            'CP210x',  # Silicon Labs CP2102 (common on ESP32 boards)
-            'CH340',   # WCH CH340 USB-to-Serial
-            'CH341',   # WCH CH341 USB-to-Serial
-            'FTDI',    # FTDI USB-to-Serial
-            'ESP32',   # Direct ESP32 reference
-            'Silicon Labs',  # Silicon Labs devices
-            'USB-SERIAL CH340',  # CH340 description
-            'USB2.0-Serial',     # Generic USB serial
-        ]
-        
-        # Known ESP32 VID:PID combinations
-        esp32_vid_pids = [
-            (0x10C4, 0xEA60),  # Silicon Labs CP2102/CP2104
-            (0x1A86, 0x7523),  # WCH CH340
-            (0x1A86, 0x55D4),  # WCH CH341
-            (0x0403, 0x6001),  # FTDI FT232R
-            (0x0403, 0x6010),  # FTDI FT2232H
-            (0x303A, 0x1001),  # Espressif ESP32-S2
-            (0x303A, 0x1002),  # Espressif ESP32-S3
-        ]
-        
         try:
-            ports = list(serial.tools.list_ports.comports())
-            self.log_message(f"Scanning {len(ports)} available ports for ESP32...")
-            
-            for port in ports:
-                # Log port details for debugging
-                self.log_message(f"Checking port {port.device}: {port.description}")
-                
-                # Check by VID/PID first (most reliable)
-                if hasattr(port, 'vid') and hasattr(port, 'pid') and port.vid and port.pid:
-                    if (port.vid, port.pid) in esp32_vid_pids:
-                        self.log_message(f"Found ESP32 by VID/PID: {port.device} (VID:{port.vid:04X}, PID:{port.pid:04X})")
-                        return port.device
-                
-                # Check by description keywords
-                description = (port.description or "").upper()
-                manufacturer = (port.manufacturer or "").upper()
-                
-                for keyword in esp32_keywords:
-                    if keyword.upper() in description or keyword.upper() in manufacturer:
-                        self.log_message(f"Found potential ESP32 by description: {port.device} ({port.description})")
-                        return port.device
-                        
-            return None
-            
+            return find_esp32_port(self.log_message)
         except Exception as e:
             self.log_message(f"Error scanning ports: {e}")
             return None
 
     def test_esp32_connection(self, port: str) -> bool:
         """Test if the given port has an ESP32 with our firmware"""
-        try:
-            self.log_message(f"Testing connection to {port}...")
-            test_connection = serial.Serial(port, 115200, timeout=2)
-            time.sleep(2)  # Wait for ESP32 to reset and initialize
-            
-            # Send multiple test commands to verify it's our firmware
-            test_commands = ["GET_STATUS", "GET_FEATURES", "PING"]
-            
-            for cmd in test_commands:
-                test_connection.write((cmd + "\n").encode())
-                time.sleep(0.5)
-                
-                # Read any available responses
-                responses: List[str] = []
-                while test_connection.in_waiting > 0:
-                    response = test_connection.readline().decode().strip()
-                    if response:
-                        responses.append(response)
-                        
-                # Check for expected response patterns
-                for response in responses:
-                    if any(pattern in response for pattern in ["STATUS:", "FEATURES:", "ERROR:", "OK:"]):
-                        test_connection.close()
-                        self.log_message(f"✓ ESP32 Noise Logger confirmed on {port}")
-                        return True
-                        
-            test_connection.close()
+        self.log_message(f"Testing connection to {port}...")
+        connection = probe_port(port)
+        if connection is None:
             self.log_message(f"✗ No valid response from {port}")
             return False
-            
-        except Exception as e:
-            self.log_message(f"✗ Connection test failed on {port}: {e}")
-            return False
+        connection.close()
+        self.log_message(f"✓ ESP32 Noise Logger confirmed on {port}")
+        return True
+
+    def call_soon(self, callback: Callable[[], None]) -> None:
+        """Run callback on the Tk thread; safe to call from any thread"""
+        self.ui_calls.put(callback)
 
     def auto_connect_serial(self) -> None:
-        """Automatically connect to ESP32 with enhanced detection"""
+        """Probe every port for the ESP32 in the background and connect to the first that answers"""
+        if self.discovery_cancel is not None:
+            return  # A search is already running
         self.connection_status.config(text="Searching for ESP32...", foreground="orange")
         self.log_message("=== Starting ESP32 Auto-Detection ===")
-        
-        try:
-            # First, try to find ESP32 by hardware detection
-            esp32_port = self.find_esp32_port()
-            
-            if esp32_port:
-                self.log_message(f"Attempting connection to detected ESP32 on {esp32_port}")
-                if self.test_esp32_connection(esp32_port):
-                    self.connect_to_port(esp32_port)
-                    return
-                    
-            # If hardware detection fails, test all available ports
-            self.log_message("Hardware detection failed, testing all available ports...")
-            ports = list(serial.tools.list_ports.comports())
-            
-            for port in ports:
-                if self.test_esp32_connection(port.device):
-                    self.connect_to_port(port.device)
-                    return
-                    
+        cancel = self.discovery_cancel = threading.Event()
+
+        def search() -> None:
+            try:
+                connection = discover_esp32(cancel=cancel, log=self.log_message)
+                error = None
+            except Exception as e:
+                connection, error = None, e
+            self.call_soon(lambda: self.discovery_finished(connection, error))
+
+        threading.Thread(target=search, daemon=True).start()
+
+    def discovery_finished(self, connection: Optional[serial.Serial], error: Optional[Exception]) -> None:
+        """Use the connection found by auto_connect_serial, on the Tk thread"""
+        self.discovery_cancel = None
+        if not self.running:
+            if connection:
+                connection.close()
+            return
+        if error is not None:
+            self.connection_status.config(text=f"Auto-connect error: {str(error)}", foreground="red")
+            self.connected = False
+            self.log_message(f"Auto-connect error: {str(error)}")
+            return
+        if connection is None:
             # No ESP32 found
             self.connection_status.config(text="No ESP32 Noise Logger found", foreground="red")
             self.connected = False
@@ -295,33 +290,65 @@ class ESP32NoiseLoggerGUI:
             self.log_message("  - ESP32 is connected via USB")
             self.log_message("  - Correct firmware is uploaded") 
             self.log_message("  - Drivers are installed")
-            
-        except Exception as e:
-            self.connection_status.config(text=f"Auto-connect error: {str(e)}", foreground="red")
-            self.connected = False
-            self.log_message(f"Auto-connect error: {str(e)}")
+            self.log_message("  - Other ports can be tried with Manual Connect")
+            return
+        self.use_connection(connection)
 
-    def connect_to_port(self, port: str) -> None:
-        """Connect to a specific port"""
+    def use_connection(self, connection: serial.Serial) -> None:
+        """Switch to an open connection to a board that has finished booting, on the Tk thread"""
+        if self.serial_connection and self.serial_connection.is_open:
+            self.serial_connection.close()  # Connected manually while the search ran
         try:
-            self.serial_connection = serial.Serial(port, 115200, timeout=1)
-            time.sleep(2)  # Wait for ESP32 to reset
-            
-            self.connected = True
-            self.connection_status.config(text=f"✓ Connected: {port}", foreground="green")
-            self.log_message(f"🔗 Successfully connected to ESP32 on {port}")
-            
-            # Send initial commands to sync
-            self.serial_connection.write(b"GET_STATUS\n")
-            
-        except Exception as e:
+            # The board has finished booting, so this is answered straight away
+            connection.write(b"GET_STATUS\n")
+        except (serial.SerialException, OSError) as e:
+            # Unplugged between the probe and now
+            connection.close()
+            self.serial_connection = None
             self.connected = False
             self.connection_status.config(text=f"Connection failed: {str(e)}", foreground="red")
-            self.log_message(f"Connection failed to {port}: {str(e)}")
-            
-            if self.serial_connection and self.serial_connection.is_open:
-                self.serial_connection.close()
-                self.serial_connection = None
+            self.log_message(f"Connection failed to {connection.port}: {str(e)}")
+            return
+        self.serial_connection = connection
+        self.connected = True
+        self.connection_status.config(text=f"✓ Connected: {connection.port}", foreground="green")
+        self.log_message(f"🔗 Successfully connected to ESP32 on {connection.port}")
+
+    def connect_to_port(self, port: str) -> None:
+        """Connect to a specific port, waiting for the board to reset in the background"""
+        if self.discovery_cancel is not None:
+            self.log_message("A connection attempt is already running")
+            return
+        self.connection_status.config(text=f"Connecting to {port}...", foreground="orange")
+        cancel = self.discovery_cancel = threading.Event()
+
+        def connect() -> None:
+            try:
+                # Opening the port resets the board; wait until the firmware answers
+                connection = probe_port(port, cancel=cancel)
+                if connection is None and not cancel.is_set():
+                    self.log_message(f"No response from {port} yet, connecting anyway")
+                    connection = serial.Serial(port, 115200, timeout=1)
+                error = None
+            except Exception as e:
+                connection, error = None, e
+            self.call_soon(lambda: self.connect_finished(port, connection, error))
+
+        threading.Thread(target=connect, daemon=True).start()
+
+    def connect_finished(self, port: str, connection: Optional[serial.Serial], error: Optional[Exception]) -> None:
+        """Use the connection opened by connect_to_port, on the Tk thread"""
+        self.discovery_cancel = None
+        if not self.running:
+            if connection:
+                connection.close()
+            return
+        if connection is None:
+            self.connected = False
+            self.connection_status.config(text=f"Connection failed: {str(error)}", foreground="red")
+            self.log_message(f"Connection failed to {port}: {str(error)}")
+            return
+        self.use_connection(connection)
 
     def manual_connect_dialog(self) -> None:
         """Show manual port selection dialog"""
@@ -383,8 +410,9 @@ class ESP32NoiseLoggerGUI:
         """Reconnect to ESP32 - disconnect first if connected, then auto-connect"""
         if self.connected:
             self.disconnect_esp32()
-            time.sleep(1)  # Wait a moment before reconnecting
-        self.auto_connect_serial()
+            self.root.after(1000, self.auto_connect_serial)  # Wait a moment before reconnecting
+        else:
+            self.auto_connect_serial()
 
     def disconnect_esp32(self) -> None:
         """Disconnect from ESP32"""
@@ -443,17 +471,29 @@ class ESP32NoiseLoggerGUI:
     def start_data_thread(self) -> None:
         """Start background thread for data reception"""
         def data_receiver():
+            reader: Optional[SerialLineReader] = None
             while self.running:
+                connection = self.serial_connection
+                if not (self.connected and connection and connection.is_open):
+                    reader = None
+                    time.sleep(0.1)  # Idle until a connection is established
+                    continue
+
+                if reader is None or reader.port is not connection:
+                    reader = SerialLineReader(connection)
+
                 try:
-                    if self.connected and self.serial_connection and self.serial_connection.is_open:
-                        if self.serial_connection.in_waiting > 0:
-                            line = self.serial_connection.readline().decode().strip()
-                            if line:
-                                self.data_queue.put(line)
+                    # Blocks on the port and drains every complete line in one wakeup
+                    lines = reader.read_lines()
+                    # Stamped here, so a UI that falls behind still records when frames arrived
+                    received = time.time()
+                    for line in lines:
+                        self.data_queue.put((received, line))
                 except Exception as e:
-                    self.log_message(f"Data reception error: {str(e)}")
-                    self.connected = False
-                time.sleep(0.01)
+                    if connection is self.serial_connection:
+                        self.log_message(f"Data reception error: {str(e)}")
+                        self.connected = False
+                    reader = None
         
         self.data_thread = threading.Thread(target=data_receiver, daemon=True)
         self.data_thread.start()
@@ -462,113 +502,131 @@ class ESP32NoiseLoggerGUI:
         self.process_queue()
 
     def process_queue(self) -> None:
-        """Process incoming data from queue"""
+        """Drain incoming data within the time budget and redraw once"""
+        deadline = time.perf_counter() + self.queue_time_budget
+        budget_exhausted = False
         try:
-            while not self.data_queue.empty():
-                line = self.data_queue.get_nowait()
-                self.process_serial_data(line)
-        except queue.Empty:
-            pass
-        
-        # Schedule next check
-        self.root.after(50, self.process_queue)
+            while not self.ui_calls.empty():
+                callback = self.ui_calls.get_nowait()
+                try:
+                    callback()
+                except Exception as e:
+                    self.log_message(f"UI update error: {e}")
+            frames_before = self.ui_stats['frames_received']
+            items: List[Tuple[float, str]] = []
+            
+            try:
+                while True:
+                    items.append(self.data_queue.get_nowait())
+                    # Checking the clock every line would cost more than dequeuing
+                    if len(items) % 64 == 0 and (len(items) >= self.max_batch_lines
+                                                 or time.perf_counter() > deadline):
+                        budget_exhausted = True
+                        break
+            except queue.Empty:
+                pass
+            
+            if items:
+                received, lines = zip(*items)
+                try:
+                    self.process_lines(list(lines), list(received))
+                except Exception as e:
+                    self.log_message(f"Error processing {len(lines)} lines: {e}")
+            
+            new_frames = self.ui_stats['frames_received'] - frames_before
+            if new_frames > 1:
+                self.ui_stats['frames_coalesced'] += new_frames - 1
+            self.ui_stats['backlog'] = self.data_queue.qsize() if budget_exhausted else 0
+            
+            self.update_display()
+            self.log_console.flush()
+        except Exception as e:
+            self.log_message(f"Display update error: {e}")
+        finally:
+            # Always reschedule, or the UI would stop while the reader keeps queueing
+            # Yield to Tk immediately when behind, otherwise wait for the next frame
+            delay = 1 if budget_exhausted else self.ui_frame_interval_ms
+            self.root.after(delay, self.process_queue)
 
     def process_serial_data(self, data: str) -> None:
-        """Process data received from ESP32"""
-        try:
-            if data.startswith("FEATURES:"):
-                self.parse_features(data)
-            elif data.startswith("STATUS:"):
-                self.parse_status(data)
-            elif data.startswith("DATASET:"):
-                self.parse_dataset(data)
-            elif data.startswith("LABELED:"):
-                self.parse_labeled(data)
-            elif data.startswith("ERROR:"):
-                self.log_message(f"ESP32 Error: {data[6:]}")
-            elif data.startswith("OK:"):
-                self.log_message(f"ESP32 OK: {data[3:]}")
-            else:
-                self.log_message(f"ESP32: {data}")
-        except Exception as e:
-            self.log_message(f"Data processing error: {str(e)}")
+        """Process a single line received from ESP32"""
+        self.process_lines([data])
 
-    def parse_features(self, data: str) -> None:
-        """Parse feature data from ESP32"""
-        try:
-            parts = data[9:].split(',')  # Remove "FEATURES:" prefix
-            if len(parts) >= 9:
-                features = {
-                    'rms': float(parts[0]),
-                    'zcr': float(parts[1]),
-                    'spectral_centroid': float(parts[2]),
-                    'low_energy': float(parts[3]),
-                    'mid_energy': float(parts[4]),
-                    'high_energy': float(parts[5]),
-                    'spectral_flux': float(parts[6])
-                }
-                
-                self.current_features = features
-                self.current_classification = parts[7]
-                self.current_confidence = float(parts[8])
-                
-                self.update_display()
-                
-        except Exception as e:
-            self.log_message(f"Feature parsing error: {str(e)}")
+    def process_lines(self, lines: List[str], received: Optional[List[float]] = None) -> None:
+        """Parse a batch of lines from ESP32, received at the given times (default now), and keep the newest state"""
+        chunk = parse_chunk(lines)
+        
+        if len(chunk.features):
+            if received is None:
+                timestamps = np.full(len(chunk.features), time.time())
+            else:
+                # parse_chunk drops malformed FEATURES lines; skip their times too
+                malformed = set(chunk.malformed)
+                timestamps = np.array([t for t, line in zip(received, lines)
+                                       if line.startswith('FEATURES:') and line not in malformed])
+            self.apply_features(chunk.features, timestamps)
+        if chunk.status:
+            self.current_status = chunk.status[-1]
+            self.status_dirty = True
+        if chunk.dataset:
+            self.show_dataset_info(chunk.dataset[-1])
+        for message in chunk.messages:
+            self.handle_message(message)
+        for line in chunk.malformed:
+            self.log_message(f"Malformed data: {line}")
 
-    def parse_status(self, data: str) -> None:
-        """Parse status data from ESP32"""
-        try:
-            parts = data[7:].split(',')  # Remove "STATUS:" prefix
-            if len(parts) >= 3:
-                sample_count = parts[0]
-                uptime_ms = int(parts[1])
-                free_memory = parts[2]
-                
-                uptime_sec = uptime_ms // 1000
-                uptime_str = f"{uptime_sec // 60}:{uptime_sec % 60:02d}"
-                
-                self.samples_label.config(text=f"Samples: {sample_count}")
-                self.uptime_label.config(text=f"Uptime: {uptime_str}")
-                self.memory_label.config(text=f"Free Memory: {free_memory} bytes")
-                
-        except Exception as e:
-            self.log_message(f"Status parsing error: {str(e)}")
+    def apply_features(self, records: np.ndarray, timestamps: np.ndarray) -> None:
+        """Store parsed FEATURES records, stamped with the times they arrived, and make the newest one current"""
+        history = self.feature_history
+        history.extend(timestamps, records['features'],
+                       history.class_ids_for(records['label']), records['confidence'])
+        self.rolling_stats.update(timestamps, records)
+        self.live_plot.add(timestamps, records['features'], records['confidence'])
+        
+        latest = records[-1]
+        self.current_features = dict(zip(FEATURE_NAMES, latest['features'].tolist()))
+        self.current_classification = str(latest['label'])
+        self.current_confidence = float(latest['confidence'])
+        
+        self.ui_stats['frames_received'] += len(records)
+        self.features_dirty = True
 
-    def parse_dataset(self, data: str) -> None:
-        """Parse dataset information"""
-        try:
-            parts = data[8:].split(',')  # Remove "DATASET:" prefix
-            if len(parts) >= 6:
-                total = parts[0]
-                traffic = parts[1]
-                machinery = parts[2]
-                human = parts[3]
-                background = parts[4]
-                other = parts[5]
-                
-                text = f"Total: {total} (Traffic: {traffic}, Machinery: {machinery}, Human: {human}, Background: {background}, Other: {other})"
-                self.dataset_info_label.config(text=text)
-                
-        except Exception as e:
-            self.log_message(f"Dataset parsing error: {str(e)}")
+    def show_dataset_info(self, info: DatasetInfo) -> None:
+        """Display the per-label sample counts"""
+        counts = ", ".join(f"{label.capitalize()}: {count}"
+                           for label, count in zip(DATASET_LABELS, info.label_counts))
+        self.dataset_info_label.config(text=f"Total: {info.total} ({counts})")
 
-    def parse_labeled(self, data: str) -> None:
-        """Parse labeling confirmation"""
-        try:
-            parts = data[8:].split(',')  # Remove "LABELED:" prefix
-            if len(parts) >= 2:
-                label = parts[0]
-                count = parts[1]
-                self.log_message(f"Labeled as '{label}' - Total samples: {count}")
-                
-        except Exception as e:
-            self.log_message(f"Label parsing error: {str(e)}")
+    def handle_message(self, message: Message) -> None:
+        """Log responses and free text from ESP32"""
+        if message.kind == 'LABELED':
+            label, _, count = message.payload.partition(',')
+            self.log_message(f"Labeled as '{label}' - Total samples: {count}")
+        elif message.kind == 'ERROR':
+            self.log_message(f"ESP32 Error: {message.payload}")
+        elif message.kind == 'OK':
+            self.log_message(f"ESP32 OK: {message.payload}")
+        elif message.kind:
+            self.log_message(f"ESP32: {message.kind}:{message.payload}")
+        else:
+            self.log_message(f"ESP32: {message.payload}")
 
     def update_display(self) -> None:
-        """Update the GUI display with current data"""
-        if self.current_features:
+        """Redraw the widgets whose state changed since the last UI frame"""
+        if self.status_dirty and self.current_status:
+            sample_count, uptime_ms, free_memory = self.current_status
+            uptime_sec = uptime_ms // 1000
+            uptime_str = f"{uptime_sec // 60}:{uptime_sec % 60:02d}"
+            
+            self.samples_label.config(text=f"Samples: {sample_count}")
+            self.uptime_label.config(text=f"Uptime: {uptime_str}")
+            self.memory_label.config(text=f"Free Memory: {free_memory} bytes")
+            self.status_dirty = False
+        
+        if self.features_dirty and self.current_features:
+            self.features_dirty = False
+            self.ui_stats['frames_rendered'] += 1
+            
             # Update classification
             self.classification_label.config(text=f"Classification: {self.current_classification}")
             self.confidence_label.config(text=f"Confidence: {self.current_confidence*100:.1f}%")
@@ -581,6 +639,20 @@ class ESP32NoiseLoggerGUI:
             self.feature_labels['mid_energy'].config(text=f"Mid Energy: {self.current_features['mid_energy']:.4f}")
             self.feature_labels['high_energy'].config(text=f"High Energy: {self.current_features['high_energy']:.4f}")
             self.feature_labels['spectral_flux'].config(text=f"Spectral Flux: {self.current_features['spectral_flux']:.4f}")
+        
+        if self.live_plot.needs_redraw():
+            self.live_plot.redraw()
+        
+        # Pipeline counters change every frame, refresh them once a second
+        now = time.monotonic()
+        if now - self.last_stats_update >= 1.0:
+            self.last_stats_update = now
+            stats = self.ui_stats
+            self.ui_stats_label.config(
+                text=f"UI: {stats['frames_rendered']} drawn, {stats['frames_coalesced']} coalesced, "
+                     f"backlog {stats['backlog']}")
+            self.noise_stats_label.config(
+                text="\n".join(format_window(window) for window in self.rolling_stats.summary()))
 
     def send_command(self, command: str) -> None:
         """Send command to ESP32"""
@@ -627,16 +699,17 @@ class ESP32NoiseLoggerGUI:
         self.root.after(1000, self.auto_connect_serial)
 
     def log_message(self, message: str) -> None:
-        """Add message to log"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
+        """Add message to log; safe from any thread, shown on the next UI frame"""
+        self.log_console.write(message)
 
     def on_closing(self) -> None:
         """Handle window closing"""
         self.running = False
+        if self.discovery_cancel is not None:
+            self.discovery_cancel.set()
         if self.serial_connection and self.serial_connection.is_open:
             self.serial_connection.close()
+        self.log_console.close()
         self.root.destroy()
 
 
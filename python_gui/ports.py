@@ -0,0 +1,246 @@
+"""
+ESP32 serial port detection shared by the GUI and the headless tools.
+
+discover_esp32 probes candidate ports concurrently and stops as soon as
+one of them sends a line from the noise logger firmware, trying the last
+port that worked (remembered by VID/PID and serial number) before the rest.
+Probing opens the port, which resets most boards, and writes GET_STATUS to
+it, so only ports that look like an ESP32 are probed unless the caller
+opts in to the others.
+"""
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional
+
+import serial
+import serial.tools.list_ports
+from serial.tools.list_ports_common import ListPortInfo
+
+try:
+    from .protocol import READY_MESSAGE
+    from .serial_reader import SerialLineReader
+except ImportError:  # Running as a script from the python_gui directory
+    from protocol import READY_MESSAGE
+    from serial_reader import SerialLineReader
+
+ESP32_KEYWORDS = [
+    'CP210x',  # Silicon Labs CP2102 (common on ESP32 boards)
+    'CH340',   # WCH CH340 USB-to-Serial
+    'CH341',   # WCH CH341 USB-to-Serial
+    'FTDI',    # FTDI USB-to-Serial
+    'ESP32',   # Direct ESP32 reference
+    'Silicon Labs',  # Silicon Labs devices
+    'USB-SERIAL CH340',  # CH340 description
+    'USB2.0-Serial',     # Generic USB serial
+]
+
+# Known ESP32 VID:PID combinations
+ESP32_VID_PIDS = [
+    (0x10C4, 0xEA60),  # Silicon Labs CP2102/CP2104
+    (0x1A86, 0x7523),  # WCH CH340
+    (0x1A86, 0x55D4),  # WCH CH341
+    (0x0403, 0x6001),  # FTDI FT232R
+    (0x0403, 0x6010),  # FTDI FT2232H
+    (0x303A, 0x1001),  # Espressif ESP32-S2
+    (0x303A, 0x1002),  # Espressif ESP32-S3
+]
+
+
+# Lines that only the noise logger firmware sends
+FIRMWARE_PREFIXES = ('STATUS:', 'FEATURES:', 'OK:', 'ERROR:')
+
+PORT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.esp32_noise_logger_port.json')
+
+
+def _no_log(message: str) -> None:
+    pass
+
+
+def match_esp32_port(port: ListPortInfo, log: Callable[[str], None] = _no_log) -> bool:
+    """Check a port against the known ESP32 VID/PID pairs and descriptions"""
+    # Check by VID/PID first (most reliable)
+    if port.vid and port.pid and (port.vid, port.pid) in ESP32_VID_PIDS:
+        log(f"Found ESP32 by VID/PID: {port.device} (VID:{port.vid:04X}, PID:{port.pid:04X})")
+        return True
+
+    # Check by description keywords
+    description = (port.description or "").upper()
+    manufacturer = (port.manufacturer or "").upper()
+    for keyword in ESP32_KEYWORDS:
+        if keyword.upper() in description or keyword.upper() in manufacturer:
+            log(f"Found potential ESP32 by description: {port.device} ({port.description})")
+            return True
+    return False
+
+
+def iter_esp32_ports(log: Callable[[str], None] = _no_log) -> Iterator[str]:
+    """Yield the ports that look like an ESP32 board, scanning lazily"""
+    ports = list(serial.tools.list_ports.comports())
+    log(f"Scanning {len(ports)} available ports for ESP32...")
+
+    for port in ports:
+        log(f"Checking port {port.device}: {port.description}")
+        if match_esp32_port(port, log):
+            yield port.device
+
+
+def find_esp32_ports(log: Callable[[str], None] = _no_log) -> List[str]:
+    """Return every port that looks like an ESP32 board"""
+    return list(iter_esp32_ports(log))
+
+
+def find_esp32_port(log: Callable[[str], None] = _no_log) -> Optional[str]:
+    """Return the first port that looks like an ESP32 board"""
+    return next(iter_esp32_ports(log), None)
+
+
+def device_dirname(port: str) -> str:
+    """File-system friendly name for a port, e.g. ttyUSB0 for /dev/ttyUSB0"""
+    if port.startswith('/dev/'):
+        port = port[len('/dev/'):]
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', port)
+
+
+def device_id(port: str) -> str:
+    """Name for the board on port that survives replugging: its USB serial number when it has one"""
+    for info in serial.tools.list_ports.comports():
+        if info.device == port and info.serial_number:
+            return device_dirname(info.serial_number)
+    return device_dirname(port)
+
+
+def is_firmware_line(line: str) -> bool:
+    return line.startswith(FIRMWARE_PREFIXES) or READY_MESSAGE in line
+
+
+def probe_port(port: str, baudrate: int = 115200, timeout: float = 3.0,
+               cancel: Optional[threading.Event] = None) -> Optional[serial.Serial]:
+    """Open a port and wait for a line from the noise logger firmware
+
+    Returns the still-open connection as soon as one arrives, or None after
+    timeout seconds, on errors or when cancel is set.
+    """
+    try:
+        connection = serial.Serial(port, baudrate, timeout=0.1)
+    except (serial.SerialException, OSError, ValueError):
+        return None
+
+    reader = SerialLineReader(connection)
+    deadline = time.monotonic() + timeout
+    next_query = 0.0
+    try:
+        while time.monotonic() < deadline and not (cancel and cancel.is_set()):
+            now = time.monotonic()
+            if now >= next_query:
+                # Opening the port resets the board; commands sent while it boots are lost
+                connection.write(b"GET_STATUS\n")
+                next_query = now + 0.5
+            if any(is_firmware_line(line) for line in reader.read_lines()):
+                connection.timeout = 1
+                return connection
+    except (serial.SerialException, OSError):
+        pass
+    connection.close()
+    return None
+
+
+def load_port_cache(path: str = PORT_CACHE_PATH) -> Dict[str, object]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_port_cache(port: str, info: Optional[ListPortInfo], path: str = PORT_CACHE_PATH) -> None:
+    cache: Dict[str, object] = {'port': port}
+    if info is not None:
+        cache.update(vid=info.vid, pid=info.pid, serial_number=info.serial_number)
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass  # Only an optimization
+
+
+def _matches_cache(port: str, info: Optional[ListPortInfo], cache: Dict[str, object]) -> bool:
+    if info is None or not info.vid or cache.get('vid') is None:
+        return port == cache.get('port')
+    if (info.vid, info.pid) != (cache.get('vid'), cache.get('pid')):
+        return False
+    # The same board may come back under another port name
+    if info.serial_number and cache.get('serial_number'):
+        return info.serial_number == cache['serial_number']
+    return port == cache.get('port')
+
+
+def _probe_all(ports: List[str], baudrate: int, timeout: float,
+               cancel: threading.Event) -> Optional[serial.Serial]:
+    """Probe ports concurrently and return the first connection that answers"""
+    found: Optional[serial.Serial] = None
+    with ThreadPoolExecutor(max_workers=max(1, len(ports))) as pool:
+        futures = [pool.submit(probe_port, port, baudrate, timeout, cancel) for port in ports]
+        for future in as_completed(futures):
+            connection = future.result()
+            if connection is None:
+                continue
+            if found is None:
+                found = connection
+                cancel.set()  # Stop the other probes
+            else:
+                connection.close()  # Lost the race
+    return found
+
+
+def discover_esp32(ports: Optional[List[str]] = None, baudrate: int = 115200, timeout: float = 3.0,
+                   cache_path: Optional[str] = PORT_CACHE_PATH, cancel: Optional[threading.Event] = None,
+                   log: Callable[[str], None] = _no_log, probe_unmatched: bool = False,
+                   cached_timeout: float = 1.0) -> Optional[serial.Serial]:
+    """Find the port with a responding noise logger and return it open
+
+    Tries the cached port first, for only cached_timeout seconds so a stale
+    entry costs little, then probes the cached port again together with the
+    candidates that look like an ESP32 (match_esp32_port); ports, when
+    given, are all candidates. Only with probe_unmatched are the remaining
+    serial ports probed as well, and only if none of those answered. Setting cancel
+    stops the search; the losing probes are stopped by setting it too.
+    """
+    infos = {info.device: info for info in serial.tools.list_ports.comports()}
+    candidates = list(infos) if ports is None else list(ports)
+    if not candidates:
+        log("No serial ports found")
+        return None
+    cancel = cancel or threading.Event()
+    cache = load_port_cache(cache_path) if cache_path else {}
+
+    connection = None
+    cached = [port for port in candidates if cache and _matches_cache(port, infos.get(port), cache)]
+    if cached:
+        log(f"Trying last known ESP32 port {cached[0]}...")
+        connection = probe_port(cached[0], baudrate, min(cached_timeout, timeout), cancel)
+
+    others: List[str] = []
+    if ports is None:
+        others = [port for port in candidates if port not in cached and not match_esp32_port(infos[port])]
+        candidates = [port for port in candidates if port not in others]
+    if connection is None and candidates and not cancel.is_set():
+        log(f"Probing {len(candidates)} port(s): {', '.join(candidates)}")
+        connection = _probe_all(candidates, baudrate, timeout, cancel)
+    if connection is None and others and not cancel.is_set():
+        if probe_unmatched:
+            log(f"Probing {len(others)} other port(s): {', '.join(others)}")
+            connection = _probe_all(others, baudrate, timeout, cancel)
+        else:
+            log(f"Not probing {len(others)} port(s) that do not look like an ESP32: {', '.join(others)}")
+
+    if connection is None:
+        return None
+    log(f"✓ ESP32 Noise Logger confirmed on {connection.port}")
+    if cache_path:
+        save_port_cache(connection.port, infos.get(connection.port), cache_path)
+    return connection
@@ -0,0 +1,248 @@
+"""
+Parser for the ESP32 Noise Logger serial line protocol.
+
+Lines look like ``FEATURES:<7 floats>,<label>,<confidence>``,
+``STATUS:<samples>,<uptime_ms>,<free_heap>``, ``DATASET:<total>,<5 counts>``,
+``LABELED:<label>,<count>``, ``SAMPLE_INDEX:<index>``, ``OK:...``, ``ERROR:...``
+or free text. DUMP_DATASET sends bare CSV rows ``<7 floats>,<label>,<timestamp>``
+followed by END_DATASET.
+
+Chunks of lines are parsed at once: FEATURES payloads and dataset rows are
+converted by a single np.loadtxt call per chunk, and lines that do not
+parse are returned separately instead of raising.
+"""
+import io
+import math
+import warnings
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+FEATURE_NAMES = (
+    'rms',
+    'zcr',
+    'spectral_centroid',
+    'low_energy',
+    'mid_energy',
+    'high_energy',
+    'spectral_flux',
+)
+NUM_FEATURES = len(FEATURE_NAMES)
+MAX_LABEL_LENGTH = 20  # Includes the NUL terminator, as in KNNClassifier.h
+
+# Labels counted by the firmware's DATASET message, in order
+DATASET_LABELS = ('traffic', 'machinery', 'human', 'background', 'other')
+
+# Column header for CSV files holding DUMP_DATASET rows
+DATASET_CSV_HEADER = ['RMS', 'ZCR', 'Centroid', 'Band1', 'Band2', 'Band3', 'Flux', 'Label', 'Timestamp']
+
+END_DATASET = 'END_DATASET'
+READY_MESSAGE = 'ESP32_NOISE_LOGGER_READY'
+
+# One FEATURES line
+FEATURE_DTYPE = np.dtype([
+    ('features', '<f4', (NUM_FEATURES,)),
+    ('label', f'U{MAX_LABEL_LENGTH}'),
+    ('confidence', '<f4'),
+])
+
+# One DUMP_DATASET row (a LabeledSample on the device)
+DATASET_ROW_DTYPE = np.dtype([
+    ('features', '<f4', (NUM_FEATURES,)),
+    ('label', f'U{MAX_LABEL_LENGTH}'),
+    ('timestamp', '<u4'),
+])
+
+MESSAGE_KINDS = frozenset(['FEATURES', 'STATUS', 'DATASET', 'LABELED', 'SAMPLE_INDEX', 'OK', 'ERROR'])
+
+
+class StatusRecord(NamedTuple):
+    sample_count: int
+    uptime_ms: int
+    free_memory: int
+
+
+class DatasetInfo(NamedTuple):
+    total: int
+    label_counts: Tuple[int, ...]  # In DATASET_LABELS order
+
+
+class Message(NamedTuple):
+    kind: str     # One of MESSAGE_KINDS, or '' for untagged text
+    payload: str
+
+
+class ParsedChunk(NamedTuple):
+    features: np.ndarray          # FEATURE_DTYPE records in arrival order
+    status: List[StatusRecord]
+    dataset: List[DatasetInfo]
+    messages: List[Message]       # LABELED, OK, ERROR and untagged lines
+    malformed: List[str]          # Tagged lines whose payload did not parse
+
+
+def split_message(line: str) -> Message:
+    """Split a line into its message kind and payload"""
+    kind, sep, payload = line.partition(':')
+    if sep and kind in MESSAGE_KINDS:
+        return Message(kind, payload)
+    return Message('', line)
+
+
+_FIELDS = NUM_FEATURES + 2  # 7 numbers, a label and one more number
+
+
+def _text_dtype(dtype: np.dtype) -> np.dtype:
+    """dtype with an integer last field widened to float64, so loadtxt cannot wrap or truncate it"""
+    last = dtype.names[-1]
+    if not np.issubdtype(dtype[last], np.integer):
+        return dtype
+    return np.dtype([(name, '<f8' if name == last else dtype[name]) for name in dtype.names])
+
+
+def _valid_last(values: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """Whether each parsed last field fits the last field of dtype"""
+    last_type = dtype[dtype.names[-1]]
+    if np.issubdtype(last_type, np.integer):
+        return (values == np.floor(values)) & (values >= 0) & (values <= np.iinfo(last_type).max)
+    return np.isfinite(values)
+
+
+def _bulk_load(text: str, count: int, dtype: np.dtype) -> Optional[np.ndarray]:
+    """Convert count newline separated rows with one loadtxt call, None if any is bad
+
+    Rows are held to the same rules as _parse_row_slow, so a row is accepted
+    or rejected the same way whatever else is in the chunk.
+    """
+    if not text or '\n\n' in text:
+        return None  # loadtxt skips blank lines, which would misalign the records
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            records = np.loadtxt(io.StringIO(text), delimiter=',', dtype=_text_dtype(dtype),
+                                 comments=None, ndmin=1)
+    except ValueError:
+        return None
+    if len(records) != count:
+        return None
+    valid = (np.isfinite(records['features']).all(axis=1) & (records['label'] != '')
+             & _valid_last(records[dtype.names[-1]], dtype))
+    return records.astype(dtype) if valid.all() else None
+
+
+def _parse_row_slow(payload: str, dtype: np.dtype) -> Optional[Tuple[List[float], str, float]]:
+    """Parse one <7 numbers>,<label>,<number> row with plain float() calls"""
+    parts = payload.split(',')
+    if len(parts) != _FIELDS or not parts[NUM_FEATURES]:
+        return None
+    try:
+        features = [float(p) for p in parts[:NUM_FEATURES]]
+        last = float(parts[NUM_FEATURES + 1])
+    except ValueError:
+        return None
+    if not (all(math.isfinite(f) for f in features) and _valid_last(np.array([last]), dtype)[0]):
+        return None
+    return features, parts[NUM_FEATURES], last
+
+
+def _parse_rows(lines: Sequence[str], prefix: str, dtype: np.dtype) -> Tuple[np.ndarray, List[str]]:
+    """Parse the rows that follow prefix on each line, keeping arrival order"""
+    if not lines:
+        return np.empty(0, dtype=dtype), []
+
+    text = '\n' + '\n'.join(lines)
+    if prefix:
+        text = text.replace('\n' + prefix, '\n')
+    records = _bulk_load(text[1:], len(lines), dtype)
+    if records is not None:
+        return records, []
+
+    # Slow path, only taken when the chunk contains a bad line
+    good: List[Tuple[List[float], str, float]] = []
+    malformed: List[str] = []
+    for line in lines:
+        row = _parse_row_slow(line[len(prefix):], dtype)
+        if row is None:
+            malformed.append(line)
+        else:
+            good.append(row)
+    return np.array(good, dtype=dtype), malformed
+
+
+def parse_feature_payloads(payloads: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """Parse FEATURES payloads (prefix removed) into FEATURE_DTYPE records"""
+    return _parse_rows(payloads, '', FEATURE_DTYPE)
+
+
+def parse_dataset_rows(rows: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """Parse DUMP_DATASET CSV rows into DATASET_ROW_DTYPE records"""
+    return _parse_rows(rows, '', DATASET_ROW_DTYPE)
+
+
+def parse_status(payload: str) -> StatusRecord:
+    """Parse a STATUS payload, raising ValueError if malformed"""
+    parts = payload.split(',')
+    if len(parts) < 3:
+        raise ValueError(f"expected 3 fields, got {len(parts)}")
+    return StatusRecord(int(parts[0]), int(parts[1]), int(parts[2]))
+
+
+def parse_dataset_info(payload: str) -> DatasetInfo:
+    """Parse a DATASET payload, raising ValueError if malformed"""
+    parts = payload.split(',')
+    if len(parts) < 1 + len(DATASET_LABELS):
+        raise ValueError(f"expected {1 + len(DATASET_LABELS)} fields, got {len(parts)}")
+    counts = tuple(int(p) for p in parts[1:1 + len(DATASET_LABELS)])
+    return DatasetInfo(int(parts[0]), counts)
+
+
+def parse_chunk(lines: Sequence[str]) -> ParsedChunk:
+    """Parse a batch of protocol lines"""
+    prefix = 'FEATURES:'
+    feature_lines = [line for line in lines if line.startswith(prefix)]
+    features, malformed = _parse_rows(feature_lines, prefix, FEATURE_DTYPE)
+
+    status: List[StatusRecord] = []
+    dataset: List[DatasetInfo] = []
+    messages: List[Message] = []
+    if len(feature_lines) == len(lines):
+        return ParsedChunk(features, status, dataset, messages, malformed)
+
+    # Everything else is rare enough to handle one line at a time
+    for line in [line for line in lines if not line.startswith(prefix)]:
+        message = split_message(line)
+        try:
+            if message.kind == 'STATUS':
+                status.append(parse_status(message.payload))
+            elif message.kind == 'DATASET':
+                dataset.append(parse_dataset_info(message.payload))
+            else:
+                messages.append(message)
+        except ValueError:
+            malformed.append(line)
+    return ParsedChunk(features, status, dataset, messages, malformed)
+
+
+def format_dataset_rows(rows: np.ndarray) -> str:
+    """Format DATASET_ROW_DTYPE records exactly as the firmware prints them"""
+    lines = []
+    for features, label, timestamp in zip(rows['features'].tolist(), rows['label'], rows['timestamp'].tolist()):
+        rms, zcr, centroid, low, mid, high, flux = features
+        lines.append(f"{rms:.4f},{zcr:.4f},{centroid:.2f},{low:.4f},{mid:.4f},"
+                     f"{high:.4f},{flux:.4f},{label},{timestamp}\n")
+    return ''.join(lines)
+
+
+def read_dataset_csv(path: str) -> Tuple[np.ndarray, List[str]]:
+    """Load a dataset CSV (DATASET_CSV_HEADER) into DATASET_ROW_DTYPE records"""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+    if lines and lines[0].split(',') == DATASET_CSV_HEADER:
+        lines = lines[1:]
+    return parse_dataset_rows([line for line in lines if line])
+
+
+def write_dataset_csv(path: str, rows: np.ndarray) -> None:
+    """Save DATASET_ROW_DTYPE records in the CSV layout retrieve_esp32_dataset.py produces"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(','.join(DATASET_CSV_HEADER) + '\n')
+        f.write(format_dataset_rows(rows))
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Offline re-classification of logged FEATURES records.
+
+Every logged frame carries the classification and confidence the device
+reported. check runs the logged features through the host KNNClassifier,
+which follows the firmware's distance, neighbor order and vote tie-breaking,
+against the training set that was on the board (a DATASET dump, or a
+classifier_data.bin image pulled from it) and reports every frame where
+the two disagree plus a confusion matrix of device against host labels.
+On a training set identical to the device's, any mismatch is a bug. Binary
+logs hold the exact float32 features; CSV logs are rounded, so frames near
+a tie can legitimately flip.
+
+sweep re-runs the same logs with other values of K and other feature
+normalizations (feature_scaling.py), one combination per worker process,
+and reports the cross-validated accuracy on the training set and how many
+logged frames would change label.
+
+    python python_gui/reclassify.py check logs/features.bin --training classifier_data.bin
+    python python_gui/reclassify.py sweep logs/features.bin --training dataset.csv -k 1 3 5 7 --normalization none robust
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .classifier_image import read_rows
+    from .feature_scaling import METHODS, FeatureScaler, cross_val_accuracy, fit_scaler, load_scaler
+    from .feature_store import INDEX_FILE, FeatureStore
+    from .knn import K_VALUE, KNNClassifier
+    from .record_log import LOG_RECORD_DTYPE, read_log
+except ImportError:  # Running as a script from the python_gui directory
+    from classifier_image import read_rows
+    from feature_scaling import METHODS, FeatureScaler, cross_val_accuracy, fit_scaler, load_scaler
+    from feature_store import INDEX_FILE, FeatureStore
+    from knn import K_VALUE, KNNClassifier
+    from record_log import LOG_RECORD_DTYPE, read_log
+
+CONFIDENCE_TOLERANCE = 5e-4  # CSV logs keep three decimals
+
+# Set per worker process by _init_worker
+_training: Optional[np.ndarray] = None
+_records: Optional[np.ndarray] = None
+
+
+class ParityReport(NamedTuple):
+    frames: int
+    label_mismatches: np.ndarray       # Indices of frames where the labels differ
+    confidence_mismatches: np.ndarray  # Indices of frames with the same label but another confidence
+    host_labels: np.ndarray
+    host_confidence: np.ndarray
+    seconds: float
+
+
+class SweepResult(NamedTuple):
+    k: int
+    normalization: str
+    cv_accuracy: float
+    changed: int     # Logged frames whose label differs from the device's
+    seconds: float
+
+
+def load_records(paths: List[str]) -> np.ndarray:
+    """Concatenate binary logs, CSV logs and feature store directories, in the given order"""
+    parts = []
+    for path in paths:
+        if os.path.isfile(os.path.join(path, INDEX_FILE)):
+            parts.append(FeatureStore(path).read_range())
+        else:
+            records, malformed = read_log(path)
+            if malformed:
+                print(f"[WARN] {path}: skipping {len(malformed)} malformed rows")
+            parts.append(records)
+    return np.concatenate(parts) if parts else np.empty(0, dtype=LOG_RECORD_DTYPE)
+
+
+def load_training(path: str) -> np.ndarray:
+    rows, malformed = read_rows(path)
+    if malformed:
+        print(f"[WARN] {path}: skipping {len(malformed)} malformed rows")
+    return rows
+
+
+def make_scaler(normalization: str, training: np.ndarray) -> Optional[FeatureScaler]:
+    """None for the firmware distance, a scaler fitted on training, or one loaded from a JSON file"""
+    if normalization == 'none':
+        return None
+    if normalization in METHODS:
+        return fit_scaler(training['features'], normalization)
+    return load_scaler(normalization)
+
+
+def check_parity(classifier: KNNClassifier, records: np.ndarray) -> ParityReport:
+    """Re-classify LOG_RECORD_DTYPE records and compare with what the device reported"""
+    started = time.perf_counter()
+    host_labels, host_confidence = classifier.predict(records['features'])
+    seconds = time.perf_counter() - started
+    device_labels = np.char.decode(records['label'], 'utf-8', 'replace')
+    same = host_labels == device_labels
+    confidence_off = np.abs(host_confidence - records['confidence']) > CONFIDENCE_TOLERANCE
+    return ParityReport(len(records), np.flatnonzero(~same), np.flatnonzero(same & confidence_off),
+                        host_labels, host_confidence, seconds)
+
+
+def confusion_matrix(device_labels: np.ndarray, host_labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(classes, counts) with counts[i, j] frames the device called classes[i] and the host classes[j]"""
+    classes, ids = np.unique(np.concatenate([device_labels, host_labels]), return_inverse=True)
+    device_ids, host_ids = ids[:len(device_labels)], ids[len(device_labels):]
+    counts = np.bincount(device_ids * len(classes) + host_ids, minlength=len(classes) ** 2)
+    return classes, counts.reshape(len(classes), len(classes))
+
+
+def format_confusion(classes: np.ndarray, counts: np.ndarray) -> str:
+    width = max([len("device \\ host")] + [len(str(c)) for c in classes] + [len(str(counts.max(initial=0)))])
+    lines = ["device \\ host".ljust(width) + "".join(f" {c:>{width}}" for c in classes)]
+    for name, row in zip(classes, counts):
+        lines.append(f"{name:<{width}}" + "".join(f" {n:>{width}}" for n in row))
+    return "\n".join(lines)
+
+
+def _init_worker(training_path: str, log_paths: List[str]) -> None:
+    global _training, _records
+    _training = load_training(training_path)
+    _records = load_records(log_paths)
+
+
+def _run_combination(k: int, normalization: str, folds: int) -> SweepResult:
+    assert _training is not None and _records is not None
+    scaler = make_scaler(normalization, _training)
+    features, labels = _training['features'], _training['label']
+    accuracy = cross_val_accuracy(features, labels, scaler, folds, k) if len(labels) >= folds else float('nan')
+    classifier = KNNClassifier(k=k, scaler=scaler).fit(features, labels.tolist())
+    report = check_parity(classifier, _records)
+    return SweepResult(k, normalization, accuracy, len(report.label_mismatches), report.seconds)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-classify logged features and compare with the device")
+    commands = parser.add_subparsers(dest='command', required=True)
+    check = commands.add_parser('check', help="re-classify with the device's settings and report mismatches")
+    check.add_argument('--show', type=int, default=10, help="mismatching frames to list")
+    sweep = commands.add_parser('sweep', help="compare K values and normalizations")
+    sweep.add_argument('-k', type=int, nargs='+', default=[1, 3, K_VALUE, 7, 9])
+    sweep.add_argument('--normalization', nargs='+', default=['none', 'standard', 'robust'],
+                       help="'none' (firmware distance), 'standard', 'robust' or scaler JSON files")
+    sweep.add_argument('--folds', type=int, default=5, help="cross-validation folds on the training set")
+    sweep.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    for command in (check, sweep):
+        command.add_argument('logs', nargs='+', help="features.bin/.csv logs or feature store directories")
+        command.add_argument('--training', required=True,
+                             help="training set: dataset CSV, .npz or classifier_data.bin image")
+    args = parser.parse_args(argv)
+
+    records = load_records(args.logs)
+    training = load_training(args.training)
+    print(f"{len(records)} logged frames, {len(training)} training samples")
+    if not len(records):
+        return 1
+
+    if args.command == 'check':
+        classifier = KNNClassifier().fit(training['features'], training['label'].tolist())
+        report = check_parity(classifier, records)
+        device_labels = np.char.decode(records['label'], 'utf-8', 'replace')
+        print(f"Re-classified at {report.frames / max(report.seconds, 1e-9):,.0f} frames/s")
+        print(f"Label mismatches: {len(report.label_mismatches)} ({len(report.label_mismatches) / report.frames:.2%})")
+        print(f"Confidence mismatches: {len(report.confidence_mismatches)}")
+        for i in np.concatenate([report.label_mismatches, report.confidence_mismatches])[:args.show].tolist():
+            print(f"  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(records['timestamp'][i]))} "
+                  f"device {device_labels[i]} {records['confidence'][i]:.3f}, "
+                  f"host {report.host_labels[i]} {report.host_confidence[i]:.3f}")
+        print(format_confusion(*confusion_matrix(device_labels, report.host_labels)))
+        return 1 if len(report.label_mismatches) or len(report.confidence_mismatches) else 0
+
+    combinations = [(k, normalization) for normalization in args.normalization for k in args.k]
+    results: Dict[Tuple[int, str], SweepResult] = {}
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(combinations))),
+                             mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(args.training, args.logs)) as pool:
+        for result in pool.map(_run_combination, *zip(*combinations), [args.folds] * len(combinations)):
+            results[result.k, result.normalization] = result
+
+    print(f"{'normalization':<20} {'k':>3} {'cv accuracy':>12} {'frames changed':>15} {'frames/s':>12}")
+    for k, normalization in combinations:
+        result = results[k, normalization]
+        print(f"{normalization:<20} {k:>3} {result.cv_accuracy:>12.1%} "
+              f"{result.changed / len(records):>15.2%} {len(records) / max(result.seconds, 1e-9):>12,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Rotating on-disk logs of FEATURES records.
+
+Records can be written as CSV or as a compact binary file of fixed-size
+little-endian records (LOG_RECORD_DTYPE behind a 16 byte header). Writes
+go through a large userspace buffer and are fsynced periodically rather
+than per record; files rotate by size like logging.handlers.RotatingFileHandler.
+"""
+import io
+import os
+import struct
+import time
+import warnings
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    from .protocol import MAX_LABEL_LENGTH, NUM_FEATURES
+except ImportError:  # Running as a script from the python_gui directory
+    from protocol import MAX_LABEL_LENGTH, NUM_FEATURES
+
+# One logged FEATURES frame, 60 bytes
+LOG_RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),                      # host receive time, seconds since the epoch
+    ('features', '<f4', (NUM_FEATURES,)),
+    ('label', f'S{MAX_LABEL_LENGTH}'),          # UTF-8, NUL padded
+    ('confidence', '<f4'),
+])
+
+BINARY_MAGIC = b'ESP32NLB'
+BINARY_VERSION = 1
+_BINARY_HEADER = struct.Struct('<8sII')  # magic, version, record size
+
+CSV_HEADER = 'Timestamp,RMS,ZCR,Centroid,Band1,Band2,Band3,Flux,Label,Confidence\n'
+
+
+def to_log_records(timestamps: Union[float, np.ndarray], records: np.ndarray) -> np.ndarray:
+    """Convert parsed FEATURE_DTYPE records into LOG_RECORD_DTYPE"""
+    out = np.empty(len(records), dtype=LOG_RECORD_DTYPE)
+    out['timestamp'] = timestamps
+    out['features'] = records['features']
+    out['label'] = np.char.encode(records['label'], 'utf-8')
+    out['confidence'] = records['confidence']
+    return out
+
+
+class RotatingRecordFile:
+    """Size-rotated, buffered output file with periodic fsync"""
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, backup_count: int = 10,
+                 fsync_interval: float = 10.0, buffer_size: int = 1024 * 1024) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.fsync_interval = fsync_interval
+        self.buffer_size = buffer_size
+        self._file: Optional[BinaryIO] = None
+        self._size = 0
+        self._last_sync = time.monotonic()
+
+    def header(self) -> bytes:
+        """Bytes written at the start of every new file"""
+        return b''
+
+    def _open(self) -> BinaryIO:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'ab', buffering=self.buffer_size)
+        self._size = self._file.tell()
+        if self._size == 0:
+            self._file.write(self.header())
+            self._size = self._file.tell()
+        return self._file
+
+    def _rotate(self) -> None:
+        self.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def write_bytes(self, data: bytes) -> None:
+        """Append data, rotating first if it would overflow the current file"""
+        file = self._file or self._open()
+        if self.max_bytes > 0 and self._size > len(self.header()) and self._size + len(data) > self.max_bytes:
+            self._rotate()
+            file = self._open()
+        file.write(data)
+        self._size += len(data)
+
+        now = time.monotonic()
+        if now - self._last_sync >= self.fsync_interval:
+            self.sync()
+            self._last_sync = now
+
+    def sync(self) -> None:
+        """Flush the userspace buffer and fsync the file"""
+        if self._file:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+
+class CsvRecordWriter(RotatingRecordFile):
+    """Write log records as CSV text"""
+
+    def header(self) -> bytes:
+        return CSV_HEADER.encode()
+
+    def write(self, records: np.ndarray) -> None:
+        """Append LOG_RECORD_DTYPE records"""
+        lines = []
+        for timestamp, features, label, confidence in zip(
+                records['timestamp'].tolist(), records['features'].tolist(),
+                records['label'].tolist(), records['confidence'].tolist()):
+            rms, zcr, centroid, low, mid, high, flux = features
+            lines.append(f"{timestamp:.3f},{rms:.4f},{zcr:.4f},{centroid:.2f},{low:.4f},{mid:.4f},"
+                         f"{high:.4f},{flux:.4f},{label.decode('utf-8', 'replace')},{confidence:.3f}\n")
+        self.write_bytes(''.join(lines).encode())
+
+
+class BinaryRecordWriter(RotatingRecordFile):
+    """Write log records as fixed-size binary records"""
+
+    def header(self) -> bytes:
+        return _BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, LOG_RECORD_DTYPE.itemsize)
+
+    def write(self, records: np.ndarray) -> None:
+        """Append LOG_RECORD_DTYPE records"""
+        self.write_bytes(np.ascontiguousarray(records, dtype=LOG_RECORD_DTYPE).tobytes())
+
+
+def read_binary_log(path: str, mmap: bool = True) -> np.ndarray:
+    """Load a binary record log, memory-mapped by default"""
+    with open(path, 'rb') as f:
+        magic, version, record_size = _BINARY_HEADER.unpack(f.read(_BINARY_HEADER.size))
+    if magic != BINARY_MAGIC or version != BINARY_VERSION or record_size != LOG_RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} is not a version {BINARY_VERSION} feature log")
+
+    count = (os.path.getsize(path) - _BINARY_HEADER.size) // LOG_RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=LOG_RECORD_DTYPE)
+    if mmap:
+        return np.memmap(path, dtype=LOG_RECORD_DTYPE, mode='r', offset=_BINARY_HEADER.size, shape=(count,))
+    return np.fromfile(path, dtype=LOG_RECORD_DTYPE, count=count, offset=_BINARY_HEADER.size)
+
+
+_CSV_TEXT_DTYPE = np.dtype([(name, f'U{MAX_LABEL_LENGTH}' if name == 'label' else LOG_RECORD_DTYPE[name])
+                            for name in LOG_RECORD_DTYPE.names])
+_CSV_FIELDS = 3 + NUM_FEATURES  # timestamp, 7 features, label, confidence
+
+
+def _valid_csv_rows(rows: np.ndarray) -> np.ndarray:
+    return (np.isfinite(rows['timestamp']) & np.isfinite(rows['features']).all(axis=1)
+            & (rows['label'] != '') & np.isfinite(rows['confidence']))
+
+
+def _parse_csv_line(line: str) -> Optional[tuple]:
+    """One CSV log line as a _CSV_TEXT_DTYPE tuple, None if it is malformed"""
+    parts = line.split(',')
+    if len(parts) != _CSV_FIELDS:
+        return None
+    try:
+        row = np.array([(float(parts[0]), [float(p) for p in parts[1:1 + NUM_FEATURES]],
+                         parts[1 + NUM_FEATURES], float(parts[-1]))], dtype=_CSV_TEXT_DTYPE)
+    except ValueError:
+        return None
+    return row[0] if _valid_csv_rows(row)[0] else None
+
+
+def read_csv_log(path: str) -> Tuple[np.ndarray, List[str]]:
+    """Load a CSV record log (CSV_HEADER columns) into LOG_RECORD_DTYPE records, plus the malformed lines
+
+    A crash or power loss can leave a half-written line, at the end of the
+    file or, once logging resumes, in the middle; such lines are skipped.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    if text.startswith(CSV_HEADER):
+        text = text[len(CSV_HEADER):]
+    lines = [line for line in text.split('\n') if line.strip()]
+    if not lines:
+        return np.empty(0, dtype=LOG_RECORD_DTYPE), []
+
+    rows: Optional[np.ndarray] = None
+    malformed: List[str] = []
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            rows = np.loadtxt(io.StringIO('\n'.join(lines)), delimiter=',', dtype=_CSV_TEXT_DTYPE,
+                              comments=None, ndmin=1)
+    except ValueError:
+        pass
+    if rows is None or len(rows) != len(lines) or not _valid_csv_rows(rows).all():
+        # Slow path, only taken when the file contains a bad line
+        good = []
+        for line in lines:
+            row = _parse_csv_line(line)
+            if row is None:
+                malformed.append(line)
+            else:
+                good.append(row)
+        rows = np.array(good, dtype=_CSV_TEXT_DTYPE)
+
+    records = np.empty(len(rows), dtype=LOG_RECORD_DTYPE)
+    for name in LOG_RECORD_DTYPE.names:
+        records[name] = np.char.encode(rows[name], 'utf-8') if name == 'label' else rows[name]
+    return records, malformed
+
+
+def read_log(path: str) -> Tuple[np.ndarray, List[str]]:
+    """Load a binary or CSV record log, telling them apart by the binary header, plus any malformed CSV lines"""
+    with open(path, 'rb') as f:
+        binary = f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    return (read_binary_log(path), []) if binary else read_csv_log(path)
@@ -1,91 +1,309 @@
 """
 Script to retrieve stored dataset from ESP32 via serial and save as CSV file.
-Prompts for COM port and output filename.
+
+Rows are validated and appended to ``<output>.part`` as they arrive, and the
+file is renamed to its final name once the whole dump is in. If the
+transfer breaks (a timeout, a corrupted row or a serial error) the dump is
+resumed instead of starting over, as long as the device still reports the
+same sample count. A full device evicts its oldest sample for every new
+one, which shifts every index without changing the count, so a resume
+dumps from the last row already written and only goes on if that row is
+still where it was; otherwise the dump starts over.
+
+Without arguments it prompts for the COM port and output filename. With
+--port (repeatable) or --all-devices it runs without dialogs, e.g. for
+scheduled nightly pulls:
+    python python_gui/retrieve_esp32_dataset.py --port /dev/ttyUSB0 --output dataset.csv
+    python python_gui/retrieve_esp32_dataset.py --all-devices --output-dir pulls/
 """
-import serial
-import tkinter as tk
-from tkinter import simpledialog, filedialog, messagebox
+import argparse
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional
 
-# Prompt user for serial port
+import numpy as np
+import serial
 
-root = tk.Tk()
-root.withdraw()
-port = simpledialog.askstring("Serial Port", "Enter ESP32 COM port (e.g., COM3):")
-if not port:
-    print("No port provided.")
-    sys.exit(1)
+try:
+    from .ports import device_dirname, find_esp32_ports
+    from .protocol import (DATASET_CSV_HEADER, END_DATASET, READY_MESSAGE, format_dataset_rows,
+                           parse_dataset_rows, split_message)
+    from .serial_reader import SerialLineReader
+except ImportError:  # Running as a script from the python_gui directory
+    from ports import device_dirname, find_esp32_ports
+    from protocol import (DATASET_CSV_HEADER, END_DATASET, READY_MESSAGE, format_dataset_rows,
+                          parse_dataset_rows, split_message)
+    from serial_reader import SerialLineReader
 
 BAUD = 115200
-TIMEOUT = 10
+READ_TIMEOUT = 0.5
+TIMEOUT_SECONDS = 15
+DUMP_HEADER = '[DEBUG] DUMP_DATASET sample count:'
+SHIFTED_ERROR = "samples shifted since the last attempt"
 
-print(f"Connecting to {port}...")
-try:
-    with serial.Serial(port, BAUD, timeout=TIMEOUT) as ser:
-        ser.reset_input_buffer()
-        print("Waiting for ESP32 to be ready...")
-        import time
-        start_time = time.time()
-        TIMEOUT_SECONDS = 15
-        # Wait for ESP32_NOISE_LOGGER_READY
-        while True:
-            line = ser.readline().decode(errors='ignore').strip()
-            if line:
-                print(f"[DEBUG] Received: {line.encode('ascii', errors='replace').decode('ascii')}")
-            if 'ESP32_NOISE_LOGGER_READY' in line:
-                print("[DEBUG] ESP32 is ready. Sending DUMP_DATASET command.")
+
+class DumpResult(NamedTuple):
+    rows: int             # Valid rows received and written by this attempt
+    total: Optional[int]  # Sample count the device reported, None if no header arrived
+    complete: bool        # END_DATASET arrived after every row
+    error: str
+
+
+def _print(message: str) -> None:
+    print(message, flush=True)
+
+
+def open_port(port: str, reset: bool = True) -> serial.Serial:
+    """Open a port; without reset, DTR/RTS stay low so the board keeps running (and its RAM)"""
+    ser = serial.Serial()
+    ser.port = port
+    ser.baudrate = BAUD
+    ser.timeout = READ_TIMEOUT
+    if not reset:
+        ser.dtr = False
+        ser.rts = False
+    ser.open()
+    return ser
+
+
+def wait_for_ready(ser: serial.Serial, timeout: float = TIMEOUT_SECONDS,
+                   log: Callable[[str], None] = _print) -> bool:
+    """Wait for ESP32_NOISE_LOGGER_READY after the port open reset the board"""
+    reader = SerialLineReader(ser)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if any(READY_MESSAGE in line for line in reader.read_lines()):
+            return True
+    log("[WARN] No ready message; assuming the board did not reset")
+    return False
+
+
+def stream_dataset(ser: serial.Serial, write_rows: Callable[[np.ndarray], None], start: int = 0,
+                   timeout: float = TIMEOUT_SECONDS,
+                   progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                   overlap: Optional[str] = None) -> DumpResult:
+    """Send DUMP_DATASET (from sample start) and pass each batch of valid rows to write_rows
+
+    Stops at END_DATASET, after timeout seconds without data, or at the first
+    row that is not valid; rows after a bad one are not written, so the
+    dump can be resumed from start + rows. overlap is the formatted row
+    before start, as already written: the dump then begins one sample
+    earlier and fails with SHIFTED_ERROR unless that sample still matches.
+    """
+    first = start - 1 if overlap is not None and start > 0 else start
+    ser.reset_input_buffer()
+    ser.write(f"DUMP_DATASET:{first}\n".encode() if first else b"DUMP_DATASET\n")
+    reader = SerialLineReader(ser)
+    total: Optional[int] = None
+    received = 0
+    error = ""
+    last_data = last_progress = time.monotonic()
+
+    while True:
+        lines = reader.read_lines()
+        now = time.monotonic()
+        if not lines:
+            if now - last_data > timeout:
+                return DumpResult(received, total, False, error or "timeout waiting for data")
+            continue
+        last_data = now
+
+        rows: List[str] = []
+        for line in lines:
+            if line == END_DATASET:
                 break
-            if time.time() - start_time > TIMEOUT_SECONDS:
-                print("[ERROR] Timeout waiting for ESP32 to be ready.")
-                sys.exit(1)
-        ser.reset_input_buffer()
-        ser.write(b'DUMP_DATASET\n')
-        lines = []
-        print("Waiting for dataset...")
-        start_time = time.time()
-        TIMEOUT_SECONDS = 15
-        while True:
-            line = ser.readline().decode(errors='ignore').strip()
-            if line:
-                print(f"[DEBUG] Received: {line.encode('ascii', errors='replace').decode('ascii')}")
-            if not line:
-                if time.time() - start_time > TIMEOUT_SECONDS:
-                    print("[ERROR] Timeout waiting for data from ESP32.")
+            if line.startswith(DUMP_HEADER):
+                total = int(line[len(DUMP_HEADER):])
+            elif line.startswith('ERROR:Unknown command: DUMP_DATASET'):
+                return DumpResult(received, total, False, "device cannot resume dumps")
+            elif not error and not split_message(line).kind and line.count(',') == 8:
+                rows.append(line)
+        else:
+            line = ''
+
+        if rows:
+            # Line noise shows up as control characters or fields that do not parse
+            bad = next((i for i, row in enumerate(rows) if not row.isprintable()), len(rows))
+            parsed, malformed = parse_dataset_rows(rows[:bad])
+            if malformed:
+                bad = rows.index(malformed[0])
+                parsed, _ = parse_dataset_rows(rows[:bad])
+            if bad < len(rows):
+                # Keep the rows before the first bad one and drain the rest of this dump
+                error = f"malformed row: {rows[bad][:80]!r}"
+            if first < start and len(parsed):
+                if format_dataset_rows(parsed[:1]).strip() != overlap:
+                    error = SHIFTED_ERROR
+                    parsed = parsed[:0]
+                else:
+                    parsed = parsed[1:]
+                first = start
+            if len(parsed):
+                write_rows(parsed)
+                received += len(parsed)
+
+        if progress and (line == END_DATASET or now - last_progress >= 1.0):
+            last_progress = now
+            progress(start + received, total)
+        if line == END_DATASET:
+            complete = not error and total is not None and start + received == total
+            if not error and not complete:
+                error = f"received {start + received} of {total} rows"
+            return DumpResult(received, total, complete, error)
+
+
+def retrieve(port: str, output_path: str, retries: int = 3, timeout: float = TIMEOUT_SECONDS,
+             log: Callable[[str], None] = _print) -> bool:
+    """Download the dataset of the board on port into output_path, resuming after errors"""
+    part_path = output_path + '.part'
+    started = time.monotonic()
+    written = 0
+    last_row: Optional[str] = None  # The last row written, as formatted
+    total: Optional[int] = None
+    can_resume = True
+
+    def progress(rows: int, expected: Optional[int]) -> None:
+        elapsed = max(time.monotonic() - started, 1e-9)
+        log(f"{port}: {rows}/{expected if expected is not None else '?'} rows ({rows / elapsed:,.0f} rows/s)")
+
+    ser: Optional[serial.Serial] = None
+    with open(part_path, 'w', encoding='utf-8', newline='') as f:
+        def write_rows(rows: np.ndarray) -> None:
+            nonlocal last_row
+            text = format_dataset_rows(rows)
+            f.write(text)
+            f.flush()
+            last_row = text.rstrip('\n').rsplit('\n', 1)[-1]
+
+        def restart() -> None:
+            nonlocal written, last_row
+            f.seek(0)
+            f.truncate()
+            f.write(','.join(DATASET_CSV_HEADER) + '\n')
+            written = 0
+            last_row = None
+
+        restart()
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    if ser is None:
+                        # Only the first open may reset the board: a reset reloads flash and
+                        # loses samples that were never saved
+                        ser = open_port(port, reset=attempt == 0)
+                        if attempt == 0:
+                            wait_for_ready(ser, timeout, log)
+                    result = stream_dataset(ser, write_rows, written, timeout, progress, last_row)
+                except (serial.SerialException, OSError) as e:
+                    log(f"{port}: serial error: {e}")
+                    if ser is not None:
+                        ser.close()
+                        ser = None
+                    continue
+
+                if result.total is not None and total is not None and result.total != total:
+                    log(f"{port}: sample count changed from {total} to {result.total}, starting over")
+                    restart()
+                    result = result._replace(complete=False)
+                elif result.error == SHIFTED_ERROR:
+                    restart()
+                else:
+                    written += result.rows
+                total = result.total if result.total is not None else total
+                if result.complete:
                     break
-                continue
-            if line == 'END_DATASET':
-                print("[DEBUG] END_DATASET received.")
-                break
-            # Only collect lines that look like CSV (should have 8 commas)
-            if line.count(',') == 8:
-                lines.append(line)
-            start_time = time.time()  # Reset timeout after receiving a line
-except Exception as e:
-    print(f"Serial error: {e}")
-    sys.exit(1)
-
-if not lines:
-    print("No data received from ESP32.")
-    sys.exit(0)
-
-header = ['RMS', 'ZCR', 'Centroid', 'Band1', 'Band2', 'Band3', 'Band4', 'Band5', 'Flux', 'Label']
-data = [row for row in lines if ',' in row]
-
-# Prompt for output file
-output_path = filedialog.asksaveasfilename(
-    title="Save Dataset As",
-    defaultextension=".csv",
-    filetypes=[("CSV Files", "*.csv")],
-    initialfile="esp32_dataset.csv"
-)
-if not output_path:
-    print("No output file selected.")
-    sys.exit(0)
-
-with open(output_path, 'w', encoding='utf-8') as f:
-    f.write(','.join(header) + '\n')
-    for row in data:
-        f.write(row + '\n')
-
-print(f"Dataset saved to {output_path}")
-messagebox.showinfo("Done", f"Dataset saved to:\n{output_path}")
+                if result.error == "device cannot resume dumps":
+                    can_resume = False
+                log(f"{port}: {result.error}; {'resuming' if can_resume and written else 'retrying'}"
+                    f" (attempt {attempt + 1} of {retries})")
+                if not can_resume:
+                    restart()
+            else:
+                log(f"{port}: giving up after {retries + 1} attempts; partial data kept in {part_path}")
+                return False
+        finally:
+            if ser is not None:
+                ser.close()
+
+    os.replace(part_path, output_path)
+    elapsed = time.monotonic() - started
+    log(f"{port}: saved {written} rows to {output_path} in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/s)")
+    return True
+
+
+def interactive() -> int:
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, simpledialog
+
+    # Prompt user for serial port
+    root = tk.Tk()
+    root.withdraw()
+    port = simpledialog.askstring("Serial Port", "Enter ESP32 COM port (e.g., COM3):")
+    if not port:
+        print("No port provided.")
+        return 1
+
+    # Prompt for output file
+    output_path = filedialog.asksaveasfilename(
+        title="Save Dataset As",
+        defaultextension=".csv",
+        filetypes=[("CSV Files", "*.csv")],
+        initialfile="esp32_dataset.csv"
+    )
+    if not output_path:
+        print("No output file selected.")
+        return 0
+
+    print(f"Connecting to {port}...")
+    if not retrieve(port, output_path):
+        messagebox.showerror("Failed", f"Could not retrieve the dataset from {port}")
+        return 1
+    print(f"Dataset saved to {output_path}")
+    messagebox.showinfo("Done", f"Dataset saved to:\n{output_path}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Download the training dataset stored on ESP32 Noise Loggers")
+    parser.add_argument('--port', action='append', help="serial port; repeat for several devices")
+    parser.add_argument('--all-devices', action='store_true', help="every port that looks like an ESP32")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--output', help="CSV file to write (one device)")
+    output.add_argument('--output-dir', help="write <port>_<date>.csv files here")
+    parser.add_argument('--retries', type=int, default=3, help="resume attempts after an error")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_SECONDS, help="seconds without data before retrying")
+    parser.add_argument('--quiet', action='store_true', help="only report failures")
+    args = parser.parse_args(argv)
+
+    if not args.port and not args.all_devices:
+        return interactive()
+
+    ports = find_esp32_ports() if args.all_devices else args.port
+    if not ports:
+        print("No ESP32 found.")
+        return 1
+    if args.output and len(ports) > 1:
+        parser.error("--output takes one device; use --output-dir")
+    if args.output:
+        outputs = [args.output]
+    else:
+        directory = args.output_dir or '.'
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        outputs = [os.path.join(directory, f"{device_dirname(port)}_{stamp}.csv") for port in ports]
+
+    log = (lambda message: None) if args.quiet else _print
+    # Every device has its own port, so pulls run side by side
+    with ThreadPoolExecutor(max_workers=len(ports)) as pool:
+        results = list(pool.map(lambda job: retrieve(job[0], job[1], args.retries, args.timeout, log),
+                                zip(ports, outputs)))
+    for port, ok in zip(ports, results):
+        if not ok:
+            print(f"[ERROR] {port}: dataset not retrieved")
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
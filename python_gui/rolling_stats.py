@@ -0,0 +1,229 @@
+"""
+Rolling-window noise statistics over the live FEATURES stream.
+
+For each window (1 min, 15 min and 1 h by default) a ring of 60 time buckets
+holds running sums: seconds covered, frame count, RMS energy for Leq, the
+feature sums for means, seconds per classification label, and a histogram of
+the level in 0.5 dB bins for percentiles. A record is added to the bucket
+for its timestamp, and a bucket is cleared when the ring comes back round to
+it, so updates are O(1) per record and memory is fixed; a query adds up at
+most 60 buckets and never looks at raw history.
+
+The level histogram is the quantile sketch. Streaming sketches such as P²
+cannot forget old samples, and a sliding window needs per-bucket sketches
+that can be merged; fixed dB bins merge by addition and are exact to the
+bin width, which is finer than a sound level meter reads.
+
+Every statistic is time-weighted. The time since the previous update is
+shared equally between the records of a batch (the GUI stamps a whole batch
+with one arrival time) and capped at max_gap seconds per record, so a
+disconnect does not count as time spent in the last class.
+"""
+import math
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+try:
+    from .protocol import NUM_FEATURES
+except ImportError:  # Running as a script from the python_gui directory
+    from protocol import NUM_FEATURES
+
+DEFAULT_WINDOWS = (60.0, 900.0, 3600.0)
+MIN_LEVEL_DB = -120.0  # RMS of 1e-6 of full scale, the histogram floor
+BIN_DB = 0.5
+NUM_BINS = int(-MIN_LEVEL_DB / BIN_DB) + 1  # Up to 0 dBFS, the last bin also takes anything louder
+OTHER_LABELS = '(other)'  # Shared by labels beyond max_labels
+
+
+class WindowStats(NamedTuple):
+    window: float                # Length in seconds
+    duration: float              # Seconds of data inside the window
+    frames: int
+    leq: float                   # Energy-average level in dBFS, nan if empty
+    l10: float                   # Level exceeded 10% of the time
+    l50: float
+    l90: float                   # Level exceeded 90% of the time, the background level
+    feature_means: np.ndarray    # float64, NUM_FEATURES time-weighted means
+    duty_cycle: Dict[str, float]  # Fraction of the duration per classification label
+
+
+def rms_to_db(rms: np.ndarray) -> np.ndarray:
+    """Level in dB relative to full scale, floored at MIN_LEVEL_DB"""
+    return 20.0 * np.log10(np.maximum(rms, 10.0 ** (MIN_LEVEL_DB / 20.0)))
+
+
+class _BucketRing:
+    """Running sums for one window length"""
+
+    def __init__(self, window: float, buckets: int, max_labels: int) -> None:
+        self.window = window
+        self.buckets = buckets
+        self.width = window / buckets
+        self.ids = np.full(buckets, -1, dtype=np.int64)  # Absolute bucket number held by each slot
+        self.duration = np.zeros(buckets)
+        self.frames = np.zeros(buckets, dtype=np.int64)
+        self.energy = np.zeros(buckets)
+        self.feature_sums = np.zeros((buckets, NUM_FEATURES))
+        self.label_time = np.zeros((buckets, max_labels))
+        self.histogram = np.zeros((buckets, NUM_BINS))
+
+    def add(self, timestamps: np.ndarray, durations: np.ndarray, energy: np.ndarray,
+            features: np.ndarray, label_ids: np.ndarray, bins: np.ndarray) -> None:
+        numbers = np.floor(timestamps / self.width).astype(np.int64)
+        # Records usually arrive in time order, so a batch spans one or two buckets
+        for number in np.unique(numbers):
+            slot = int(number % self.buckets)
+            if number < self.ids[slot]:
+                continue  # Older than the window
+            if number > self.ids[slot]:
+                self._clear(slot, number)
+            mask = numbers == number
+            weights = durations[mask]
+            self.duration[slot] += weights.sum()
+            self.frames[slot] += int(mask.sum())
+            self.energy[slot] += energy[mask] @ weights
+            self.feature_sums[slot] += weights @ features[mask]
+            self.label_time[slot] += np.bincount(label_ids[mask], weights, self.label_time.shape[1])
+            self.histogram[slot] += np.bincount(bins[mask], weights, NUM_BINS)
+
+    def add_one(self, timestamp: float, duration: float, energy: float,
+                features: np.ndarray, label_id: int, level_bin: int) -> None:
+        """The same as add for one record, without the overhead of the array operations"""
+        number = math.floor(timestamp / self.width)
+        slot = number % self.buckets
+        if number < self.ids[slot]:
+            return
+        if number > self.ids[slot]:
+            self._clear(slot, number)
+        self.duration[slot] += duration
+        self.frames[slot] += 1
+        self.energy[slot] += energy * duration
+        self.feature_sums[slot] += features * duration
+        self.label_time[slot, label_id] += duration
+        self.histogram[slot, level_bin] += duration
+
+    def _clear(self, slot: int, number: int) -> None:
+        self.ids[slot] = number
+        self.duration[slot] = 0.0
+        self.frames[slot] = 0
+        self.energy[slot] = 0.0
+        self.feature_sums[slot] = 0.0
+        self.label_time[slot] = 0.0
+        self.histogram[slot] = 0.0
+
+    def live_slots(self, now: float) -> np.ndarray:
+        """Slots holding buckets inside the window ending at now"""
+        current = math.floor(now / self.width)
+        return (self.ids > current - self.buckets) & (self.ids <= current)
+
+
+class RollingStats:
+    """Leq, percentiles, feature means and class duty cycles over sliding windows"""
+
+    def __init__(self, windows: Sequence[float] = DEFAULT_WINDOWS, buckets: int = 60,
+                 max_labels: int = 16, max_gap: float = 5.0, frame_interval: float = 1.0) -> None:
+        if buckets <= 0 or max_labels < 2:
+            raise ValueError("need at least one bucket and two labels")
+        self.max_gap = max_gap
+        self.frame_interval = frame_interval  # Duration of the very first records
+        self.max_labels = max_labels
+        self.label_names: List[str] = []
+        self._label_index: Dict[str, int] = {}
+        self._rings = {float(window): _BucketRing(float(window), buckets, max_labels) for window in windows}
+        self._last_time: Optional[float] = None
+
+    @property
+    def windows(self) -> List[float]:
+        return list(self._rings)
+
+    def label_id(self, label: str) -> int:
+        """Return the id for a classification label, registering it if there is room"""
+        label_id = self._label_index.get(label)
+        if label_id is None:
+            if len(self.label_names) >= self.max_labels - 1:
+                label = OTHER_LABELS
+                label_id = self._label_index.get(label)
+            if label_id is None:
+                label_id = len(self.label_names)
+                self._label_index[label] = label_id
+                self.label_names.append(label)
+        return label_id
+
+    def update(self, timestamps: np.ndarray, records: np.ndarray) -> None:
+        """Add FEATURE_DTYPE records received at timestamps (seconds, in order)"""
+        count = len(records)
+        if not count:
+            return
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        last = float(timestamps[-1])
+        if self._last_time is None:
+            per_record = self.frame_interval
+        else:
+            per_record = max(last - self._last_time, 0.0) / count
+        self._last_time = max(last, self._last_time or last)
+        duration = min(per_record, self.max_gap)
+
+        if count == 1:
+            features = records['features'][0].astype(np.float64)
+            rms = float(features[0])
+            level = 20.0 * math.log10(max(rms, 10.0 ** (MIN_LEVEL_DB / 20.0)))
+            level_bin = min(int((level - MIN_LEVEL_DB) / BIN_DB), NUM_BINS - 1)
+            label_id = self.label_id(str(records['label'][0]))
+            for ring in self._rings.values():
+                ring.add_one(last, duration, rms * rms, features, label_id, level_bin)
+            return
+
+        durations = np.full(count, duration)
+        features = records['features'].astype(np.float64)
+        energy = features[:, 0] ** 2
+        bins = np.clip(((rms_to_db(features[:, 0]) - MIN_LEVEL_DB) / BIN_DB).astype(np.int64), 0, NUM_BINS - 1)
+        unique, inverse = np.unique(records['label'], return_inverse=True)
+        label_ids = np.array([self.label_id(str(label)) for label in unique], dtype=np.int64)[inverse]
+        for ring in self._rings.values():
+            ring.add(timestamps, durations, energy, features, label_ids, bins)
+
+    def stats(self, window: float, now: Optional[float] = None) -> WindowStats:
+        """Statistics for the window ending at now (default: the newest record), to bucket resolution"""
+        ring = self._rings[float(window)]
+        if now is None:
+            now = self._last_time if self._last_time is not None else 0.0
+        live = ring.live_slots(now)
+        duration = float(ring.duration[live].sum())
+        if duration <= 0.0:
+            nan = float('nan')
+            return WindowStats(ring.window, 0.0, 0, nan, nan, nan, nan,
+                               np.full(NUM_FEATURES, np.nan), {})
+
+        histogram = ring.histogram[live].sum(axis=0)
+        label_time = ring.label_time[live].sum(axis=0)
+        return WindowStats(
+            ring.window, duration, int(ring.frames[live].sum()),
+            float(10.0 * np.log10(max(ring.energy[live].sum() / duration, 1e-300))),
+            _level_quantile(histogram, 0.90), _level_quantile(histogram, 0.50), _level_quantile(histogram, 0.10),
+            ring.feature_sums[live].sum(axis=0) / duration,
+            {name: float(label_time[i] / duration) for i, name in enumerate(self.label_names) if label_time[i] > 0})
+
+    def summary(self, now: Optional[float] = None) -> List[WindowStats]:
+        return [self.stats(window, now) for window in self._rings]
+
+
+def _level_quantile(histogram: np.ndarray, q: float) -> float:
+    """Level below which a fraction q of the time was spent, interpolated inside its bin"""
+    cumulative = np.cumsum(histogram)
+    target = q * cumulative[-1]
+    index = int(np.searchsorted(cumulative, target))
+    below = cumulative[index - 1] if index else 0.0
+    fraction = (target - below) / histogram[index] if histogram[index] else 0.0
+    return MIN_LEVEL_DB + (index + fraction) * BIN_DB
+
+
+def format_window(stats: WindowStats) -> str:
+    """One line for the GUI, e.g. '1 min: Leq -31.2 dB  L10 -28.0  L90 -40.5  traffic 60%'"""
+    name = f"{stats.window / 3600:g} h" if stats.window >= 3600 else f"{stats.window / 60:g} min"
+    if not stats.frames:
+        return f"{name}: no data"
+    classes = '  '.join(f"{label} {share:.0%}" for label, share in
+                        sorted(stats.duty_cycle.items(), key=lambda item: -item[1]))
+    return (f"{name}: Leq {stats.leq:.1f} dB  L10 {stats.l10:.1f}  L50 {stats.l50:.1f}  "
+            f"L90 {stats.l90:.1f}  {classes}")
@@ -0,0 +1,83 @@
+"""
+Event-driven line reader for the ESP32 serial link.
+
+Instead of polling ``in_waiting`` and sleeping between ``readline()`` calls,
+the reader blocks on the port until at least one byte arrives (or the port
+timeout expires) and then drains everything already buffered, returning all
+complete lines from a single wakeup.
+"""
+import threading
+from typing import Callable, List, Optional
+
+import serial
+
+
+class SerialLineReader:
+    """Split the byte stream of a serial port into complete text lines"""
+
+    def __init__(self, port: serial.Serial, max_line_length: int = 4096) -> None:
+        self.port = port
+        self.max_line_length = max_line_length
+        self._buffer = bytearray()
+
+    def read_lines(self) -> List[str]:
+        """Block until data is available and return every complete line received"""
+        chunk = self.port.read(max(1, self.port.in_waiting))
+        if not chunk:
+            return []  # Port timeout expired with no traffic
+
+        waiting = self.port.in_waiting
+        if waiting:
+            chunk += self.port.read(waiting)
+        return self.feed(chunk)
+
+    def feed(self, data: bytes) -> List[str]:
+        """Append raw bytes and return the complete, non-empty lines they finish"""
+        self._buffer += data
+        end = self._buffer.rfind(b'\n')
+        if end < 0:
+            if len(self._buffer) > self.max_line_length:
+                # No terminator in sight - drop the garbage rather than grow forever
+                self._buffer.clear()
+            return []
+
+        text = self._buffer[:end].decode('utf-8', errors='ignore')
+        del self._buffer[:end + 1]
+
+        lines: List[str] = []
+        for line in text.split('\n'):
+            line = line.strip()
+            if line:
+                lines.append(line)
+        return lines
+
+    def reset(self) -> None:
+        """Discard any partially received line"""
+        self._buffer.clear()
+
+
+class SerialReaderThread(threading.Thread):
+    """Background thread that feeds batches of lines from one port to a callback"""
+
+    def __init__(self, port: serial.Serial, on_lines: Callable[[List[str]], None],
+                 on_error: Optional[Callable[[Exception], None]] = None) -> None:
+        super().__init__(daemon=True)
+        self.reader = SerialLineReader(port)
+        self.on_lines = on_lines
+        self.on_error = on_error
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                lines = self.reader.read_lines()
+            except Exception as e:
+                if not self._stop_event.is_set() and self.on_error:
+                    self.on_error(e)
+                break
+            if lines:
+                self.on_lines(lines)
+
+    def stop(self) -> None:
+        """Ask the thread to exit after the current blocking read returns"""
+        self._stop_event.set()
@@ -57,6 +57,143 @@ def test_gui_creation():
         print(f"  [FAIL] GUI creation failed: {e}")
         return False
 
+def test_protocol_parsing():
+    """Test that a bad row is rejected whether or not the rest of its chunk parses."""
+    print("\nTesting protocol row validation...")
+    
+    from python_gui.protocol import parse_dataset_rows, parse_feature_payloads
+    good = "0.1000,0.2000,1500.00,0.3000,0.4000,0.5000,0.6000,traffic,1000"
+    bad_rows = [
+        "0.1000,0.2000,1500.00,0.3000,0.4000,0.5000,0.6000,,1000",         # empty label
+        "0.1000,0.2000,1500.00,0.3000,0.4000,0.5000,0.6000,traffic,-1",    # negative timestamp
+        "0.1000,0.2000,1500.00,0.3000,0.4000,0.5000,0.6000,traffic,1.5",   # fractional timestamp
+        "nan,0.2000,1500.00,0.3000,0.4000,0.5000,0.6000,traffic,1000",     # non-finite feature
+    ]
+    for bad in bad_rows:
+        clean = parse_dataset_rows([good, bad])
+        dirty = parse_dataset_rows([good, bad, "not,a,row"])
+        if len(clean[0]) != 1 or clean[1] != [bad] or len(dirty[0]) != 1 or dirty[1][0] != bad:
+            print(f"  [FAIL] Row accepted or rejected depending on its chunk: {bad}")
+            return False
+    payloads = parse_feature_payloads(["0.1,0.2,1500,0.3,0.4,0.5,0.6,traffic,0.8",
+                                       "0.1,0.2,1500,0.3,0.4,0.5,0.6,traffic,inf"])
+    if len(payloads[0]) != 1 or len(payloads[1]) != 1:
+        print("  [FAIL] Non-finite confidence accepted")
+        return False
+    print("  [OK] Malformed rows rejected the same way in clean and dirty chunks")
+    return True
+
+def test_torn_csv_log():
+    """Test that a half-written line does not make a CSV feature log unreadable."""
+    print("\nTesting torn CSV log...")
+    
+    import os
+    import tempfile
+    from python_gui.record_log import CSV_HEADER, read_log
+    row = "1700000000.000,0.1000,0.2000,1500.00,0.3000,0.4000,0.5000,0.6000,traffic,0.800\n"
+    torn = "1700000001.000,0.1000,0.20"
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "features.csv")
+        with open(path, 'w') as f:
+            # A crash mid-line, logging resumed, then another crash
+            f.write(CSV_HEADER + row + torn + "\n" + row * 2 + torn)
+        records, malformed = read_log(path)
+    if len(records) != 3 or malformed != [torn, torn] or records['label'][0] != b'traffic':
+        print(f"  [FAIL] Read {len(records)} records, {len(malformed)} malformed lines")
+        return False
+    print("  [OK] Torn lines skipped and reported")
+    return True
+
+def test_binary_text_split():
+    """Test that a 0xAA byte inside a text line is not taken for a frame."""
+    print("\nTesting binary frames next to UTF-8 text...")
+    
+    import numpy as np
+    from python_gui.binary_protocol import FrameDecoder, encode_frames
+    frames = encode_frames(np.ones((2, 7), dtype=np.float32), ["traffic"] * 2, np.full(2, 0.9))
+    line = "[DEBUG] Labeled sample: fenêtre"  # 'ê' is C3 AA in UTF-8
+    stream = frames[:39] + (line + "\n").encode() + frames[39:]
+    for step in (len(stream), 1):
+        decoder = FrameDecoder()
+        results = [decoder.feed(stream[i:i + step]) for i in range(0, len(stream), step)]
+        if sum(len(r[0]) for r in results) != 2 or [text for r in results for text in r[1]] != [line]:
+            print(f"  [FAIL] Text line or frames lost when fed {step} bytes at a time")
+            return False
+    print("  [OK] Sync byte inside a text line kept as text")
+    return True
+
+def test_emulated_device():
+    """Test the serial protocol against the software ESP32 emulator."""
+    print("\nTesting protocol with emulated ESP32...")
+    
+    try:
+        import time
+        from python_gui.esp32_emulator import ESP32Emulator, EmulatedSerial
+        from python_gui.protocol import parse_chunk, parse_dataset_rows
+        from python_gui.serial_reader import SerialLineReader
+        
+        with EmulatedSerial(ESP32Emulator(rate=200)) as port:
+            reader = SerialLineReader(port)
+            lines = []
+            deadline = time.monotonic() + 2
+            while not any(line.startswith("FEATURES:") for line in lines) and time.monotonic() < deadline:
+                lines += reader.read_lines()
+            if "ESP32_NOISE_LOGGER_READY" not in lines or not len(parse_chunk(lines).features):
+                print("  [FAIL] No ready message or FEATURES from emulator")
+                return False
+            
+            port.write(b"LABEL:traffic\nDUMP_DATASET\n")
+            lines = []
+            deadline = time.monotonic() + 2
+            while "END_DATASET" not in lines and time.monotonic() < deadline:
+                lines += reader.read_lines()
+            rows, _ = parse_dataset_rows([line for line in lines if line.count(',') == 8
+                                          and not line.startswith("FEATURES:")])
+            if len(rows) != 1 or rows['label'][0] != "traffic":
+                print("  [FAIL] Labeled sample not returned by DUMP_DATASET")
+                return False
+        print("  [OK] Emulated ESP32 answered LABEL and DUMP_DATASET")
+        
+        # Binary FEATURES frames must decode to what the text lines say
+        from python_gui.binary_protocol import FrameReader
+        with EmulatedSerial(ESP32Emulator(rate=200)) as port:
+            reader = FrameReader(port)
+            port.write(b"SET_MODE:BINARY\n")
+            frame_count, lines = 0, []
+            deadline = time.monotonic() + 2
+            while frame_count < 10 and time.monotonic() < deadline:
+                frames, text = reader.read()
+                frame_count += len(frames)
+                lines += text
+            if "OK:MODE_BINARY" not in lines or frame_count < 10 or reader.decoder.crc_errors:
+                print("  [FAIL] No valid binary frames from emulator")
+                return False
+        print("  [OK] Emulated ESP32 sent CRC-checked binary frames")
+
+        # A resumed dump must notice that a full device evicted samples in between
+        from python_gui.protocol import format_dataset_rows
+        from python_gui.retrieve_esp32_dataset import SHIFTED_ERROR, stream_dataset
+        emulator = ESP32Emulator(rate=0.001, max_samples=50)
+        with EmulatedSerial(emulator) as port:
+            time.sleep(0.1)
+            emulator.preload(50)
+            batches = []
+            stream_dataset(port, batches.append, 0, 2)
+            rows = parse_dataset_rows(format_dataset_rows(batches[0]).splitlines())[0]
+            overlap = format_dataset_rows(rows[19:20]).strip()
+            resumed = stream_dataset(port, batches.append, 20, 2, None, overlap)
+            emulator.classifier.add_sample(rows['features'][0], "traffic")
+            emulator.timestamps.append(emulator.millis())
+            shifted = stream_dataset(port, batches.append, 20, 2, None, overlap)
+        if not resumed.complete or resumed.rows != 30 or shifted.error != SHIFTED_ERROR:
+            print("  [FAIL] Resumed dump did not check the overlapping row")
+            return False
+        print("  [OK] Resumed dumps detect evicted samples")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Emulator test failed: {e}")
+        return False
+
 def main():
     print("ESP32 Noise Logger - System Test")
     print("=" * 40)
@@ -67,6 +204,12 @@ def main():
         print("Run: pip install -r requirements.txt")
         return 1
     
+    # Test the protocol without hardware
+    if not test_protocol_parsing() or not test_torn_csv_log() or not test_binary_text_split()\
+            or not test_emulated_device():
+        print("\n[RESULT] FAILED - Protocol error")
+        return 1
+    
     # Test GUI creation
     if not test_gui_creation():
         print("\n[RESULT] FAILED - GUI creation error")